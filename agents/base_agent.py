@@ -0,0 +1,162 @@
+from agents.response_templates import get_renderer, resolve_render_mode
+from tracing import get_tracer
+from typing import Callable, Iterator
+import json
+import re
+
+def extract_json(text: str) -> str:
+    """Extract the first valid JSON block from text."""
+    match = re.search(r'\{.*?\}', text, re.DOTALL)
+    if match:
+        return match.group(0)
+    raise ValueError("No valid JSON object found in LLM response.")
+
+class BaseAgent:
+    """
+    Shared analyse -> act -> format pipeline for the specialist agents
+    """
+
+    # "llm", "template" or "template_fallback" (template, LLM when no template fits)
+    render_mode = "llm"
+
+    def _init_rendering(self, render_mode: str = None):
+        self.render_mode = resolve_render_mode(render_mode)
+        self.renderer = get_renderer()
+
+    def process(self, query: str, context: dict = None, analysis: dict = None,
+                on_token: Callable[[str], None] = None) -> dict:
+        """
+        Process a query, reusing a pre-computed analysis when one is given.
+
+        When on_token is given the reply is passed to it chunk by chunk as it is generated.
+        """
+
+        with get_tracer().span("agent.process", **{"agent.name": self.name}) as span:
+            if analysis is None:
+                analysis = self._analyze(query)
+                if analysis is None:
+                    return self._emit(self._on_analysis_error(query), on_token)
+
+            result, response_type = self._run_action(query, analysis)
+            span.set_attribute("agent.response_type", response_type)
+            if response_type is None:
+                return self._emit(result, on_token)
+
+            if on_token is not None:
+                return self._stream_response(query, result, response_type, on_token)
+            return self._format_response(query, result, response_type)
+
+    async def aprocess(self, query: str, context: dict = None, analysis: dict = None) -> dict:
+        """Async variant of process for the asyncio request path"""
+
+        with get_tracer().span("agent.process", **{"agent.name": self.name}) as span:
+            if analysis is None:
+                analysis = await self._aanalyze(query)
+                if analysis is None:
+                    return self._on_analysis_error(query)
+
+            result, response_type = await self._arun_action(query, analysis)
+            span.set_attribute("agent.response_type", response_type)
+            if response_type is None:
+                return result
+
+            return await self._aformat_response(query, result, response_type)
+
+    def _analyze(self, query: str) -> dict:
+        """Ask the LLM which action to take, None if the answer is unparseable"""
+        analysis_result = self.llm._call(self._analysis_prompt(query))
+        return self._safe_parse_analysis(analysis_result)
+
+    async def _aanalyze(self, query: str) -> dict:
+        analysis_result = await self.llm._acall(self._analysis_prompt(query))
+        return self._safe_parse_analysis(analysis_result)
+
+    def _safe_parse_analysis(self, analysis_result: str) -> dict:
+        try:
+            return self._parse_analysis(analysis_result)
+        except (json.JSONDecodeError, ValueError):
+            return None
+
+    def _parse_analysis(self, analysis_result: str) -> dict:
+        """Parse the analysis completion"""
+        return json.loads(analysis_result)
+
+    def _on_analysis_error(self, query: str) -> dict:
+        """Fallback response when the analysis cannot be parsed"""
+        return self._provide_general_help(query)
+
+    def _analysis_prompt(self, query: str) -> str:
+        raise NotImplementedError
+
+    def _run_action(self, query: str, analysis: dict) -> tuple:
+        """
+        Run the tool call for an analysis.
+
+        Returns (result, response_type) for results that still need formatting,
+        or (response, None) when the response is already final.
+        """
+        raise NotImplementedError
+
+    async def _arun_action(self, query: str, analysis: dict) -> tuple:
+        """Async variant of _run_action; in-memory tools are called directly"""
+        return self._run_action(query, analysis)
+
+    def _format_response(self, query: str, result: dict, response_type: str) -> dict:
+        """Format the response from a template or using LLM"""
+        response = self._render_template(result, response_type)
+        if response is None:
+            response = self.llm._call(self._format_prompt(query, result, response_type), priority="formatting")
+        return self._build_response(result, response)
+
+    async def _aformat_response(self, query: str, result: dict, response_type: str) -> dict:
+        response = self._render_template(result, response_type)
+        if response is None:
+            response = await self.llm._acall(self._format_prompt(query, result, response_type), priority="formatting")
+        return self._build_response(result, response)
+
+    def _format_response_stream(self, query: str, result: dict, response_type: str) -> Iterator[str]:
+        """Yield the formatted reply in chunks as the LLM produces them"""
+        response = self._render_template(result, response_type)
+        if response is not None:
+            yield response
+            return
+
+        yield from self.llm.stream(self._format_prompt(query, result, response_type), priority="formatting")
+
+    def _stream_response(self, query: str, result: dict, response_type: str,
+                         on_token: Callable[[str], None]) -> dict:
+        chunks = []
+        for chunk in self._format_response_stream(query, result, response_type):
+            on_token(chunk)
+            chunks.append(chunk)
+        return self._build_response(result, "".join(chunks))
+
+    def _emit(self, response: dict, on_token: Callable[[str], None] = None) -> dict:
+        """Pass an already final reply to the token callback in one piece"""
+        if on_token is not None:
+            on_token(response.get("response", ""))
+        return response
+
+    def _render_template(self, result: dict, response_type: str) -> str:
+        """Template rendering for the current mode, None when the LLM should format"""
+        if self.render_mode == "llm":
+            return None
+
+        response = self.renderer.render(response_type, result)
+        if response is None and self.render_mode == "template":
+            response = result.get("message", "Here's what I found for your request.")
+        return response
+
+    def _format_prompt(self, query: str, result: dict, response_type: str) -> str:
+        raise NotImplementedError
+
+    def _build_response(self, result: dict, response: str) -> dict:
+        return {
+            "agent": self.name,
+            "response": response,
+            "data": result,
+            "success": result.get("success", True)
+        }
+
+    def _provide_general_help(self, query: str) -> dict:
+        raise NotImplementedError
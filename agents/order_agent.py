@@ -1,19 +1,19 @@
 from groq_llm import GroqLLM
+from agents.base_agent import BaseAgent
 from tools.order_tools import OrderTools
 import json
 
-class OrderAgent:
-    def __init__(self):
+class OrderAgent(BaseAgent):
+    def __init__(self, render_mode: str = None):
         self.llm = GroqLLM()
         self.tools = OrderTools()
+        self._init_rendering(render_mode)
         self.name = "Order Agent"
         self.description = "Handles order-related queries, tracking, and cancellations"
     
-    def process(self, query: str, context: dict = None) -> dict:
-        """Process order-related queries"""
-        
-        # Analyze the query to determine the action
-        analysis_prompt = f"""
+    def _analysis_prompt(self, query: str) -> str:
+        """Prompt that determines the order action"""
+        return f"""
         Analyze this customer query about orders and determine the action needed:
         Query: "{query}"
         
@@ -21,65 +21,53 @@ class OrderAgent:
         1. get_order_status - if asking about order status
         2. track_order - if asking about tracking
         3. cancel_order - if wanting to cancel
-        4. general_info - if asking general order information
+        4. list_orders - if asking about all of their orders
+        5. general_info - if asking general order information
         
         Extract any order ID mentioned (format: ORD followed by numbers).
+        Extract any customer ID mentioned (format: CUST followed by numbers).
         
         Respond in JSON format:
         {{
             "action": "action_name",
             "order_id": "extracted_order_id_or_null",
+            "customer_id": "extracted_customer_id_or_null",
             "confidence": 0.95
         }}
         """
+    
+    def _run_action(self, query: str, analysis: dict) -> tuple:
+        """Run the order tool selected by the analysis"""
+        action = analysis.get("action")
+        order_id = analysis.get("order_id")
         
-        analysis_result = self.llm._call(analysis_prompt)
+        if action == "get_order_status" and order_id:
+            return self.tools.get_order_status(order_id), "order_status"
         
-        try:
-            analysis = json.loads(analysis_result)
-            action = analysis.get("action")
-            order_id = analysis.get("order_id")
-            
-            if action == "get_order_status" and order_id:
-                result = self.tools.get_order_status(order_id)
-                return self._format_response(query, result, "order_status")
-            
-            elif action == "track_order" and order_id:
-                result = self.tools.track_order(order_id)
-                return self._format_response(query, result, "tracking")
-            
-            elif action == "cancel_order" and order_id:
-                result = self.tools.cancel_order(order_id)
-                return self._format_response(query, result, "cancellation")
-            
-            else:
-                return self._provide_general_help(query)
-                
-        except json.JSONDecodeError:
-            return self._provide_general_help(query)
-    
-    def _format_response(self, query: str, result: dict, response_type: str) -> dict:
-        """Format the response using LLM"""
+        elif action == "track_order" and order_id:
+            return self.tools.track_order(order_id), "tracking"
         
-        prompt = f"""
+        elif action == "cancel_order" and order_id:
+            return self.tools.cancel_order(order_id), "cancellation"
+        
+        elif action == "list_orders" and analysis.get("customer_id"):
+            return self.tools.list_orders_for_customer(analysis["customer_id"]), "order_list"
+        
+        else:
+            return self._provide_general_help(query), None
+    
+    def _format_prompt(self, query: str, result: dict, response_type: str) -> str:
+        """Prompt that turns the tool result into a customer reply"""
+        return f"""
         Format a helpful customer service response based on this data:
         
         Customer Query: "{query}"
         Response Type: {response_type}
-        Data: {json.dumps(result.__dict__, indent=2)}
+        Data: {json.dumps(result, indent=2)}
         
         Create a friendly, helpful response. If there's an error, be apologetic and offer alternatives.
         Be concise but informative.
         """
-        
-        response = self.llm._call(prompt)
-        
-        return {
-            "agent": self.name,
-            "response": response,
-            "data": result,
-            "success": result.get("success", True)
-        }
     
     def _provide_general_help(self, query: str) -> dict:
         """Provide general order help"""
@@ -1,26 +1,22 @@
 from groq_llm import GroqLLM
+from agents.base_agent import BaseAgent, extract_json
 from tools.product_tools import ProductTools
 import json
-import re
+import os
 
-def extract_json(text: str) -> str:
-    """Extract the first valid JSON block from text."""
-    match = re.search(r'\{.*?\}', text, re.DOTALL)
-    if match:
-        return match.group(0)
-    raise ValueError("No valid JSON object found in LLM response.")
-
-class ProductAgent:
-    def __init__(self):
+class ProductAgent(BaseAgent):
+    def __init__(self, render_mode: str = None):
         self.llm = GroqLLM()
         self.tools = ProductTools()
+        # Only the best matches are shown, so a broad search on a large catalog stays a short reply and prompt
+        self.search_page_size = int(os.getenv("PRODUCT_SEARCH_PAGE_SIZE", "10"))
+        self._init_rendering(render_mode)
         self.name = "Product Agent"
         self.description = "Handles product searches, details, and availability"
     
-    def process(self, query: str, context: dict = None) -> dict:
-        """Process product-related queries"""
-        
-        analysis_prompt = f"""
+    def _analysis_prompt(self, query: str) -> str:
+        """Prompt that determines the product action"""
+        return f"""
         Analyze this customer query about products:
         Query: "{query}"
         
@@ -41,43 +37,36 @@ class ProductAgent:
             "confidence": 0.95
         }}
         """
+    
+    def _parse_analysis(self, analysis_result: str) -> dict:
+        """Parse the first JSON object in the analysis completion"""
+        return json.loads(extract_json(analysis_result))
+    
+    def _run_action(self, query: str, analysis: dict) -> tuple:
+        """Run the product tool selected by the analysis"""
+        action = analysis.get("action")
+        product_id = analysis.get("product_id")
+        search_terms = analysis.get("search_terms")
+        
+        if action == "search_products" and search_terms:
+            return self.tools.search_products(search_terms, limit=self.search_page_size), "search"
         
-        analysis_result = self.llm._call(analysis_prompt)
+        elif action == "get_product_details" and product_id:
+            return self.tools.get_product_details(product_id), "details"
         
-        try:
-            json_text = extract_json(analysis_result)
-            analysis = json.loads(json_text)
-            action = analysis.get("action")
-            product_id = analysis.get("product_id")
-            search_terms = analysis.get("search_terms")
-            
-            if action == "search_products" and search_terms:
-                result = self.tools.search_products(search_terms)
-                return self._format_response(query, result, "search")
-            
-            elif action == "get_product_details" and product_id:
-                result = self.tools.get_product_details(product_id)
-                return self._format_response(query, result, "details")
-            
-            elif action == "check_availability":
-                if product_id:
-                    result = self.tools.check_availability(product_id)
-                    return self._format_response(query, result, "availability")
-                else:
-                    # Try to search and check availability
-                    search_result = self.tools.search_products(query)
-                    return self._format_response(query, search_result, "search_availability")
-            
+        elif action == "check_availability":
+            if product_id:
+                return self.tools.check_availability(product_id), "availability"
             else:
-                return self._provide_general_help(query)
-                
-        except json.JSONDecodeError:
-            return print("Error parsing analysis result, providing general help.")
-    
-    def _format_response(self, query: str, result: dict, response_type: str) -> dict:
-        """Format the response using LLM"""
+                # Try to search and check availability
+                return self.tools.search_products(query, limit=self.search_page_size), "search_availability"
         
-        prompt = f"""
+        else:
+            return self._provide_general_help(query), None
+    
+    def _format_prompt(self, query: str, result: dict, response_type: str) -> str:
+        """Prompt that turns the tool result into a customer reply"""
+        return f"""
         Format a helpful product response based on this data:
         Customer Query: "{query}"
         Response Type: {response_type}
@@ -85,18 +74,10 @@ class ProductAgent:
         Data: {json.dumps(result, indent=2)}
         
         Create a friendly, informative response. If showing products, highlight key features.
+        If total is larger than count, say how many products matched and that these are the best matches.
         If checking availability, clearly state stock status.
         Be helpful and encourage purchase if appropriate.
         """
-        
-        response = self.llm._call(prompt)
-        print(result)
-        return {
-            "agent": self.name,
-            "response": response,
-            "data": result,
-            "success": result.get("success", True)
-        }
     
     def _provide_general_help(self, query: str) -> dict:
         """Provide general product help"""
@@ -0,0 +1,199 @@
+import os
+import string
+from typing import Dict, List, Optional, Tuple
+
+RENDER_MODES = ("llm", "template", "template_fallback")
+
+_FORMATTER = string.Formatter()
+
+# Variants per response_type: the first whose condition key is truthy in the result is used,
+# a None condition always matches. Failed results use FAILURE_TEMPLATES instead.
+RESPONSE_TEMPLATES: Dict[str, List[Tuple[Optional[str], str]]] = {
+    "order_status": [
+        ("order", "Here's the latest on your order {order[id]}:\n\n"
+                  "• Status: {order[status]}\n"
+                  "• Ordered on: {order[order_date]}\n"
+                  "• Estimated delivery: {order[estimated_delivery]}\n"
+                  "• Items:\n{item_lines}\n\n"
+                  "Let me know if you'd like to track or make changes to this order!")
+    ],
+    "order_list": [
+        ("orders", "Here are your most recent orders ({count} of {total}):\n\n{order_lines}\n\n"
+                   "Would you like details or tracking for any of them?"),
+        (None, "I couldn't find any orders for your account.")
+    ],
+    "tracking": [
+        ("tracking_info", "Here's the tracking information for your order:\n\n"
+                          "• Tracking number: {tracking_info[tracking_number]}\n"
+                          "• Status: {tracking_info[status]}\n"
+                          "• Estimated delivery: {tracking_info[estimated_delivery]}\n\n"
+                          "Is there anything else I can help you with?"),
+        ("message", "{message}\n\nI'll be happy to check again once it ships!")
+    ],
+    "cancellation": [
+        ("message", "{message}. You'll receive a confirmation email shortly.\n\n"
+                    "Is there anything else I can help you with?")
+    ],
+    "search": [
+        ("products", "Here are the best matches for your search ({count} of {total}):\n\n{product_lines}\n\n"
+                     "Would you like more details on any of these?"),
+        (None, "I couldn't find any products matching your search. "
+               "Try different keywords or browse by category.")
+    ],
+    "search_availability": [
+        ("products", "Here's the availability of matching products:\n\n{product_lines}\n\n"
+                     "Would you like more details on any of these?"),
+        (None, "I couldn't find any products matching your search. "
+               "Please share the product ID (e.g. PROD001) and I'll check its stock.")
+    ],
+    "details": [
+        ("product", "{product[name]} ({product[id]})\n\n"
+                    "{product[description]}\n\n"
+                    "• Category: {product[category]}\n"
+                    "• Price: ${product[price]:.2f}\n"
+                    "• Availability: {product[stock_status]}\n"
+                    "{spec_lines}\n\n"
+                    "Would you like to check availability or see similar products?")
+    ],
+    "availability": [
+        ("available", "Good news — this product is in stock with {quantity} unit(s) available. "
+                      "Order soon to secure yours!"),
+        (None, "Unfortunately this product is currently out of stock. "
+               "Would you like me to suggest similar products?")
+    ],
+    "faq": [
+        ("answer", "{answer}\n\nIs there anything else you'd like to know about {topic}?")
+    ],
+    "ticket": [
+        ("ticket_id", "I've created support ticket {ticket_id} for you. "
+                      "Our support team will review it and get back to you as soon as possible.\n\n"
+                      "Please keep the ticket number for your reference.")
+    ]
+}
+
+FAILURE_TEMPLATES: Dict[str, str] = {
+    "default": "I'm sorry, I couldn't complete that request: {message}.\n\n"
+               "Please double-check the details and try again, or ask me for help.",
+    "cancellation": "I'm sorry, {message}.\n\n"
+                    "Only orders that are still processing can be cancelled. "
+                    "Would you like help with a return instead?"
+}
+
+PRODUCT_LINE_TEMPLATE = "• {name} ({id}) — ${price:.2f}, {stock_status}\n  {description}"
+ORDER_ITEM_TEMPLATE = "   - {name} x{quantity} (${price:.2f})"
+ORDER_LINE_TEMPLATE = "• {id} — {status}, ordered {order_date}, estimated delivery {estimated_delivery}"
+SPEC_LINE_TEMPLATE = "• {key}: {value}"
+
+class CompiledTemplate:
+    """
+    A format string parsed once into literal and field segments
+    """
+
+    def __init__(self, source: str):
+        self.source = source
+        # Parsing here surfaces malformed templates at startup rather than per request
+        self._segments = list(_FORMATTER.parse(source))
+
+    def render(self, values: dict) -> str:
+        parts = []
+        for literal, field_name, format_spec, conversion in self._segments:
+            parts.append(literal)
+            if field_name is not None:
+                value, _ = _FORMATTER.get_field(field_name, (), values)
+                if conversion:
+                    value = _FORMATTER.convert_field(value, conversion)
+                parts.append(_FORMATTER.format_field(value, format_spec or ""))
+        return "".join(parts)
+
+class ResponseRenderer:
+    """
+    Renders tool results into customer replies without an LLM call
+    """
+
+    def __init__(self, templates: Dict[str, List[Tuple[Optional[str], str]]] = None,
+                 failure_templates: Dict[str, str] = None):
+        self.templates = {
+            response_type: [(condition, CompiledTemplate(source)) for condition, source in variants]
+            for response_type, variants in (templates or RESPONSE_TEMPLATES).items()
+        }
+        self.failure_templates = {
+            response_type: CompiledTemplate(source)
+            for response_type, source in (failure_templates or FAILURE_TEMPLATES).items()
+        }
+        self.product_line = CompiledTemplate(PRODUCT_LINE_TEMPLATE)
+        self.order_item = CompiledTemplate(ORDER_ITEM_TEMPLATE)
+        self.order_line = CompiledTemplate(ORDER_LINE_TEMPLATE)
+        self.spec_line = CompiledTemplate(SPEC_LINE_TEMPLATE)
+
+    def can_render(self, response_type: str) -> bool:
+        return response_type in self.templates
+
+    def render(self, response_type: str, result: dict) -> Optional[str]:
+        """Render a result, None when no template applies or the data does not fit it"""
+        if not self.can_render(response_type):
+            return None
+
+        try:
+            values = self._build_values(result)
+
+            if result.get("success") is False:
+                template = self.failure_templates.get(response_type, self.failure_templates["default"])
+                return template.render(values)
+
+            for condition, template in self.templates[response_type]:
+                if condition is None or values.get(condition):
+                    return template.render(values)
+        except (KeyError, IndexError, TypeError, ValueError):
+            return None
+
+        return None
+
+    def _build_values(self, result: dict) -> dict:
+        """Template values: the result plus pre-rendered lists and derived fields"""
+        values = dict(result)
+        values.setdefault("message", "something went wrong")
+
+        if isinstance(result.get("message"), str):
+            values["message"] = result["message"].rstrip(".")
+
+        if isinstance(result.get("products"), list):
+            values["product_lines"] = "\n".join(
+                self.product_line.render(self._product_values(product)) for product in result["products"]
+            )
+
+        if isinstance(result.get("product"), dict):
+            product = self._product_values(result["product"])
+            values["product"] = product
+            values["spec_lines"] = "\n".join(
+                self.spec_line.render({"key": key, "value": value})
+                for key, value in product.get("specifications", {}).items()
+            )
+
+        if isinstance(result.get("orders"), list):
+            values["order_lines"] = "\n".join(self.order_line.render(order) for order in result["orders"])
+
+        if isinstance(result.get("order"), dict):
+            values["item_lines"] = "\n".join(
+                self.order_item.render(item) for item in result["order"].get("items", [])
+            )
+
+        return values
+
+    def _product_values(self, product: dict) -> dict:
+        values = dict(product)
+        values.setdefault("description", "")
+        values["stock_status"] = "in stock" if product.get("in_stock") else "out of stock"
+        return values
+
+# Compiled once at import so every agent shares the same renderer
+_default_renderer = ResponseRenderer()
+
+def get_renderer() -> ResponseRenderer:
+    return _default_renderer
+
+def resolve_render_mode(render_mode: str = None) -> str:
+    """Validate a render mode, defaulting to RESPONSE_RENDER_MODE or "llm" """
+    render_mode = render_mode or os.getenv("RESPONSE_RENDER_MODE", "llm")
+    if render_mode not in RENDER_MODES:
+        raise ValueError(f"Unknown render mode '{render_mode}'. Expected one of: {', '.join(RENDER_MODES)}")
+    return render_mode
@@ -1,18 +1,19 @@
 from groq_llm import GroqLLM
+from agents.base_agent import BaseAgent
 from tools.support_tools import SupportTools
 import json
-from pydantic import BaseModel
-class SupportAgent:
-    def __init__(self):
+
+class SupportAgent(BaseAgent):
+    def __init__(self, render_mode: str = None):
         self.llm = GroqLLM()
         self.tools = SupportTools()
+        self._init_rendering(render_mode)
         self.name = "Support Agent"
         self.description = "Handles general support, FAQs, and ticket creation"
     
-    def process(self, query: str, context: dict = None) -> dict:
-        """Process support-related queries"""
-        
-        analysis_prompt = f"""
+    def _analysis_prompt(self, query: str) -> str:
+        """Prompt that determines the support action"""
+        return f"""
         Analyze this customer support query:
         Query: "{query}"
         
@@ -33,55 +34,80 @@ class SupportAgent:
             "confidence": 0.95
         }}
         """
+    
+    def _run_action(self, query: str, analysis: dict) -> tuple:
+        """Run the support tool selected by the analysis"""
+        action = analysis.get("action")
+        faq_topic = analysis.get("faq_topic")
+        frustrated = analysis.get("frustrated", False)
+        
+        # If customer is frustrated, escalate
+        if frustrated:
+            return self._escalate_to_human(query), None
+        
+        if action == "faq_answer":
+            # The FAQ index ranks whole questions, so fall back to the query when no topic was extracted
+            return self.tools.get_faq_answer(faq_topic or query), "faq"
         
-        analysis_result = self.llm._call(analysis_prompt)
+        elif action == "create_ticket":
+            # For demo, create ticket with dummy email
+            result = self.tools.create_support_ticket(
+                "customer@email.com", 
+                "general_inquiry", 
+                query
+            )
+            return result, "ticket"
         
-        try:
-            analysis = json.loads(analysis_result)
-            action = analysis.get("action")
-            faq_topic = analysis.get("faq_topic")
-            frustrated = analysis.get("frustrated", False)
-            
-            # If customer is frustrated, escalate
-            if frustrated:
-                return self._escalate_to_human(query)
-            
-            if action == "faq_answer" and faq_topic:
-                result = self.tools.get_faq_answer(faq_topic)
-                return self._format_response(query, result, "faq")
-            
-            elif action == "create_ticket":
-                # For demo, create ticket with dummy email
-                result = self.tools.create_support_ticket(
-                    "customer@email.com", 
-                    "general_inquiry", 
-                    query
-                )
-                return self._format_response(query, result, "ticket")
-            
-            elif action == "escalate":
-                return self._escalate_to_human(query)
-            
-            else:
-                return self._provide_general_help(query)
-                
-        except json.JSONDecodeError:
-            return self._provide_general_help(query)
+        elif action == "escalate":
+            return self._escalate_to_human(query), None
+        
+        else:
+            return self._provide_general_help(query), None
+    
+    async def _arun_action(self, query: str, analysis: dict) -> tuple:
+        """Async variant of _run_action; ticket writes are awaited rather than blocking the loop"""
+        action = analysis.get("action")
+        
+        if analysis.get("frustrated", False) or action == "escalate":
+            return await self._aescalate_to_human(query), None
+        
+        if action == "create_ticket":
+            result = await self.tools.acreate_support_ticket(
+                "customer@email.com",
+                "general_inquiry",
+                query
+            )
+            return result, "ticket"
+        
+        return self._run_action(query, analysis)
     
     def _escalate_to_human(self, query: str) -> dict:
         """Escalate to human agent"""
-        response = """I understand you need additional assistance. I'm connecting you with a human agent who can better help you with your concern. 
-
-In the meantime, I've created a priority support ticket for you. A human representative will contact you within 2 hours.
-
-Is there anything else I can help you with while you wait?"""
-        
-        # Create escalated ticket
         ticket_result = self.tools.create_support_ticket(
             "customer@email.com",
             "escalated",
             f"Escalated query: {query}"
         )
+        if ticket_result.get("success"):
+            self.tools.escalate_to_human(ticket_result["ticket_id"])
+        return self._escalation_response(ticket_result)
+    
+    async def _aescalate_to_human(self, query: str) -> dict:
+        ticket_result = await self.tools.acreate_support_ticket(
+            "customer@email.com",
+            "escalated",
+            f"Escalated query: {query}"
+        )
+        if ticket_result.get("success"):
+            await self.tools.aescalate_to_human(ticket_result["ticket_id"])
+        return self._escalation_response(ticket_result)
+    
+    def _escalation_response(self, ticket_result: dict) -> dict:
+        response = """I understand you need additional assistance. I'm connecting you with a human agent who can better help you with your concern. 
+
+In the meantime, I've created a priority support ticket for you. A human representative will contact you within 2 hours.
+
+Is there anything else I can help you with while you wait?"""
         
         return {
             "agent": self.name,
@@ -91,10 +117,9 @@ Is there anything else I can help you with while you wait?"""
             "success": True
         }
     
-    def _format_response(self, query: str, result: dict, response_type: str) -> dict:
-        """Format the response using LLM"""
-        
-        prompt = f"""
+    def _format_prompt(self, query: str, result: dict, response_type: str) -> str:
+        """Prompt that turns the tool result into a customer reply"""
+        return f"""
         Format a helpful support response based on this data:
         
         Customer Query: "{query}"
@@ -104,15 +129,6 @@ Is there anything else I can help you with while you wait?"""
         Create a friendly, helpful support response. Be empathetic and professional.
         If providing FAQ info, be comprehensive but concise.
         """
-        
-        response = self.llm._call(prompt)
-        
-        return {
-            "agent": self.name,
-            "response": response,
-            "data": result,
-            "success": result.get("success", True)
-        }
     
     def _provide_general_help(self, query: str) -> dict:
         """Provide general support help"""
@@ -1,18 +1,17 @@
 from groq_llm import GroqLLM
+from agents.base_agent import BaseAgent
 from tools.weather_tools import WeatherTools
-import json
 
-class WeatherAgent:
+class WeatherAgent(BaseAgent):
     def __init__(self):
         self.llm = GroqLLM()
         self.tools = WeatherTools()
         self.name = "Weather Agent"
         self.description = "Provides current weather information and forecasts"
     
-    def process(self, query: str, context: dict = None) -> dict:
-        """Process weather-related queries"""
-        
-        analysis_prompt = f"""
+    def _analysis_prompt(self, query: str) -> str:
+        """Prompt that extracts the location and request type"""
+        return f"""
         Analyze this weather query and extract information:
         Query: "{query}"
         
@@ -34,27 +33,44 @@ class WeatherAgent:
             "confidence": 0.95
         }}
         """
+    
+    def _on_analysis_error(self, query: str) -> dict:
+        return self._ask_for_location(query)
+    
+    def _run_action(self, query: str, analysis: dict) -> tuple:
+        """Fetch weather for the analysed location; responses are formatted locally"""
+        location, request_type, forecast_days = self._read_analysis(analysis)
         
-        analysis_result = self.llm._call(analysis_prompt)
+        if location:
+            if request_type == "forecast":
+                result = self.tools.get_weather_forecast(location, forecast_days)
+                return self._format_forecast_response(query, result, location), None
+            else:
+                result = self.tools.get_weather(location)
+                return self._format_weather_response(query, result, location), None
+        else:
+            return self._ask_for_location(query), None
+    
+    async def _arun_action(self, query: str, analysis: dict) -> tuple:
+        location, request_type, forecast_days = self._read_analysis(analysis)
         
-        try:
-            analysis = json.loads(analysis_result)
-            location = analysis.get("location")
-            request_type = analysis.get("request_type", "current_weather")
-            forecast_days = analysis.get("forecast_days", 5)
-            
-            if location:
-                if request_type == "forecast":
-                    result = self.tools.get_weather_forecast(location, forecast_days)
-                    return self._format_forecast_response(query, result, location)
-                else:
-                    result = self.tools.get_weather(location)
-                    return self._format_weather_response(query, result, location)
+        if location:
+            if request_type == "forecast":
+                result = await self.tools.aget_weather_forecast(location, forecast_days)
+                return self._format_forecast_response(query, result, location), None
             else:
-                return self._ask_for_location(query)
-                
-        except json.JSONDecodeError:
-            return self._ask_for_location(query)
+                result = await self.tools.aget_weather(location)
+                return self._format_weather_response(query, result, location), None
+        else:
+            return self._ask_for_location(query), None
+    
+    def _read_analysis(self, analysis: dict) -> tuple:
+        """Extract (location, request_type, forecast_days) from an analysis"""
+        location = analysis.get("location")
+        # Fused router analyses carry the request type in "action"
+        request_type = analysis.get("request_type") or analysis.get("action") or "current_weather"
+        forecast_days = analysis.get("forecast_days") or 5
+        return location, request_type, forecast_days
     
     def _format_weather_response(self, query: str, result: dict, location: str) -> dict:
         """Format the current weather response"""
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import time
+from typing import Dict, Iterator, Optional
+
+from llm_scheduler import priority_scope
+from router_agent import RouterAgent
+from session_store import SessionStore
+
+def read_queries(in_path: str) -> Iterator[dict]:
+    """Stream query records from a JSONL file without loading it into memory"""
+    with open(in_path, "r", encoding="utf-8") as infile:
+        for line_number, line in enumerate(infile, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield {"line": line_number, "error": f"Invalid JSON: {str(e)}"}
+                continue
+
+            if isinstance(record, str):
+                record = {"query": record}
+            elif not isinstance(record, dict):
+                yield {"line": line_number, "error": "Expected a JSON object or string"}
+                continue
+            record["line"] = line_number
+            yield record
+
+class BatchRunner:
+    """
+    Runs JSONL query files through the router with bounded concurrency
+    """
+
+    def __init__(self, router: RouterAgent = None, concurrency: int = None, history_size: int = 5):
+        self.router = router or RouterAgent()
+        self.concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "16"))
+        self.history_size = history_size
+        # Replays can carry millions of sessions; only recent ones need their history
+        self.sessions = SessionStore(max_turns=history_size, ttl=float("inf"))
+        self.stats = {"processed": 0, "failed": 0, "total_seconds": 0.0}
+
+    def run(self, in_path: str, out_path: str) -> dict:
+        """Process every line of in_path and write one result line per query to out_path"""
+        return asyncio.run(self.arun(in_path, out_path))
+
+    async def arun(self, in_path: str, out_path: str) -> dict:
+        start_time = time.perf_counter()
+        slots = asyncio.Semaphore(self.concurrency)
+        # Last scheduled task per session so a session's queries run in input order
+        session_tails: Dict[str, asyncio.Task] = {}
+        pending = set()
+
+        with open(out_path, "w", encoding="utf-8") as outfile:
+            for record in read_queries(in_path):
+                # Taking the slot before scheduling keeps at most `concurrency` records in memory
+                await slots.acquire()
+
+                session_id = record.get("session_id")
+                previous = session_tails.get(session_id) if session_id is not None else None
+                task = asyncio.create_task(self._run_record(record, previous, slots, outfile))
+
+                if session_id is not None:
+                    session_tails[session_id] = task
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+                task.add_done_callback(lambda done, sid=session_id: self._forget_session(session_tails, sid, done))
+
+            if pending:
+                await asyncio.gather(*pending)
+
+        self.stats["total_seconds"] = round(time.perf_counter() - start_time, 3)
+        return dict(self.stats)
+
+    async def _run_record(self, record: dict, previous: Optional[asyncio.Task],
+                          slots: asyncio.Semaphore, outfile) -> None:
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            result = await self._process(record)
+        finally:
+            slots.release()
+
+        outfile.write(json.dumps(result, default=str) + "\n")
+        outfile.flush()
+
+    async def _process(self, record: dict) -> dict:
+        result = {
+            "line": record["line"],
+            "id": record.get("id", record.get("request_id")),
+            "session_id": record.get("session_id")
+        }
+
+        query = record.get("query") or record.get("message") or record.get("body")
+        if record.get("error") or not query:
+            self.stats["failed"] += 1
+            result.update({"success": False, "error": record.get("error", "No query in record")})
+            return result
+
+        session_id = record.get("session_id")
+        if session_id is not None:
+            self.sessions.append(session_id, "user", query)
+            history = self.sessions.history(session_id)
+        else:
+            # Queries without a session id are independent
+            history = [{"role": "user", "message": query}]
+
+        start_time = time.perf_counter()
+        try:
+            # Interactive chats sharing the process keep precedence over replayed traffic
+            with priority_scope("batch"):
+                response = await self.router.aroute_query(query, {"history": history})
+        except Exception as e:
+            self.stats["failed"] += 1
+            result.update({
+                "query": query,
+                "success": False,
+                "error": str(e),
+                "elapsed_ms": round((time.perf_counter() - start_time) * 1000, 2)
+            })
+            return result
+
+        elapsed_ms = round((time.perf_counter() - start_time) * 1000, 2)
+        if session_id is not None:
+            self.sessions.append(session_id, "assistant", response.get("response", ""),
+                                 response.get("agent", "Unknown"))
+
+        self.stats["processed"] += 1
+        result.update({
+            "query": query,
+            "agent": response.get("agent", "Unknown"),
+            "response": response.get("response", ""),
+            "success": response.get("success", False),
+            "routing": response.get("routing"),
+            "elapsed_ms": elapsed_ms
+        })
+        return result
+
+    def _forget_session(self, session_tails: dict, session_id: Optional[str], task: asyncio.Task):
+        if session_id is not None and session_tails.get(session_id) is task:
+            del session_tails[session_id]
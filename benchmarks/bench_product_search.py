@@ -0,0 +1,130 @@
+"""
+Product search latency against catalog size.
+
+    python -m benchmarks.bench_product_search --sizes 1000 10000 100000 1000000
+
+Compares the inverted index behind ProductTools.search_products with the
+previous substring scan (skipped above --scan-limit products). With
+--backend sqlite each catalog is bulk-imported into a temporary FTS5 store.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+from tools.product_store import SQLiteProductStore
+from tools.product_tools import ProductTools
+
+ADJECTIVES = ["gaming", "wireless", "portable", "smart", "premium", "compact", "ergonomic",
+              "waterproof", "bluetooth", "mechanical", "ultra", "professional", "mini", "4k"]
+NOUNS = ["laptop", "headphones", "smartphone", "keyboard", "mouse", "monitor", "speaker",
+         "camera", "tablet", "charger", "router", "watch", "backpack", "desk", "chair"]
+CATEGORIES = ["Electronics", "Computers", "Audio", "Accessories", "Furniture", "Wearables"]
+FEATURES = ["noise cancellation", "long battery life", "rgb lighting", "fast charging",
+            "high resolution display", "lightweight design", "usb-c", "dual band wifi"]
+
+QUERIES = ["gaming laptop", "wireless headphones", "bluetooth speaker", "ergonomic chair",
+           "4k monitor", "smart watch", "portable charger", "mechanical keyboard", "camera",
+           "noise cancellation headphones"]
+
+def synthetic_catalog(size: int, seed: int = 42) -> Dict[str, dict]:
+    """Deterministic catalog in the ProductTools product shape"""
+    rng = random.Random(seed)
+    products = {}
+    for number in range(1, size + 1):
+        product_id = f"PROD{number:07d}"
+        noun = rng.choice(NOUNS)
+        name = f"{rng.choice(ADJECTIVES).title()} {rng.choice(ADJECTIVES).title()} {noun.title()}"
+        quantity = rng.choice([0, rng.randint(1, 200)])
+        products[product_id] = {
+            "id": product_id,
+            "name": name,
+            "category": rng.choice(CATEGORIES),
+            "price": round(rng.uniform(5, 3000), 2),
+            "in_stock": quantity > 0,
+            "stock_quantity": quantity,
+            "description": f"{name} with {rng.choice(FEATURES)} and {rng.choice(FEATURES)}"
+        }
+    return products
+
+def linear_scan(products: Dict[str, dict], query: str) -> List[dict]:
+    """The original substring scan, kept as the baseline"""
+    query_lower = query.lower()
+    return [
+        product for product in products.values()
+        if (query_lower in product["name"].lower() or
+            query_lower in product["category"].lower() or
+            query_lower in product["description"].lower())
+    ]
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def time_queries(search, repeats: int) -> dict:
+    samples = []
+    for _ in range(repeats):
+        for query in QUERIES:
+            start = time.perf_counter()
+            search(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(percentile(samples, 0.95), 3),
+        "mean_ms": round(statistics.mean(samples), 3)
+    }
+
+def build_tools(products: Dict[str, dict], backend: str, workdir: str) -> ProductTools:
+    if backend == "sqlite":
+        db_path = os.path.join(workdir, f"catalog_{len(products)}.db")
+        SQLiteProductStore(db_path).import_products(products.values())
+        return ProductTools(db_path=db_path)
+    return ProductTools(products)
+
+def run(sizes: List[int], repeats: int, limit: int, scan_limit: int, backend: str = "memory") -> List[dict]:
+    results = []
+    workdir = tempfile.mkdtemp(prefix="bench_products_")
+    for size in sizes:
+        products = synthetic_catalog(size)
+
+        start = time.perf_counter()
+        tools = build_tools(products, backend, workdir)
+        build_seconds = time.perf_counter() - start
+
+        row = {
+            "backend": backend,
+            "catalog_size": size,
+            "index_build_s": round(build_seconds, 3),
+            "index": time_queries(lambda query: tools.search_products(query, limit=limit), repeats)
+        }
+        if size <= scan_limit:
+            row["scan"] = time_queries(lambda query: linear_scan(products, query), repeats)
+        results.append(row)
+
+        scan_p50 = row["scan"]["p50_ms"] if "scan" in row else None
+        print(f"{size:>9} products | build {row['index_build_s']:>7.3f}s | "
+              f"index p50 {row['index']['p50_ms']:>9.3f} ms p95 {row['index']['p95_ms']:>9.3f} ms | "
+              f"scan p50 {scan_p50 if scan_p50 is not None else '-':>9} ms")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000, 1000000])
+    parser.add_argument("--repeats", type=int, default=5, help="passes over the query set per size")
+    parser.add_argument("--limit", type=int, default=20, help="page size requested from the index")
+    parser.add_argument("--scan-limit", type=int, default=100000, help="largest catalog to run the scan baseline on")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.repeats, args.limit, args.scan_limit, args.backend)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as outfile:
+            json.dump(results, outfile, indent=2)
+
+if __name__ == "__main__":
+    main()
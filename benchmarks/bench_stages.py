@@ -0,0 +1,230 @@
+"""
+Per-stage latency and allocation benchmark for the chat pipeline.
+
+    python -m benchmarks.bench_stages --catalog-size 100000 --faq-size 5000 --output stages.json
+    python -m benchmarks.bench_stages --compare stages.json --threshold 0.15
+
+Every LLM call goes to a deterministic in-process FakeLLM, so the numbers cover
+only this codebase. Each stage is timed call by call (p50/p95/p99), then re-run
+under tracemalloc for the bytes allocated per call. With --compare, stages whose
+p50 or p95 grew by more than --threshold are flagged and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("LLM_CACHE_ENABLED", "false")
+
+from agents.base_agent import extract_json
+from agents.response_templates import get_renderer
+from benchmarks.bench_product_search import synthetic_catalog
+from benchmarks.fake_llm import install_fake_llm
+from benchmarks.stub_servers import forecast_payload, rule_based_completion
+from router_agent import RouterAgent
+from tools.faq_index import FAQIndex
+from tools.product_tools import ProductTools
+
+QUERIES = {
+    "order": ["Where is my order ORD001?", "Track ORD002 please", "Show all orders for CUST001"],
+    "product": ["Show me wireless headphones", "Do you have gaming laptops?", "Is PROD002 in stock?"],
+    "support": ["What is your return policy?", "How long does shipping take?", "My charger is broken"],
+    "weather": ["What's the weather in London?", "5 day forecast for Tokyo"]
+}
+
+FAQ_WORDS = ["order", "refund", "shipping", "delivery", "warranty", "account", "password", "payment",
+             "card", "invoice", "return", "exchange", "gift", "coupon", "tracking", "address", "store",
+             "pickup", "battery", "screen", "charger", "subscription", "cancel", "damaged", "size"]
+
+def synthetic_faq(size: int, seed: int = 7) -> List[dict]:
+    rng = random.Random(seed)
+    articles = []
+    for number in range(size):
+        topic = " ".join(rng.sample(FAQ_WORDS, 3))
+        articles.append({
+            "id": f"FAQ{number:05d}",
+            "question": f"How do I handle {topic}?",
+            "tags": rng.sample(FAQ_WORDS, 2),
+            "answer": " ".join(rng.choices(FAQ_WORDS, k=60))
+        })
+    return articles
+
+def synthetic_orders(size: int, seed: int = 11) -> List[dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": f"ORD{number:07d}",
+            "customer_id": f"CUST{number % 10000:05d}",
+            "items": [{"name": "Item", "quantity": 1, "price": 10.0}],
+            "status": rng.choice(["processing", "shipped", "delivered"]),
+            "tracking_number": f"TRK{number:09d}",
+            "order_date": f"2024-{1 + number % 12:02d}-{1 + number % 28:02d}",
+            "estimated_delivery": "2024-12-31"
+        }
+        for number in range(size)
+    ]
+
+# Measurement
+
+def percentile(samples: List[float], fraction: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def measure(fn: Callable[[int], object], iterations: int, alloc_iterations: int) -> dict:
+    """Time fn(i) call by call, then sample its allocations under tracemalloc"""
+    for i in range(min(iterations, 20)):
+        fn(i)
+
+    samples = []
+    for i in range(iterations):
+        start = time.perf_counter_ns()
+        fn(i)
+        samples.append((time.perf_counter_ns() - start) / 1000)
+
+    # tracemalloc slows every allocation, so it runs separately from the timed pass
+    tracemalloc.start()
+    peaks = []
+    for i in range(alloc_iterations):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn(i)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    return {
+        "iterations": iterations,
+        "p50_us": round(percentile(samples, 0.50), 2),
+        "p95_us": round(percentile(samples, 0.95), 2),
+        "p99_us": round(percentile(samples, 0.99), 2),
+        "mean_us": round(statistics.mean(samples), 2),
+        "alloc_peak_bytes": int(statistics.median(peaks)) if peaks else 0
+    }
+
+def cycle(items: list) -> Callable[[int], object]:
+    return lambda i: items[i % len(items)]
+
+def build_stages(router: RouterAgent) -> Dict[str, Callable[[int], object]]:
+    all_queries = [query for queries in QUERIES.values() for query in queries]
+    query = cycle(all_queries)
+    routing_completions = [rule_based_completion(router._routing_prompt(q)) for q in all_queries]
+    analysis_completions = [
+        "Sure, here is the analysis:\n" + rule_based_completion(router.agents[agent]._analysis_prompt(q))
+        for agent, queries in QUERIES.items() for q in queries
+    ]
+    forecast = forecast_payload("London", 40)
+
+    order_tools = router.agents["order"].tools
+    product_tools = router.agents["product"].tools
+    support_tools = router.agents["support"].tools
+    weather_tools = router.agents["weather"].tools
+    renderer = get_renderer()
+    order_result = order_tools.get_order_status("ORD001")
+    search_result = product_tools.search_products("wireless headphones", limit=5)
+    faq_result = support_tools.get_faq_answer("return policy")
+
+    stages = {
+        "pre_router": lambda i: router.pre_router.classify(query(i)),
+        "routing_prompt": lambda i: router._routing_prompt(query(i)),
+        "fused_prompt": lambda i: router._fused_route_prompt(query(i)),
+        "parse_routing_json": lambda i: json.loads(routing_completions[i % len(routing_completions)]),
+        "extract_json": lambda i: json.loads(extract_json(analysis_completions[i % len(analysis_completions)])),
+        "tool_search_products": lambda i: product_tools.search_products(
+            cycle(["wireless headphones", "gaming laptop", "smart watch", "usb-c charger"])(i), limit=20),
+        "tool_get_faq_answer": lambda i: support_tools.get_faq_answer(
+            cycle(["return policy", "shipping delivery time", "warranty for damaged screen", "payment card"])(i)),
+        "tool_get_order_status": lambda i: order_tools.get_order_status(f"ORD{i % 1000:07d}"),
+        "tool_format_forecast": lambda i: weather_tools._format_forecast_response(forecast, 5),
+        "render_order_status": lambda i: renderer.render("order_status", order_result),
+        "render_search": lambda i: renderer.render("search", search_result),
+        "render_faq": lambda i: renderer.render("faq", faq_result),
+        "route_query": lambda i: router.route_query(query(i))
+    }
+    for agent_name, queries in QUERIES.items():
+        agent = router.agents[agent_name]
+        stages[f"process_{agent_name}"] = (lambda agent, queries: lambda i: agent.process(queries[i % len(queries)]))(agent, queries)
+    return stages
+
+def build_router(catalog_size: int, faq_size: int, order_count: int, render_mode: str) -> RouterAgent:
+    router = RouterAgent(render_mode=render_mode)
+    install_fake_llm(router)
+    router.agents["product"].tools = ProductTools(synthetic_catalog(catalog_size))
+    router.agents["support"].tools.faq_index = FAQIndex.build(synthetic_faq(faq_size))
+    router.agents["order"].tools.store.upsert_orders(synthetic_orders(order_count))
+    return router
+
+def compare(results: dict, baseline: dict, threshold: float) -> List[dict]:
+    """Stages whose p50 or p95 regressed by more than threshold against the baseline"""
+    regressions = []
+    for stage, current in results["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous:
+            continue
+        for metric in ("p50_us", "p95_us"):
+            if previous[metric] > 0 and current[metric] > previous[metric] * (1 + threshold):
+                regressions.append({
+                    "stage": stage,
+                    "metric": metric,
+                    "baseline": previous[metric],
+                    "current": current[metric],
+                    "change": round(current[metric] / previous[metric] - 1, 3)
+                })
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--catalog-size", type=int, default=10000)
+    parser.add_argument("--faq-size", type=int, default=1000)
+    parser.add_argument("--orders", type=int, default=10000)
+    parser.add_argument("--iterations", type=int, default=2000, help="timed calls per stage")
+    parser.add_argument("--alloc-iterations", type=int, default=50, help="calls per stage under tracemalloc")
+    parser.add_argument("--render-mode", choices=["llm", "template", "template_fallback"], default="template_fallback")
+    parser.add_argument("--stages", nargs="+", help="only run these stages")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="baseline JSON from an earlier run")
+    parser.add_argument("--threshold", type=float, default=0.15, help="allowed slowdown before a stage is flagged")
+    args = parser.parse_args()
+
+    router = build_router(args.catalog_size, args.faq_size, args.orders, args.render_mode)
+    stages = build_stages(router)
+    selected = args.stages or list(stages)
+
+    results = {
+        "params": {
+            "catalog_size": args.catalog_size,
+            "faq_size": args.faq_size,
+            "orders": args.orders,
+            "iterations": args.iterations,
+            "render_mode": args.render_mode
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "stages": {}
+    }
+    for name in selected:
+        row = results["stages"][name] = measure(stages[name], args.iterations, args.alloc_iterations)
+        print(f"{name:<24} p50 {row['p50_us']:>10.2f} us  p95 {row['p95_us']:>10.2f} us  "
+              f"p99 {row['p99_us']:>10.2f} us  alloc {row['alloc_peak_bytes']:>9} B")
+
+    regressions = []
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as infile:
+            regressions = compare(results, json.load(infile), args.threshold)
+        results["regressions"] = regressions
+        for regression in regressions:
+            print(f"REGRESSION {regression['stage']} {regression['metric']}: "
+                  f"{regression['baseline']} -> {regression['current']} us (+{regression['change']:.0%})")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as outfile:
+            json.dump(results, outfile, indent=2)
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
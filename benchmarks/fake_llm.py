@@ -0,0 +1,49 @@
+"""
+In-process stand-in for GroqLLM, answering with the stub server's rule-based completions.
+"""
+import asyncio
+import re
+import time
+from typing import Iterator, List, Optional
+
+from benchmarks.stub_servers import rule_based_completion
+
+class FakeLLM:
+    """
+    Deterministic GroqLLM replacement with an optional fixed latency
+    """
+
+    def __init__(self, latency_ms: float = 0):
+        self.latency = latency_ms / 1000
+        self.calls = 0
+
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, use_cache: bool = True,
+              priority: str = "interactive", **kwargs) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return rule_based_completion(prompt)
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, use_cache: bool = True,
+                     priority: str = "interactive", **kwargs) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return rule_based_completion(prompt)
+
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        yield from re.findall(r"\S+\s*", self._call(prompt))
+
+    def get_cache_stats(self) -> dict:
+        return {}
+
+    def get_scheduler_stats(self) -> dict:
+        return {"granted": self.calls}
+
+def install_fake_llm(router, latency_ms: float = 0) -> FakeLLM:
+    """Point a RouterAgent and all of its agents at one FakeLLM"""
+    llm = FakeLLM(latency_ms)
+    router.llm = llm
+    for agent in router.agents.values():
+        agent.llm = llm
+    return llm
@@ -0,0 +1,331 @@
+"""
+Open-loop load generator and trace replayer for EnhancedEcommerceService.
+
+    python -m benchmarks.load_test --backend stub --qps 5 10 20 40 --duration 30 --report load
+    python -m benchmarks.load_test --trace queries.jsonl --qps 20 --report replay
+
+Arrivals follow a Poisson process at each target QPS (or the trace's own "t"
+offsets with --trace-timing), independent of how fast replies come back, and
+latency is measured from the scheduled arrival so queueing shows up in it.
+Requests of one simulated session run one at a time, in order.
+
+Backends: "fake" answers LLM calls in-process, "stub" starts the offline Groq
+and OpenWeatherMap stub servers, "live" uses whatever the environment points at.
+With fake and stub backends the client-side Groq rate limits and the LLM response
+cache are off unless --rpm/--tpm/--llm-cache say otherwise, so the run measures
+the service rather than the limiter's queue or cache hits. Each step reports the
+LLM scheduler's grants, retries and queueing next to the latency figures.
+Writes <report>.json and <report>.html.
+"""
+import argparse
+import html
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List
+
+from benchmarks.bench_product_search import percentile
+
+QUERY_MIX = {
+    "order": (0.35, [
+        "Where is my order ORD{n:03d}?", "Track my order ORD{n:03d}", "Cancel order ORD{n:03d}",
+        "Show all orders for CUST{n:03d}", "When will my package arrive?"
+    ]),
+    "product": (0.30, [
+        "Show me wireless headphones", "Do you have gaming laptops?", "Is PROD00{d} in stock?",
+        "Tell me about PROD00{d}", "I'm looking for a smartphone under $800"
+    ]),
+    "support": (0.20, [
+        "What is your return policy?", "How long does shipping take?", "Do you accept PayPal?",
+        "My laptop arrived broken, I need help", "I'm really frustrated, let me talk to a human"
+    ]),
+    "weather": (0.15, [
+        "What's the weather in {city}?", "5 day forecast for {city}", "Will it rain in {city} tomorrow?"
+    ])
+}
+
+CITIES = ["London", "Paris", "Tokyo", "New York", "NYC", "Berlin", "Mumbai", "Sydney", "Toronto", "Madrid"]
+
+def synthetic_queries(seed: int = 0) -> Iterator[dict]:
+    """Endless mix of order, product, support and weather queries"""
+    rng = random.Random(seed)
+    kinds = list(QUERY_MIX)
+    weights = [QUERY_MIX[kind][0] for kind in kinds]
+    while True:
+        kind = rng.choices(kinds, weights)[0]
+        template = rng.choice(QUERY_MIX[kind][1])
+        query = template.format(n=rng.randint(1, 3), d=rng.randint(1, 3), city=rng.choice(CITIES))
+        yield {"query": query, "kind": kind}
+
+def trace_queries(path: str) -> List[dict]:
+    """Trace records: "query" (or a request's "title"/"body"), optional "session_id" and "t" offset"""
+    records = []
+    with open(path, "r", encoding="utf-8") as infile:
+        for line in infile:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"query": record}
+            query = record.get("query") or record.get("title") or record.get("body")
+            if query:
+                records.append({**record, "query": query})
+    return records
+
+# Service under test
+
+def build_service(backend: str, llm_latency_ms: float, weather_latency_ms: float,
+                  rpm: float = None, tpm: float = None, llm_cache: bool = None):
+    """
+    EnhancedEcommerceService wired to the chosen backend; returns (service, stub servers).
+
+    rpm/tpm/llm_cache override GROQ_RPM, GROQ_TPM and LLM_CACHE_ENABLED; left as None,
+    the offline backends run without limits or cache and "live" keeps the environment's.
+    """
+    settings = {} if backend == "live" else {"GROQ_RPM": "0", "GROQ_TPM": "0", "LLM_CACHE_ENABLED": "false"}
+    if rpm is not None:
+        settings["GROQ_RPM"] = f"{rpm:g}"
+    if tpm is not None:
+        settings["GROQ_TPM"] = f"{tpm:g}"
+    if llm_cache is not None:
+        settings["LLM_CACHE_ENABLED"] = "true" if llm_cache else "false"
+    # Read when the process-wide scheduler and cache are first built, inside the service
+    os.environ.update(settings)
+
+    stubs = []
+    if backend == "stub":
+        from benchmarks.stub_servers import StubBehavior, start_groq_stub, start_weather_stub
+        stubs = [
+            start_groq_stub(StubBehavior(latency_ms=llm_latency_ms)),
+            start_weather_stub(StubBehavior(latency_ms=weather_latency_ms))
+        ]
+        os.environ.update({
+            "GROQ_API_KEY": "stub",
+            "GROQ_BASE_URL": stubs[0].url,
+            "OPENWEATHERMAP_API_KEY": "stub",
+            "OPENWEATHERMAP_BASE_URL": stubs[1].url
+        })
+    elif backend == "fake":
+        os.environ.setdefault("GROQ_API_KEY", "stub")
+
+    from main import EnhancedEcommerceService
+    service = EnhancedEcommerceService()
+    if backend == "fake":
+        from benchmarks.fake_llm import install_fake_llm
+        install_fake_llm(service.router, llm_latency_ms)
+    return service, stubs
+
+# Open-loop driver
+
+class LoadGenerator:
+    """
+    Fires requests at scheduled arrival times and records one sample per request
+    """
+
+    def __init__(self, service, sessions: int = 100, workers: int = 64, seed: int = 0):
+        self.service = service
+        self.sessions = sessions
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="load")
+        self.rng = random.Random(seed)
+        self._session_locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def run_step(self, records: Iterator[dict], qps: float, duration: float,
+                 trace_timing: bool = False) -> List[dict]:
+        """Drive one QPS step open-loop; returns that step's samples once all replies are in"""
+        start = time.perf_counter()
+        futures = []
+        arrival = 0.0
+        for record in records:
+            if trace_timing and "t" in record:
+                arrival = float(record["t"])
+            else:
+                arrival += self.rng.expovariate(qps)
+            if arrival >= duration:
+                break
+
+            delay = start + arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            session_id = record.get("session_id") or f"session-{self.rng.randrange(self.sessions)}"
+            futures.append(self.pool.submit(self._one, record, session_id, start + arrival, start, qps))
+
+        return [future.result() for future in futures]
+
+    def _session_lock(self, session_id: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._session_locks.get(session_id)
+            if lock is None:
+                lock = self._session_locks[session_id] = threading.Lock()
+            return lock
+
+    def _one(self, record: dict, session_id: str, scheduled: float, step_start: float, qps: float) -> dict:
+        sample = {"qps": qps, "scheduled": round(scheduled - step_start, 4), "kind": record.get("kind")}
+        with self._session_lock(session_id):
+            try:
+                response = self.service.chat_with_analytics(record["query"], session_id=session_id)
+                sample["agent"] = response.get("agent")
+                sample["success"] = bool(response.get("success"))
+                # The router's degraded replies: LLM unavailable, or an unusable routing decision
+                sample["fallback"] = "error" in response or "routing" not in response
+                sample["error"] = None
+            except Exception as e:
+                sample.update(agent=None, success=False, fallback=False, error=f"{type(e).__name__}: {e}")
+        finished = time.perf_counter()
+        sample["latency_ms"] = round((finished - scheduled) * 1000, 3)
+        sample["finished"] = round(finished - step_start, 4)
+        return sample
+
+# Reporting
+
+def summarize(samples: List[dict], duration: float) -> dict:
+    latencies = [sample["latency_ms"] for sample in samples]
+    if not latencies:
+        return {"requests": 0}
+    elapsed = max(duration, max(sample["finished"] for sample in samples))
+    return {
+        "requests": len(samples),
+        "achieved_qps": round(len(samples) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50), 2),
+        "p90_ms": round(percentile(latencies, 0.90), 2),
+        "p99_ms": round(percentile(latencies, 0.99), 2),
+        "max_ms": round(max(latencies), 2),
+        "mean_ms": round(statistics.mean(latencies), 2),
+        "error_rate": round(sum(1 for sample in samples if sample["error"]) / len(samples), 4),
+        "fallback_rate": round(sum(1 for sample in samples if sample["fallback"]) / len(samples), 4),
+        "unsuccessful_rate": round(sum(1 for sample in samples if not sample["success"]) / len(samples), 4)
+    }
+
+SCHEDULER_COUNTERS = ("granted", "retries", "rate_limited", "failures", "queued_seconds")
+
+def scheduler_step(before: dict, after: dict) -> dict:
+    """LLM scheduler activity between two get_scheduler_stats() snapshots"""
+    step = {key: round(after[key] - before.get(key, 0), 3) for key in SCHEDULER_COUNTERS if key in after}
+    if step.get("granted"):
+        step["mean_queued_ms"] = round(step.get("queued_seconds", 0) / step["granted"] * 1000, 2)
+    if "max_queue_depth" in after:
+        step["max_queue_depth"] = after["max_queue_depth"]
+    return step
+
+def timeline(samples: List[dict], bucket: float = 1.0) -> List[dict]:
+    """Completions, errors and latency percentiles per bucket of completion time"""
+    buckets: Dict[int, List[dict]] = {}
+    for sample in samples:
+        buckets.setdefault(int(sample["finished"] // bucket), []).append(sample)
+    return [
+        {
+            "t": round(index * bucket, 2),
+            "completed": len(items),
+            "throughput": round(len(items) / bucket, 2),
+            "errors": sum(1 for item in items if item["error"]),
+            "p50_ms": round(percentile([item["latency_ms"] for item in items], 0.50), 2),
+            "p99_ms": round(percentile([item["latency_ms"] for item in items], 0.99), 2)
+        }
+        for index, items in sorted(buckets.items())
+    ]
+
+def _polyline(points: List[tuple], width: int, height: int, color: str) -> str:
+    if not points:
+        return ""
+    max_x = max(x for x, _ in points) or 1
+    max_y = max(y for _, y in points) or 1
+    coordinates = " ".join(f"{40 + x / max_x * (width - 50):.1f},{height - 20 - y / max_y * (height - 40):.1f}"
+                           for x, y in points)
+    return (f'<polyline fill="none" stroke="{color}" stroke-width="2" points="{coordinates}"/>'
+            f'<text x="{width - 10}" y="15" text-anchor="end" fill="{color}">max {max_y:g}</text>')
+
+def render_html(report: dict) -> str:
+    columns = ("requests", "achieved_qps", "p50_ms", "p90_ms", "p99_ms", "max_ms", "error_rate", "fallback_rate")
+    scheduler_columns = ("granted", "retries", "rate_limited", "mean_queued_ms")
+    rows = "".join(
+        f"<tr><td>{step['target_qps']:g}</td>"
+        + "".join(f"<td>{html.escape(str(step['summary'].get(key, '')))}</td>" for key in columns)
+        + "".join(f"<td>{html.escape(str(step.get('scheduler', {}).get(key, '')))}</td>" for key in scheduler_columns)
+        + "</tr>"
+        for step in report["steps"]
+    )
+    charts = []
+    for step in report["steps"]:
+        points = step["timeline"]
+        charts.append(
+            f"<h3>{step['target_qps']:g} QPS</h3>"
+            f'<svg width="640" height="200" style="border:1px solid #ccc">'
+            f"{_polyline([(p['t'], p['throughput']) for p in points], 640, 200, '#1f77b4')}"
+            f"</svg>"
+            f'<svg width="640" height="200" style="border:1px solid #ccc">'
+            f"{_polyline([(p['t'], p['p99_ms']) for p in points], 640, 200, '#d62728')}"
+            f"</svg>"
+        )
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Load test report</title>
+<style>body{{font-family:sans-serif;margin:2em}}table{{border-collapse:collapse}}
+td,th{{border:1px solid #ccc;padding:4px 8px;text-align:right}}</style></head>
+<body><h1>Load test report</h1>
+<p>{html.escape(json.dumps(report["params"]))}</p>
+<table><tr><th>target QPS</th><th>requests</th><th>achieved QPS</th><th>p50 ms</th><th>p90 ms</th>
+<th>p99 ms</th><th>max ms</th><th>error rate</th><th>fallback rate</th>
+<th>LLM calls</th><th>LLM retries</th><th>LLM 429s</th><th>LLM queued ms</th></tr>{rows}</table>
+<h2>Throughput (blue, req/s) and p99 latency (red, ms) over time</h2>
+{"".join(charts)}
+</body></html>
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=["fake", "stub", "live"], default="stub")
+    parser.add_argument("--qps", type=float, nargs="+", default=[5, 10, 20], help="target rate of each step")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per step")
+    parser.add_argument("--trace", help="JSONL trace to replay instead of the synthetic mix (looped)")
+    parser.add_argument("--trace-timing", action="store_true", help="use the trace's 't' offsets as arrival times")
+    parser.add_argument("--sessions", type=int, default=200, help="simulated concurrent sessions")
+    parser.add_argument("--workers", type=int, default=64, help="threads serving requests")
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--weather-latency-ms", type=float, default=80)
+    parser.add_argument("--rpm", type=float, help="client-side Groq requests/minute (default: 0, off, for fake/stub)")
+    parser.add_argument("--tpm", type=float, help="client-side Groq tokens/minute (default: 0, off, for fake/stub)")
+    parser.add_argument("--llm-cache", action=argparse.BooleanOptionalAction, default=None,
+                        help="LLM response cache (default: off for fake/stub)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--report", default="load_report", help="report path prefix (.json and .html)")
+    args = parser.parse_args()
+
+    service, stubs = build_service(args.backend, args.llm_latency_ms, args.weather_latency_ms,
+                                   args.rpm, args.tpm, args.llm_cache)
+    generator = LoadGenerator(service, args.sessions, args.workers, args.seed)
+    trace = trace_queries(args.trace) if args.trace else None
+
+    report = {"params": vars(args), "steps": []}
+    for qps in args.qps:
+        if trace:
+            records = (trace[i % len(trace)] for i in range(10 ** 9)) if not args.trace_timing else iter(trace)
+        else:
+            records = synthetic_queries(args.seed)
+        scheduler_before = service.router.llm.get_scheduler_stats()
+        samples = generator.run_step(records, qps, args.duration, args.trace_timing)
+        summary = summarize(samples, args.duration)
+        scheduler = scheduler_step(scheduler_before, service.router.llm.get_scheduler_stats())
+        report["steps"].append({"target_qps": qps, "summary": summary, "scheduler": scheduler,
+                                "timeline": timeline(samples)})
+        print(f"{qps:>7g} QPS | {summary.get('requests', 0):>6} req | achieved {summary.get('achieved_qps', 0):>7} | "
+              f"p50 {summary.get('p50_ms', 0):>9} ms | p99 {summary.get('p99_ms', 0):>9} ms | "
+              f"errors {summary.get('error_rate', 0):.2%} | fallbacks {summary.get('fallback_rate', 0):.2%}")
+        print(f"{'':>7}       LLM {scheduler.get('granted', 0):>6} calls | retries {scheduler.get('retries', 0)} | "
+              f"429s {scheduler.get('rate_limited', 0)} | queued {scheduler.get('mean_queued_ms', 0)} ms/call | "
+              f"max queue {scheduler.get('max_queue_depth', 0)}")
+
+    with open(f"{args.report}.json", "w", encoding="utf-8") as outfile:
+        json.dump(report, outfile, indent=2)
+    with open(f"{args.report}.html", "w", encoding="utf-8") as outfile:
+        outfile.write(render_html(report))
+    print(f"Report written to {args.report}.json and {args.report}.html")
+
+    for stub in stubs:
+        stub.stop()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""
+Offline stand-ins for the Groq chat-completions API and the OpenWeatherMap
+/weather and /forecast endpoints.
+
+    python -m benchmarks.stub_servers --latency-ms 300 --error-rate 0.01 --rpm 30
+
+then point the service at them:
+
+    GROQ_API_KEY=stub GROQ_BASE_URL=http://127.0.0.1:8090 \\
+    OPENWEATHERMAP_API_KEY=stub OPENWEATHERMAP_BASE_URL=http://127.0.0.1:8091 python main.py
+
+Completions are rule-based: routing and analysis prompts get valid JSON derived
+from the query, formatting prompts get a short canned reply. Latency is
+log-normal around --latency-ms; errors, 429s and the request-rate limit are
+configurable per server.
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from llm_scheduler import TokenBucket
+from pre_router import KeywordPreRouter
+
+QUERY_PATTERN = re.compile(r'Query: "(.*)"')
+FORMAT_REPLY = ("Thanks for reaching out! I've looked into this for you and everything is in order. "
+                "Let me know if there's anything else I can help you with.")
+
+_pre_router = KeywordPreRouter()
+
+# Rule-based completions
+
+def _order_analysis(query: str) -> dict:
+    lowered = query.lower()
+    order_id = re.search(r"ORD\d+", query, re.IGNORECASE)
+    customer_id = re.search(r"CUST\d+", query, re.IGNORECASE)
+    if "cancel" in lowered:
+        action = "cancel_order"
+    elif "track" in lowered:
+        action = "track_order"
+    elif customer_id and not order_id:
+        action = "list_orders"
+    elif order_id:
+        action = "get_order_status"
+    else:
+        action = "general_info"
+    return {
+        "action": action,
+        "order_id": order_id.group(0).upper() if order_id else None,
+        "customer_id": customer_id.group(0).upper() if customer_id else None,
+        "confidence": 0.9
+    }
+
+def _product_analysis(query: str) -> dict:
+    lowered = query.lower()
+    product_id = re.search(r"PROD\d+", query, re.IGNORECASE)
+    terms = re.sub(r"\b(show|me|find|search|for|looking|i'm|im|i|want|a|an|the|do|you|have|any|some)\b", " ", lowered)
+    terms = " ".join(re.findall(r"[a-z0-9]+", terms))
+    if product_id and re.search(r"stock|availab", lowered):
+        action = "check_availability"
+    elif product_id:
+        action = "get_product_details"
+    elif terms:
+        action = "search_products"
+    else:
+        action = "general_info"
+    return {
+        "action": action,
+        "product_id": product_id.group(0).upper() if product_id else None,
+        "search_terms": terms or None,
+        "confidence": 0.9
+    }
+
+FAQ_TOPICS = [
+    ("shipping", ("shipping", "delivery", "ship ")),
+    ("returns", ("return", "refund", "exchange")),
+    ("warranty", ("warranty", "guarantee", "broken")),
+    ("payment", ("payment", "pay ", "credit card", "paypal"))
+]
+
+def _support_analysis(query: str) -> dict:
+    lowered = query.lower() + " "
+    topic = next((name for name, words in FAQ_TOPICS if any(word in lowered for word in words)), None)
+    frustrated = bool(re.search(r"angry|frustrat|disappoint|terrible|awful", lowered))
+    if re.search(r"human|manager|real person", lowered):
+        action = "escalate"
+    elif topic:
+        action = "faq_answer"
+    elif re.search(r"issue|problem|not working|ticket|damaged", lowered):
+        action = "create_ticket"
+    else:
+        action = "general_help"
+    return {"action": action, "faq_topic": topic, "frustrated": frustrated, "confidence": 0.9}
+
+def _weather_analysis(query: str) -> dict:
+    lowered = query.lower()
+    location = re.search(r"\b(?:in|for|at)\s+([a-z][a-z .'-]*?)\s*(?:\?|!|\.|,|$|\b(?:today|tomorrow|this|next|over)\b)", lowered)
+    days = re.search(r"(\d+)[- ]day", lowered)
+    forecast = bool(days) or bool(re.search(r"forecast|tomorrow|next|week", lowered))
+    return {
+        "location": location.group(1).strip().title() if location else None,
+        "request_type": "forecast" if forecast else "current_weather",
+        "forecast_days": int(days.group(1)) if days else 5,
+        "confidence": 0.9
+    }
+
+ANALYSES = {
+    "order": _order_analysis,
+    "product": _product_analysis,
+    "support": _support_analysis,
+    "weather": _weather_analysis
+}
+
+# Stand-in for the LLM's language understanding when no routing keyword matches
+ROUTING_HINTS = [
+    ("product", re.compile(r"\b(show|find|search|looking for|recommend|cheap|laptop|headphone|phone|"
+                           r"keyboard|monitor|camera|speaker)", re.IGNORECASE)),
+    ("weather", re.compile(r"\b(rain|sunny|snow|hot|cold|umbrella)", re.IGNORECASE))
+]
+
+def _route(query: str) -> dict:
+    decision = _pre_router.classify(query)
+    agent = decision["agent"]
+    if decision["confidence"] == 0.0:
+        agent = next((name for name, pattern in ROUTING_HINTS if pattern.search(query)), "support")
+    return {"agent": agent, "confidence": 0.9, "reasoning": f"stub routing ({decision['reasoning']})"}
+
+def rule_based_completion(prompt: str) -> str:
+    """Deterministic completion for any prompt the service sends"""
+    match = QUERY_PATTERN.search(prompt)
+    query = match.group(1) if match else ""
+
+    if "which agent should handle it" in prompt:
+        return json.dumps(_route(query))
+    if "choose the agent that should handle it" in prompt:
+        routing = _route(query)
+        analysis = ANALYSES[routing["agent"]](query)
+        if routing["agent"] == "weather":
+            analysis["action"] = analysis.pop("request_type")
+        return json.dumps({**analysis, **routing})
+    if "query about orders" in prompt:
+        return json.dumps(_order_analysis(query))
+    if "query about products" in prompt:
+        return json.dumps(_product_analysis(query))
+    if "customer support query" in prompt:
+        return json.dumps(_support_analysis(query))
+    if "Analyze this weather query" in prompt:
+        return json.dumps(_weather_analysis(query))
+    return FORMAT_REPLY
+
+# Weather payloads
+
+def _city_seed(city: str) -> int:
+    return int.from_bytes(hashlib.sha256(city.lower().encode("utf-8")).digest()[:4], "little")
+
+def weather_payload(city: str) -> dict:
+    rng = random.Random(_city_seed(city))
+    temperature = rng.uniform(-5, 35)
+    return {
+        "name": city.title(),
+        "sys": {"country": rng.choice(["US", "GB", "JP", "FR", "IN", "DE"]), "sunrise": 1700000000, "sunset": 1700040000},
+        "main": {
+            "temp": temperature,
+            "feels_like": temperature - rng.uniform(0, 3),
+            "humidity": rng.randint(20, 95),
+            "pressure": rng.randint(990, 1030)
+        },
+        "weather": [{"description": rng.choice(["clear sky", "few clouds", "light rain", "overcast clouds", "snow"])}],
+        "wind": {"speed": round(rng.uniform(0, 12), 1)},
+        "visibility": rng.choice([4000, 8000, 10000])
+    }
+
+def forecast_payload(city: str, count: int) -> dict:
+    rng = random.Random(_city_seed(city))
+    start = datetime(2024, 1, 1)
+    entries = []
+    for step in range(count):
+        temperature = rng.uniform(-5, 35)
+        entries.append({
+            "dt_txt": (start + timedelta(hours=3 * step)).strftime("%Y-%m-%d %H:%M:%S"),
+            "main": {"temp": temperature, "humidity": rng.randint(20, 95)},
+            "weather": [{"description": rng.choice(["clear sky", "light rain", "broken clouds"])}],
+            "wind": {"speed": round(rng.uniform(0, 12), 1)}
+        })
+    return {"city": {"name": city.title(), "country": "US"}, "list": entries}
+
+# Servers
+
+class StubBehavior:
+    """
+    Latency, failure and rate-limit settings for one stub server
+    """
+
+    def __init__(self, latency_ms: float = 0, latency_sigma: float = 0.5, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, requests_per_minute: float = 0, retry_after: float = 1.0,
+                 stream_chunk_ms: float = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stream_chunk_ms = stream_chunk_ms
+        self.bucket = TokenBucket(requests_per_minute)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+    def admit(self) -> Optional[int]:
+        """Sleep for the sampled latency; returns an error status to send, or None to answer normally"""
+        with self._lock:
+            self.stats["requests"] += 1
+            latency = self._rng.lognormvariate(0, self.latency_sigma) * self.latency_ms / 1000 if self.latency_ms else 0
+            roll = self._rng.random()
+            limited = self.bucket.wait_time(1) > 0
+            if not limited:
+                self.bucket.consume(1)
+            if limited or roll < self.rate_limit_rate:
+                self.stats["rate_limited"] += 1
+                status = 429
+            elif roll < self.rate_limit_rate + self.error_rate:
+                self.stats["errors"] += 1
+                status = 500
+            else:
+                status = None
+        time.sleep(latency)
+        return status
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, delayed ACKs would add ~40 ms
+    # to every keep-alive request and swamp the configured latency
+    disable_nagle_algorithm = True
+    behavior: StubBehavior = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: dict, headers: dict = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error_status(self, status: int):
+        if status == 429:
+            self._send_json(429, {"error": {"message": "Rate limit reached", "type": "rate_limit_exceeded"}},
+                            {"retry-after": str(self.behavior.retry_after)})
+        else:
+            self._send_json(status, {"error": {"message": "Stub server error", "type": "internal_server_error"}})
+
+class GroqStubHandler(_StubHandler):
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+        status = self.behavior.admit()
+        if status:
+            self._send_error_status(status)
+            return
+
+        prompt = request["messages"][-1]["content"]
+        content = rule_based_completion(prompt)
+        completion_id = f"chatcmpl-{hashlib.sha1(prompt.encode('utf-8')).hexdigest()[:12]}"
+        usage = {
+            "prompt_tokens": len(prompt) // 4,
+            "completion_tokens": len(content) // 4,
+            "total_tokens": len(prompt) // 4 + len(content) // 4
+        }
+        if request.get("stream"):
+            self._stream(completion_id, request["model"], content)
+            return
+
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request["model"],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        })
+
+    def _stream(self, completion_id: str, model: str, content: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def send(payload: str):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+
+        words = re.findall(r"\S+\s*", content)
+        for index, word in enumerate(words + [None]):
+            delta = {"content": word} if word is not None else {}
+            send(json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": None if word is not None else "stop"}]
+            }))
+            if word is not None and self.behavior.stream_chunk_ms:
+                time.sleep(self.behavior.stream_chunk_ms / 1000)
+        send("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+
+class WeatherStubHandler(_StubHandler):
+    # Locations the stub answers with 404, like a misspelt city
+    unknown_locations = frozenset({"atlantis", "nowhere", "unknown"})
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        endpoint = url.path.rstrip("/").rsplit("/", 1)[-1]
+        if endpoint not in ("weather", "forecast"):
+            self._send_json(404, {"cod": "404", "message": f"Unknown path {url.path}"})
+            return
+
+        status = self.behavior.admit()
+        if status:
+            self._send_error_status(status)
+            return
+
+        city = params.get("q", "").split(",")[0].strip()
+        if not city or city.lower() in self.unknown_locations:
+            self._send_json(404, {"cod": "404", "message": "city not found"})
+        elif endpoint == "weather":
+            self._send_json(200, weather_payload(city))
+        else:
+            self._send_json(200, forecast_payload(city, int(params.get("cnt", 40))))
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    # Load tests open many connections at once; the default backlog of 5 stalls them
+    request_queue_size = 1024
+    daemon_threads = True
+
+class StubServer:
+    """
+    A stub HTTP server running on a daemon thread; port 0 picks a free port
+    """
+
+    def __init__(self, handler: type, behavior: StubBehavior = None, host: str = "127.0.0.1", port: int = 0):
+        self.behavior = behavior or StubBehavior()
+        handler_class = type(handler.__name__, (handler,), {"behavior": self.behavior})
+        self.httpd = _StubHTTPServer((host, port), handler_class)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="stub-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+def start_groq_stub(behavior: StubBehavior = None, port: int = 0) -> StubServer:
+    return StubServer(GroqStubHandler, behavior, port=port).start()
+
+def start_weather_stub(behavior: StubBehavior = None, port: int = 0) -> StubServer:
+    return StubServer(WeatherStubHandler, behavior, port=port).start()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groq-port", type=int, default=8090)
+    parser.add_argument("--weather-port", type=int, default=8091)
+    parser.add_argument("--latency-ms", type=float, default=300, help="median Groq latency")
+    parser.add_argument("--weather-latency-ms", type=float, default=80, help="median OpenWeatherMap latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="log-normal spread of the latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--rpm", type=float, default=0, help="Groq requests per minute before 429s (0 = unlimited)")
+    parser.add_argument("--weather-rpm", type=float, default=0, help="OpenWeatherMap requests per minute (0 = unlimited)")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="retry-after seconds sent with 429s")
+    parser.add_argument("--stream-chunk-ms", type=float, default=15, help="delay between streamed chunks")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    groq_stub = start_groq_stub(StubBehavior(
+        args.latency_ms, args.latency_sigma, args.error_rate, args.rate_limit_rate,
+        args.rpm, args.retry_after, args.stream_chunk_ms, args.seed
+    ), args.groq_port)
+    weather_stub = start_weather_stub(StubBehavior(
+        args.weather_latency_ms, args.latency_sigma, args.error_rate, args.rate_limit_rate,
+        args.weather_rpm, args.retry_after, seed=args.seed + 1
+    ), args.weather_port)
+    print(f"Groq stub on {groq_stub.url}, OpenWeatherMap stub on {weather_stub.url} (Ctrl+C to stop)")
+
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        groq_stub.stop()
+        weather_stub.stop()
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,262 @@
-from groq import Groq
+from groq import AsyncGroq, Groq
 from langchain.llms.base import LLM
-from typing import Optional, List
+from typing import Any, Dict, Iterator, Optional, List
 from langchain.pydantic_v1 import PrivateAttr
+from langchain.schema.output import GenerationChunk
+from llm_cache import LLMCache, get_default_cache
+from llm_scheduler import LLMScheduler, LLMUnavailableError, get_default_scheduler
+from metrics import get_default_metrics
+from tracing import SPAN_KIND_CLIENT, get_tracer
+from contextlib import contextmanager
+import asyncio
+import httpx
 import os
+import threading
+import time
+import weakref
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Process-wide Groq clients, one per (model, API key, base URL), sharing keep-alive connection pools
+_shared_clients: Dict[tuple, Groq] = {}
+_shared_async_clients = weakref.WeakKeyDictionary()
+_clients_lock = threading.Lock()
+
+def _pool_limits(pool_size: int = None) -> httpx.Limits:
+    if pool_size is None:
+        pool_size = int(os.getenv("GROQ_POOL_SIZE", "20"))
+    return httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=pool_size,
+        keepalive_expiry=float(os.getenv("GROQ_KEEPALIVE_SECONDS", "30"))
+    )
+
+def get_shared_client(model_name: str, api_key: str = None, pool_size: int = None, base_url: str = None) -> Groq:
+    """Return the process-wide Groq client for (model, API key, base URL)"""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    base_url = base_url or os.getenv("GROQ_BASE_URL")
+    key = (model_name, api_key, base_url)
+
+    with _clients_lock:
+        client = _shared_clients.get(key)
+        if client is None:
+            client = Groq(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=httpx.Client(limits=_pool_limits(pool_size), timeout=60)
+            )
+            _shared_clients[key] = client
+        return client
+
+def get_shared_async_client(model_name: str, api_key: str = None, pool_size: int = None,
+                            base_url: str = None) -> AsyncGroq:
+    """Return the AsyncGroq client for (model, API key, base URL) on the running event loop"""
+    api_key = api_key or os.getenv("GROQ_API_KEY")
+    base_url = base_url or os.getenv("GROQ_BASE_URL")
+    key = (model_name, api_key, base_url)
+
+    # Async connection pools are bound to the loop that created them
+    loop = asyncio.get_running_loop()
+    with _clients_lock:
+        loop_clients = _shared_async_clients.setdefault(loop, {})
+        client = loop_clients.get(key)
+        if client is None:
+            client = AsyncGroq(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=httpx.AsyncClient(limits=_pool_limits(pool_size), timeout=60)
+            )
+            loop_clients[key] = client
+        return client
+
 class GroqLLM(LLM):
     _client: Groq = PrivateAttr()
     _model_name: str = PrivateAttr()
+    _api_key: Optional[str] = PrivateAttr()
+    _base_url: Optional[str] = PrivateAttr()
+    _cache: Optional[LLMCache] = PrivateAttr()
+    _scheduler: LLMScheduler = PrivateAttr()
 
-    def __init__(self, model_name: str = "llama3-8b-8192"):
+    def __init__(self, model_name: str = "llama3-8b-8192", api_key: str = None,
+                 cache: Optional[LLMCache] = None, scheduler: Optional[LLMScheduler] = None,
+                 base_url: str = None):
         super().__init__()
-        self._client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self._api_key = api_key or os.getenv("GROQ_API_KEY")
+        # GROQ_BASE_URL points every client at another endpoint, e.g. the offline stub server
+        self._base_url = base_url or os.getenv("GROQ_BASE_URL")
+        self._client = get_shared_client(model_name, self._api_key, base_url=self._base_url)
         self._model_name = model_name
+        self._cache = cache if cache is not None else get_default_cache()
+        self._scheduler = scheduler or get_default_scheduler()
 
-    def _call(self, prompt: str, stop: Optional[List[str]] = None) -> str:
-        try:
-            response = self._client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model=self._model_name,
-                temperature=0.1,
-                max_tokens=1000
+    def _call(self, prompt: str, stop: Optional[List[str]] = None, use_cache: bool = True,
+              priority: str = "interactive", **kwargs) -> str:
+        """
+        Complete a prompt through the scheduler.
+
+        Raises LLMUnavailableError when Groq still fails after retries.
+        """
+        with self._span(priority) as span, self._metered(priority) as call:
+            params = self._request_params(prompt, stop)
+            cache_key = self._cache_key(params) if use_cache else None
+            if cache_key:
+                cached = self._cache.get(cache_key)
+                span.set_attribute("llm.cache_hit", cached is not None)
+                if cached is not None:
+                    call["outcome"] = "cache_hit"
+                    return cached
+
+            estimated_tokens = self._estimate_tokens(prompt)
+            response = self._scheduler.call(
+                lambda: self._client.chat.completions.create(**params),
+                priority, estimated_tokens
+            )
+            self._scheduler.reconcile(estimated_tokens, self._usage_tokens(response))
+            self._record_usage(span, response)
+            content = response.choices[0].message.content
+
+            if cache_key:
+                self._cache.set(cache_key, content)
+            return content
+
+    async def _acall(self, prompt: str, stop: Optional[List[str]] = None, use_cache: bool = True,
+                     priority: str = "interactive", **kwargs) -> str:
+        """Non-blocking variant of _call for the asyncio request path"""
+        with self._span(priority) as span, self._metered(priority) as call:
+            params = self._request_params(prompt, stop)
+            cache_key = self._cache_key(params) if use_cache else None
+            if cache_key:
+                cached = self._cache.get(cache_key)
+                span.set_attribute("llm.cache_hit", cached is not None)
+                if cached is not None:
+                    call["outcome"] = "cache_hit"
+                    return cached
+
+            client = get_shared_async_client(self._model_name, self._api_key, base_url=self._base_url)
+            estimated_tokens = self._estimate_tokens(prompt)
+            response = await self._scheduler.acall(
+                lambda: client.chat.completions.create(**params),
+                priority, estimated_tokens
             )
-            return response.choices[0].message.content
+            self._scheduler.reconcile(estimated_tokens, self._usage_tokens(response))
+            self._record_usage(span, response)
+            content = response.choices[0].message.content
+
+            if cache_key:
+                self._cache.set(cache_key, content)
+            return content
+
+    def _stream(self, prompt: str, stop: Optional[List[str]] = None, run_manager: Any = None,
+                use_cache: bool = True, priority: str = "formatting", **kwargs) -> Iterator[GenerationChunk]:
+        """Yield completion chunks as Groq streams them; use via GroqLLM.stream(prompt)"""
+        # The span is not made current: the caller runs between chunks
+        span = self._span(priority, streaming=True)
+        try:
+            with self._metered(priority) as call:
+                params = self._request_params(prompt, stop)
+                cache_key = self._cache_key(params) if use_cache else None
+                if cache_key:
+                    cached = self._cache.get(cache_key)
+                    span.set_attribute("llm.cache_hit", cached is not None)
+                    if cached is not None:
+                        call["outcome"] = "cache_hit"
+                        yield GenerationChunk(text=cached)
+                        return
+
+                # Rate limits surface when the stream is opened, so only that step is retried
+                stream = self._scheduler.call(
+                    lambda: self._client.chat.completions.create(**params, stream=True),
+                    priority, self._estimate_tokens(prompt)
+                )
+
+                parts = []
+                try:
+                    for chunk in stream:
+                        text = chunk.choices[0].delta.content if chunk.choices else None
+                        if text:
+                            parts.append(text)
+                            if run_manager:
+                                run_manager.on_llm_new_token(text)
+                            yield GenerationChunk(text=text)
+                except Exception as e:
+                    raise LLMUnavailableError(f"Stream interrupted: {str(e)}") from e
+
+                span.set_attribute("llm.stream_chunks", len(parts))
+                if not parts:
+                    yield GenerationChunk(text="")
+                elif cache_key:
+                    self._cache.set(cache_key, "".join(parts))
         except Exception as e:
-            return f"Error: {str(e)}"
+            span.record_error(e)
+            raise
+        finally:
+            span.end()
+
+    def _span(self, priority: str, streaming: bool = False):
+        return get_tracer().start_span(
+            "llm.chat", SPAN_KIND_CLIENT,
+            **{"gen_ai.system": "groq", "gen_ai.request.model": self._model_name,
+               "llm.priority": priority, "llm.streaming": streaming}
+        )
+
+    @contextmanager
+    def _metered(self, priority: str):
+        """Count the call by outcome and time it; a cache hit sets call["outcome"] in the body"""
+        call = {"outcome": "ok"}
+        start_time = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            call["outcome"] = "error"
+            raise
+        finally:
+            metrics = get_default_metrics()
+            metrics.inc("llm_calls_total", priority=priority, outcome=call["outcome"])
+            if call["outcome"] != "cache_hit":
+                metrics.observe("llm_call_seconds", time.perf_counter() - start_time, priority=priority)
+
+    def _record_usage(self, span, response):
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            span.set_attribute("gen_ai.usage.input_tokens", getattr(usage, "prompt_tokens", None))
+            span.set_attribute("gen_ai.usage.output_tokens", getattr(usage, "completion_tokens", None))
+
+    def _estimate_tokens(self, prompt: str) -> int:
+        """Rough prompt + completion token estimate used to reserve rate-limit budget"""
+        return len(prompt) // 4 + 256
+
+    def _usage_tokens(self, response) -> Optional[int]:
+        usage = getattr(response, "usage", None)
+        return getattr(usage, "total_tokens", None)
+
+    def get_scheduler_stats(self) -> dict:
+        """Queue-depth and retry metrics of the LLM scheduler"""
+        return self._scheduler.get_stats()
+
+    def _cache_key(self, params: dict) -> Optional[str]:
+        """Cache key for a request, None when caching is disabled"""
+        if self._cache is None:
+            return None
+        prompt = params["messages"][-1]["content"]
+        options = {key: value for key, value in params.items() if key not in ("messages", "model")}
+        return LLMCache.make_key(self._model_name, prompt, options)
+
+    def get_cache_stats(self) -> dict:
+        """Hit-rate metrics of the response cache"""
+        return self._cache.get_stats() if self._cache is not None else {}
+
+    def _request_params(self, prompt: str, stop: Optional[List[str]] = None) -> dict:
+        """Chat-completions parameters shared by the sync and async calls"""
+        params = {
+            "messages": [{"role": "user", "content": prompt}],
+            "model": self._model_name,
+            "temperature": 0.1,
+            "max_tokens": 1000
+        }
+        if stop:
+            params["stop"] = stop
+        return params
 
     @property
     def _llm_type(self) -> str:
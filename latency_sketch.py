@@ -0,0 +1,221 @@
+import math
+import time
+from typing import Dict, Optional
+
+class LogHistogram:
+    """
+    Log-bucketed histogram (DDSketch-style) with a bounded relative error per quantile.
+
+    Bucket i holds values in (gamma^(i-1), gamma^i]; with values clamped to
+    [min_value, max_value] the bucket count is fixed, so memory does not grow
+    with traffic. Histograms with the same accuracy merge by adding counts.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-6, max_value: float = 1e6):
+        self.relative_accuracy = relative_accuracy
+        self.min_value = min_value
+        self.max_value = max_value
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        self.count += count
+        self.sum += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if value <= self.min_value:
+            self.zero_count += count
+            return
+        index = math.ceil(math.log(min(value, self.max_value)) / self._log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return max(self.min, 0.0)
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket, which keeps the relative error within the accuracy
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    @property
+    def mean(self) -> Optional[float]:
+        return self.sum / self.count if self.count else None
+
+    def count_below(self, bound: float) -> int:
+        """Values in buckets whose upper edge is at most bound, for cumulative histogram buckets"""
+        if bound <= self.min_value:
+            return self.zero_count if bound >= 0 else 0
+        last = math.floor(math.log(bound) / self._log_gamma)
+        return self.zero_count + sum(count for index, count in list(self.buckets.items()) if index <= last)
+
+    def merge(self, other: "LogHistogram"):
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge histograms with different accuracy")
+        # list() copies in one step, so a histogram another thread is writing can be read
+        for index, count in list(other.buckets.items()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def summary(self, scale: float = 1.0, digits: int = 2) -> dict:
+        """count, mean, p50/p90/p99 and max, each value multiplied by scale"""
+        def scaled(value):
+            return round(value * scale, digits) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean": scaled(self.mean),
+            "p50": scaled(self.quantile(0.50)),
+            "p90": scaled(self.quantile(0.90)),
+            "p99": scaled(self.quantile(0.99)),
+            "max": scaled(self.max if self.count else None)
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "min_value": self.min_value,
+            "max_value": self.max_value,
+            # JSON object keys are strings
+            "buckets": {str(index): count for index, count in list(self.buckets.items())},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LogHistogram":
+        histogram = cls(data["relative_accuracy"], data["min_value"], data["max_value"])
+        histogram.buckets = {int(index): count for index, count in data["buckets"].items()}
+        histogram.zero_count = data["zero_count"]
+        histogram.count = data["count"]
+        histogram.sum = data["sum"]
+        if histogram.count:
+            histogram.min = data["min"]
+            histogram.max = data["max"]
+        return histogram
+
+class RotatingHistogram:
+    """
+    Histogram over a sliding time window, kept as a ring of per-slot histograms.
+
+    Slots are aligned to the epoch, so windows recorded by different processes
+    line up slot for slot when merged. The window reads with up to one slot of lag.
+    """
+
+    def __init__(self, window: float, slots: int, relative_accuracy: float = 0.01):
+        self.window = window
+        self.slots = slots
+        self.slot_width = window / slots
+        self.relative_accuracy = relative_accuracy
+        self._slots: Dict[int, LogHistogram] = {}
+
+    def _slot(self, now: float) -> int:
+        return int(now // self.slot_width)
+
+    def _expire(self, current: int):
+        for slot in [slot for slot in self._slots if slot <= current - self.slots]:
+            del self._slots[slot]
+
+    def add(self, value: float, now: float = None):
+        current = self._slot(time.time() if now is None else now)
+        histogram = self._slots.get(current)
+        if histogram is None:
+            self._expire(current)
+            histogram = self._slots[current] = LogHistogram(self.relative_accuracy)
+        histogram.add(value)
+
+    def merged(self, now: float = None) -> LogHistogram:
+        """One histogram of everything recorded within the window"""
+        current = self._slot(time.time() if now is None else now)
+        result = LogHistogram(self.relative_accuracy)
+        for slot, histogram in list(self._slots.items()):
+            if current - self.slots < slot <= current:
+                result.merge(histogram)
+        return result
+
+    def merge(self, other: "RotatingHistogram"):
+        if (other.window, other.slots) != (self.window, self.slots):
+            raise ValueError("Cannot merge windows with different layouts")
+        for slot, histogram in list(other._slots.items()):
+            if slot in self._slots:
+                self._slots[slot].merge(histogram)
+            else:
+                self._slots[slot] = LogHistogram.from_dict(histogram.to_dict())
+        self._expire(max(self._slots, default=0))
+
+    def to_dict(self) -> dict:
+        return {
+            "window": self.window,
+            "slots": self.slots,
+            "relative_accuracy": self.relative_accuracy,
+            "histograms": {str(slot): histogram.to_dict() for slot, histogram in list(self._slots.items())}
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "RotatingHistogram":
+        windowed = cls(data["window"], data["slots"], data["relative_accuracy"])
+        for slot, histogram in data["histograms"].items():
+            windowed._slots[int(slot)] = LogHistogram.from_dict(histogram)
+        return windowed
+
+# name -> (window seconds, slots)
+WINDOWS = {"1m": (60, 6), "5m": (300, 10), "1h": (3600, 12)}
+
+class LatencySeries:
+    """
+    All-time histogram plus the 1m/5m/1h rotating windows for one series
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        self.total = LogHistogram(relative_accuracy)
+        self.windows = {
+            name: RotatingHistogram(window, slots, relative_accuracy)
+            for name, (window, slots) in WINDOWS.items()
+        }
+
+    def add(self, value: float, now: float = None):
+        now = time.time() if now is None else now
+        self.total.add(value)
+        for windowed in self.windows.values():
+            windowed.add(value, now)
+
+    def window(self, name: str, now: float = None) -> LogHistogram:
+        return self.windows[name].merged(now)
+
+    def merge(self, other: "LatencySeries"):
+        self.total.merge(other.total)
+        for name, windowed in other.windows.items():
+            self.windows[name].merge(windowed)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total.to_dict(),
+            "windows": {name: windowed.to_dict() for name, windowed in self.windows.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "LatencySeries":
+        series = cls(data["total"]["relative_accuracy"])
+        series.total = LogHistogram.from_dict(data["total"])
+        for name, windowed in data["windows"].items():
+            series.windows[name] = RotatingHistogram.from_dict(windowed)
+        return series
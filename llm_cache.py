@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class MemoryCacheTier:
+    """
+    In-memory LRU tier with a per-entry TTL and an entry-count bound
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._entries[key] = (value, time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+class SQLiteCacheTier:
+    """
+    On-disk tier that keeps completions across restarts
+    """
+
+    def __init__(self, path: str, ttl: float = 86400):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            if row[1] < time.time():
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return row[0]
+
+    def set(self, key: str, value: str):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + self.ttl)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+class LLMCache:
+    """
+    Completion cache keyed by (model, prompt, params) with a memory tier and optional disk tier
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600, sqlite_path: str = None,
+                 sqlite_ttl: float = 86400):
+        self.memory = MemoryCacheTier(max_entries, ttl)
+        self.disk = SQLiteCacheTier(sqlite_path, sqlite_ttl) if sqlite_path else None
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bytes_saved": 0
+        }
+
+    @staticmethod
+    def make_key(model: str, prompt: str, params: dict = None) -> str:
+        """Stable digest of everything that determines the completion"""
+        payload = json.dumps([model, prompt, params or {}], sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.memory.get(key)
+        tier = "memory_hits"
+
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            tier = "disk_hits"
+            if value is not None:
+                # Promote so the next lookup stays in memory
+                self.memory.set(key, value)
+
+        with self._lock:
+            if value is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["hits"] += 1
+                self.stats[tier] += 1
+                self.stats["bytes_saved"] += len(value.encode("utf-8"))
+        return value
+
+    def set(self, key: str, value: str):
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def get_stats(self) -> dict:
+        """Hit-rate and bytes-saved metrics"""
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] / lookups) * 100 if lookups > 0 else 0
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def get_default_cache() -> Optional[LLMCache]:
+    """Process-wide cache configured from the environment, None when disabled"""
+    global _default_cache
+
+    if os.getenv("LLM_CACHE_ENABLED", "true").lower() not in ("1", "true", "yes"):
+        return None
+
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = LLMCache(
+                max_entries=int(os.getenv("LLM_CACHE_SIZE", "1024")),
+                ttl=float(os.getenv("LLM_CACHE_TTL", "3600")),
+                sqlite_path=os.getenv("LLM_CACHE_PATH") or None,
+                sqlite_ttl=float(os.getenv("LLM_CACHE_DISK_TTL", "86400"))
+            )
+        return _default_cache
@@ -0,0 +1,292 @@
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+import groq
+
+# Lower values are served first
+PRIORITIES = {
+    "routing": 0,
+    "interactive": 1,
+    "formatting": 2,
+    "batch": 3
+}
+
+# Lowest priority allowed in the current context, e.g. everything a batch job triggers
+_priority_floor = contextvars.ContextVar("llm_priority_floor", default="routing")
+
+class LLMUnavailableError(Exception):
+    """Raised when an LLM call still fails after the scheduler's retries"""
+
+    def __init__(self, message: str, status_code: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+@contextmanager
+def priority_scope(priority: str):
+    """Demote every LLM call made inside the block to at most `priority`"""
+    token = _priority_floor.set(priority)
+    try:
+        yield
+    finally:
+        _priority_floor.reset(token)
+
+def effective_priority(priority: str) -> int:
+    return max(PRIORITIES.get(priority, PRIORITIES["interactive"]), PRIORITIES[_priority_floor.get()])
+
+class TokenBucket:
+    """
+    Refills `rate_per_minute` units per minute up to one minute of burst; 0 means unlimited
+    """
+
+    def __init__(self, rate_per_minute: float):
+        self.capacity = rate_per_minute
+        self.rate = rate_per_minute / 60.0
+        self.tokens = rate_per_minute
+        self.updated = time.monotonic()
+
+    @property
+    def unlimited(self) -> bool:
+        return self.capacity <= 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available"""
+        if self.unlimited:
+            return 0.0
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def consume(self, amount: float):
+        if not self.unlimited:
+            self.tokens -= min(amount, self.capacity)
+
+    def refund(self, amount: float):
+        if not self.unlimited:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+class LLMScheduler:
+    """
+    Admits LLM calls by priority within request and token rate limits, retrying transient failures
+    """
+
+    def __init__(self, requests_per_minute: float = 30, tokens_per_minute: float = 30000,
+                 max_retries: int = 4, base_delay: float = 0.5, max_delay: float = 20.0):
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._cond = threading.Condition()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._paused_until = 0.0
+        # Queue sequence number -> (loop, event) of each waiting coroutine
+        self._async_waiters = {}
+        self.stats = {
+            "granted": 0,
+            "retries": 0,
+            "rate_limited": 0,
+            "failures": 0,
+            "max_queue_depth": 0,
+            "queued_seconds": 0.0
+        }
+
+    # Admission
+
+    def acquire(self, priority: str = "interactive", tokens: int = 0):
+        """Block until the call may be sent"""
+        entry = self._enqueue(priority)
+        start_time = time.monotonic()
+        with self._cond:
+            try:
+                while True:
+                    wait = self._try_grant(entry, tokens)
+                    if wait <= 0:
+                        break
+                    self._cond.wait(timeout=wait)
+            except BaseException:
+                self._dequeue(entry)
+                raise
+            self.stats["queued_seconds"] += time.monotonic() - start_time
+
+    async def aacquire(self, priority: str = "interactive", tokens: int = 0):
+        """Async variant of acquire that yields to the event loop while waiting"""
+        entry = self._enqueue(priority)
+        start_time = time.monotonic()
+        wakeup = asyncio.Event()
+        with self._cond:
+            self._async_waiters[entry[1]] = (asyncio.get_running_loop(), wakeup)
+        try:
+            while True:
+                with self._cond:
+                    # Cleared before checking, so a grant made after the check still wakes us
+                    wakeup.clear()
+                    wait = self._try_grant(entry, tokens)
+                if wait <= 0:
+                    break
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._cond:
+                self._dequeue(entry)
+            raise
+        finally:
+            with self._cond:
+                self._async_waiters.pop(entry[1], None)
+        with self._cond:
+            self.stats["queued_seconds"] += time.monotonic() - start_time
+
+    def _enqueue(self, priority: str) -> list:
+        entry = [effective_priority(priority), next(self._sequence)]
+        with self._cond:
+            heapq.heappush(self._queue, entry)
+            self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._queue))
+        return entry
+
+    def _dequeue(self, entry: list):
+        if entry in self._queue:
+            self._queue.remove(entry)
+            heapq.heapify(self._queue)
+            self._notify()
+
+    def _notify(self):
+        """Wake every waiter, threads and coroutines alike, to re-check the queue head"""
+        self._cond.notify_all()
+        for loop, wakeup in self._async_waiters.values():
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def _try_grant(self, entry: list, tokens: int) -> float:
+        """Grant the head of the queue if the buckets allow it; returns seconds to wait, 0 if granted"""
+        if self._queue[0] is not entry:
+            # Woken by _notify when the head changes; the timeout is only a safety net
+            return 1.0
+
+        wait = max(
+            self._paused_until - time.monotonic(),
+            self.request_bucket.wait_time(1),
+            self.token_bucket.wait_time(tokens)
+        )
+        if wait > 0:
+            return wait
+
+        self.request_bucket.consume(1)
+        self.token_bucket.consume(tokens)
+        heapq.heappop(self._queue)
+        self.stats["granted"] += 1
+        self._notify()
+        return 0.0
+
+    def reconcile(self, estimated_tokens: int, actual_tokens: Optional[int]):
+        """Correct the token bucket once the real usage of a call is known"""
+        if actual_tokens is None:
+            return
+        with self._cond:
+            if actual_tokens < estimated_tokens:
+                self.token_bucket.refund(estimated_tokens - actual_tokens)
+            else:
+                self.token_bucket.consume(actual_tokens - estimated_tokens)
+
+    # Execution with retries
+
+    def call(self, fn: Callable[[], Any], priority: str = "interactive", tokens: int = 0) -> Any:
+        """Run fn once admitted, retrying transient errors with backoff"""
+        for attempt in range(self.max_retries + 1):
+            self.acquire(priority, tokens)
+            try:
+                return fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+            time.sleep(delay)
+
+    async def acall(self, fn: Callable[[], Any], priority: str = "interactive", tokens: int = 0) -> Any:
+        """Async variant of call; fn returns an awaitable"""
+        for attempt in range(self.max_retries + 1):
+            await self.aacquire(priority, tokens)
+            try:
+                return await fn()
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+            await asyncio.sleep(delay)
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Backoff before the next attempt; raises LLMUnavailableError when giving up"""
+        status_code = getattr(error, "status_code", None)
+        retryable = isinstance(error, (groq.RateLimitError, groq.APIConnectionError, groq.InternalServerError)) \
+            or (status_code is not None and status_code >= 500)
+
+        if not retryable or attempt >= self.max_retries:
+            with self._cond:
+                self.stats["failures"] += 1
+            raise LLMUnavailableError(str(error), status_code) from error
+
+        # Full jitter keeps retrying clients from synchronising
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+        if isinstance(error, groq.RateLimitError):
+            retry_after = self._retry_after(error)
+            with self._cond:
+                self.stats["rate_limited"] += 1
+                if retry_after is not None:
+                    # Hold every queued call, not just this one, until the server is ready again
+                    delay = retry_after
+                    self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+        with self._cond:
+            self.stats["retries"] += 1
+        return delay
+
+    def _retry_after(self, error: Exception) -> Optional[float]:
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None) or {}
+        value = headers.get("retry-after")
+        try:
+            return min(float(value), self.max_delay) if value is not None else None
+        except ValueError:
+            return None
+
+    def get_stats(self) -> dict:
+        """Queue-depth and retry metrics"""
+        names = {value: name for name, value in PRIORITIES.items()}
+        with self._cond:
+            stats = dict(self.stats)
+            depth_by_priority = {name: 0 for name in PRIORITIES}
+            for priority, _ in self._queue:
+                depth_by_priority[names[priority]] += 1
+            stats["queue_depth"] = len(self._queue)
+            stats["queue_depth_by_priority"] = depth_by_priority
+        stats["queued_seconds"] = round(stats["queued_seconds"], 3)
+        return stats
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+def get_default_scheduler() -> LLMScheduler:
+    """Process-wide scheduler sized from GROQ_RPM / GROQ_TPM (0 disables a limit)"""
+    global _default_scheduler
+
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = LLMScheduler(
+                requests_per_minute=float(os.getenv("GROQ_RPM", "30")),
+                tokens_per_minute=float(os.getenv("GROQ_TPM", "30000")),
+                max_retries=int(os.getenv("GROQ_MAX_RETRIES", "4"))
+            )
+        return _default_scheduler
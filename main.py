@@ -1,51 +1,80 @@
+from latency_sketch import WINDOWS, LogHistogram
+from llm_scheduler import LLMUnavailableError
+from metrics import MetricFamily, MetricsServer, ShardedMetrics, get_default_metrics
 from router_agent import RouterAgent
+from session_store import SessionStore, create_session_store
+from tracing import get_tracer
+from typing import Callable, List
 import json
+import os
 
 class EcommerceCustomerService:
-    def __init__(self):
+    def __init__(self, session_store: SessionStore = None):
         self.router = RouterAgent()
-        self.conversation_history = []
+        self.sessions = session_store or create_session_store()
+    
+    @property
+    def conversation_history(self) -> list:
+        """History of the default session, for single-user callers"""
+        return self.sessions.history("default")
     
-    def chat(self, user_input: str) -> dict:
-        """Main chat interface"""
-        
-        # Add user input to conversation history
-        self.conversation_history.append({
-            "role": "user",
-            "message": user_input,
-            "timestamp": self._get_timestamp()
-        })
-        
-        # Route query to appropriate agent
-        response = self.router.route_query(user_input, {
-            "history": self.conversation_history[-5:]  # Last 5 messages for context
-        })
-        
-        # Add response to conversation history
-        self.conversation_history.append({
-            "role": "assistant",
-            "message": response.get("response", ""),
-            "agent": response.get("agent", "Unknown"),
-            "timestamp": self._get_timestamp()
-        })
+    def chat(self, user_input: str, on_token: Callable[[str], None] = None,
+             session_id: str = "default") -> dict:
+        """Main chat interface; on_token receives the reply chunks as they stream in"""
         
-        return response
+        with get_tracer().span("service.chat", **{"chat.streaming": on_token is not None}) as span:
+            context = self._record_user_message(session_id, user_input)
+            
+            # Route query to appropriate agent
+            response = self.router.route_query(user_input, context, on_token=on_token)
+            if on_token is not None:
+                response["streamed"] = True
+            
+            self._record_response(session_id, response)
+            span.set_attribute("chat.agent", response.get("agent"))
+            return response
+    
+    async def achat(self, user_input: str, session_id: str = "default") -> dict:
+        """Async chat interface for serving many conversations from one event loop"""
+        
+        with get_tracer().span("service.chat", **{"chat.async": True}) as span:
+            context = self._record_user_message(session_id, user_input)
+            response = await self.router.aroute_query(user_input, context)
+            self._record_response(session_id, response)
+            span.set_attribute("chat.agent", response.get("agent"))
+            return response
+    
+    def _record_user_message(self, session_id: str, user_input: str) -> dict:
+        """Add user input to the session's history and return the routing context"""
+        self.sessions.append(session_id, "user", user_input)
+        
+        return {
+            "session_id": session_id,
+            "history": self.sessions.history(session_id, 5)  # Last 5 messages for context
+        }
+    
+    def _record_response(self, session_id: str, response: dict):
+        """Add response to the session's history"""
+        self.sessions.append(session_id, "assistant", response.get("response", ""),
+                             response.get("agent", "Unknown"))
     
     def get_capabilities(self) -> dict:
         """Get system capabilities"""
         return self.router.list_capabilities()
     
-    def _get_timestamp(self) -> str:
-        """Get current timestamp"""
-        from datetime import datetime
-        return datetime.now().isoformat()
+    def print_token(self, token: str):
+        """Print a streamed reply chunk as soon as it arrives"""
+        print(token, end="", flush=True)
     
     def print_response(self, response: dict):
         """Pretty print response"""
         print(f"\n{'='*50}")
         print(f"Agent: {response.get('agent', 'Unknown')}")
-        print(f"{'='*50}")
-        print(response.get('response', 'No response'))
+        
+        # Streamed replies were already printed token by token
+        if not response.get("streamed"):
+            print(f"{'='*50}")
+            print(response.get('response', 'No response'))
         
         if response.get('routing'):
             routing = response['routing']
@@ -53,6 +82,10 @@ class EcommerceCustomerService:
         
         print(f"{'='*50}\n")
 
+def stream_enabled() -> bool:
+    """Whether the CLI streams replies token by token (STREAM_RESPONSES, default on)"""
+    return os.getenv("STREAM_RESPONSES", "true").lower() in ("1", "true", "yes")
+
 def main():
     """Main function to run the chatbot"""
     print("🛒 E-commerce Customer Service Chatbot")
@@ -60,6 +93,7 @@ def main():
     print("="*60)
     
     chatbot = EcommerceCustomerService()
+    on_token = chatbot.print_token if stream_enabled() else None
     
     while True:
         try:
@@ -78,7 +112,9 @@ def main():
                 continue
             
             # Process the query
-            response = chatbot.chat(user_input)
+            if on_token:
+                print("\nAssistant: ", end="", flush=True)
+            response = chatbot.chat(user_input, on_token=on_token)
             chatbot.print_response(response)
             
         except KeyboardInterrupt:
@@ -119,8 +155,9 @@ class AgentOrchestrator:
     Advanced orchestration system for managing multi-agent workflows
     """
     
-    def __init__(self):
-        self.router = RouterAgent()
+    def __init__(self, router: RouterAgent = None):
+        # Reuse the service's router so agents, tools and LLM clients are not built twice
+        self.router = router or RouterAgent()
         self.active_sessions = {}
         self.workflow_templates = {
             "order_fulfillment": [
@@ -168,7 +205,11 @@ class AgentOrchestrator:
         # Execute step with appropriate agent
         if agent_name in self.router.agents:
             agent = self.router.agents[agent_name]
-            result = agent.process(f"Execute {action}", workflow["data"])
+            try:
+                result = agent.process(f"Execute {action}", workflow["data"])
+            except LLMUnavailableError as e:
+                # Same reply as route_query; the step stays current so calling again retries it
+                return self.router._unavailable_response(e)
             workflow["results"].append(result)
             workflow["current_step"] += 1
             
@@ -196,62 +237,96 @@ class AgentOrchestrator:
         }
 
 # Advanced Analytics and Monitoring
+ANALYTICS_HELP = {
+    "agent_queries_total": "Chat queries answered, by agent",
+    "agent_successes_total": "Chat queries answered successfully, by agent",
+    "response_time_seconds": "End-to-end chat response time, by agent",
+    "satisfaction_ratings_total": "Satisfaction scores received",
+    "satisfaction_score_total": "Sum of satisfaction scores received"
+}
+
 class AnalyticsManager:
     """
-    Analytics system for monitoring agent performance and user interactions
+    Analytics system for monitoring agent performance and user interactions.
+
+    Counts and response times are recorded in per-thread shards of fixed-size
+    histograms and summed when a report is read, so logging never waits on a lock
+    and memory stays flat; snapshot() output from several worker processes can be
+    folded into one report with merge().
     """
     
     def __init__(self):
-        self.metrics = {
-            "total_queries": 0,
-            "agent_usage": {},
-            "response_times": [],
-            "success_rates": {},
-            "user_satisfaction": []
-        }
+        self.metrics = ShardedMetrics()
     
     def log_interaction(self, agent_name: str, query: str, response_time: float, 
                        success: bool, satisfaction_score: int = None):
         """Log user interaction for analytics"""
-        self.metrics["total_queries"] += 1
-        
-        # Agent usage tracking
-        if agent_name not in self.metrics["agent_usage"]:
-            self.metrics["agent_usage"][agent_name] = 0
-        self.metrics["agent_usage"][agent_name] += 1
-        
-        # Response time tracking
-        self.metrics["response_times"].append(response_time)
-        
-        # Success rate tracking
-        if agent_name not in self.metrics["success_rates"]:
-            self.metrics["success_rates"][agent_name] = {"total": 0, "successful": 0}
-        
-        self.metrics["success_rates"][agent_name]["total"] += 1
+        self.metrics.inc("agent_queries_total", agent=agent_name)
         if success:
-            self.metrics["success_rates"][agent_name]["successful"] += 1
+            self.metrics.inc("agent_successes_total", agent=agent_name)
+        self.metrics.observe("response_time_seconds", response_time, agent=agent_name)
         
         # Satisfaction tracking
         if satisfaction_score:
-            self.metrics["user_satisfaction"].append(satisfaction_score)
+            self.metrics.inc("satisfaction_ratings_total")
+            self.metrics.inc("satisfaction_score_total", satisfaction_score)
+    
+    def _by_agent(self, counters: dict, name: str) -> dict:
+        return {dict(labels)["agent"]: value for (counter, labels), value in counters.items() if counter == name}
     
     def get_analytics_report(self) -> dict:
-        """Generate comprehensive analytics report"""
-        avg_response_time = sum(self.metrics["response_times"]) / len(self.metrics["response_times"]) if self.metrics["response_times"] else 0
-        avg_satisfaction = sum(self.metrics["user_satisfaction"]) / len(self.metrics["user_satisfaction"]) if self.metrics["user_satisfaction"] else 0
+        """Generate comprehensive analytics report; latency percentiles are in milliseconds"""
+        counters = self.metrics.counters()
+        agent_usage = self._by_agent(counters, "agent_queries_total")
+        successes = self._by_agent(counters, "agent_successes_total")
+        
+        all_agents = LogHistogram()
+        latency = {}
+        windows = {name: {} for name in WINDOWS}
+        for (_, labels), series in self.metrics.histograms("response_time_seconds").items():
+            agent = dict(labels)["agent"]
+            all_agents.merge(series.total)
+            latency[agent] = series.total.summary(scale=1000)
+            for name in WINDOWS:
+                window = series.window(name)
+                if window.count:
+                    windows[name][agent] = window.summary(scale=1000)
         
         success_rates = {}
-        for agent, data in self.metrics["success_rates"].items():
-            success_rates[agent] = (data["successful"] / data["total"]) * 100 if data["total"] > 0 else 0
+        for agent, total in agent_usage.items():
+            success_rates[agent] = (successes.get(agent, 0) / total) * 100 if total > 0 else 0
+        
+        ratings = counters.get(("satisfaction_ratings_total", ()), 0)
+        avg_satisfaction = counters.get(("satisfaction_score_total", ()), 0) / ratings if ratings else 0
         
         return {
-            "total_queries": self.metrics["total_queries"],
-            "agent_usage": self.metrics["agent_usage"],
-            "average_response_time": round(avg_response_time, 2),
+            "total_queries": sum(agent_usage.values()),
+            "agent_usage": agent_usage,
+            "average_response_time": round(all_agents.mean or 0, 2),
+            "response_time_ms": {"all": all_agents.summary(scale=1000), **latency},
+            "response_time_windows_ms": windows,
             "success_rates": success_rates,
             "average_satisfaction": round(avg_satisfaction, 2),
-            "most_used_agent": max(self.metrics["agent_usage"], key=self.metrics["agent_usage"].get) if self.metrics["agent_usage"] else None
+            "most_used_agent": max(agent_usage, key=agent_usage.get) if agent_usage else None
         }
+    
+    def collect_metrics(self) -> List[MetricFamily]:
+        """Metric families for the Prometheus exporter"""
+        families = self.metrics.collect(help_text=ANALYTICS_HELP)
+        success_rates = self.get_analytics_report()["success_rates"]
+        families.append(MetricFamily(
+            "chatbot_agent_success_ratio", "gauge", "Share of queries answered successfully, by agent",
+            [("", {"agent": agent}, round(rate / 100, 4)) for agent, rate in success_rates.items()]
+        ))
+        return families
+    
+    def snapshot(self) -> dict:
+        """JSON-serialisable copy of the metrics, for merging in another process"""
+        return self.metrics.snapshot()
+    
+    def merge(self, snapshot: dict):
+        """Fold another manager's snapshot() into this one"""
+        self.metrics.merge(snapshot)
 
 # Orchestration
 class EnhancedEcommerceService(EcommerceCustomerService):
@@ -259,11 +334,13 @@ class EnhancedEcommerceService(EcommerceCustomerService):
     
     def __init__(self):
         super().__init__()
-        self.orchestrator = AgentOrchestrator()
+        self.orchestrator = AgentOrchestrator(self.router)
         self.analytics = AnalyticsManager()
         self.active_workflows = {}
+        self.metrics_server = None
     
-    def chat_with_analytics(self, user_input: str, session_id: str = "default") -> dict:
+    def chat_with_analytics(self, user_input: str, session_id: str = "default",
+                            on_token: Callable[[str], None] = None) -> dict:
         """Enhanced chat with analytics and orchestration support"""
         import time
         start_time = time.time()
@@ -280,12 +357,17 @@ class EnhancedEcommerceService(EcommerceCustomerService):
             return {
                 "agent": "Analytics Manager",
                 "response": "Analytics Report Generated",
-                "data": self.analytics.get_analytics_report(),
+                "data": {
+                    **self.analytics.get_analytics_report(),
+                    "routing": self.router.get_routing_stats(),
+                    "llm_cache": self.router.llm.get_cache_stats(),
+                    "llm_scheduler": self.router.llm.get_scheduler_stats()
+                },
                 "success": True
             }
         
         # Regular chat processing
-        response = self.chat(user_input)
+        response = self.chat(user_input, on_token=on_token, session_id=session_id)
         
         # Log analytics
         response_time = time.time() - start_time
@@ -298,14 +380,118 @@ class EnhancedEcommerceService(EcommerceCustomerService):
         
         return response
 
+    def collect_metrics(self) -> List[MetricFamily]:
+        """Analytics, LLM, cache and routing metrics as Prometheus metric families"""
+        families = self.analytics.collect_metrics()
+        families.extend(get_default_metrics().collect(help_text={
+            "llm_calls_total": "LLM calls by priority and outcome (ok, cache_hit, error)",
+            "llm_call_seconds": "LLM call latency excluding cache hits, by priority"
+        }))
+        
+        llm_cache = self.router.llm.get_cache_stats()
+        if llm_cache:
+            families.append(MetricFamily("chatbot_llm_cache_lookups_total", "counter", "LLM cache lookups by result", [
+                ("", {"result": "hit"}, llm_cache["hits"]),
+                ("", {"result": "miss"}, llm_cache["misses"])
+            ]))
+            families.append(MetricFamily("chatbot_llm_cache_hit_ratio", "gauge", "LLM cache hit ratio",
+                                         [("", {}, round(llm_cache["hit_rate"] / 100, 4))]))
+        
+        scheduler = self.router.llm.get_scheduler_stats()
+        families.append(MetricFamily("chatbot_llm_scheduler_events_total", "counter", "LLM scheduler grants, retries and failures", [
+            ("", {"event": event}, scheduler[event])
+            for event in ("granted", "retries", "rate_limited", "failures") if event in scheduler
+        ]))
+        if "queue_depth" in scheduler:
+            families.append(MetricFamily("chatbot_llm_scheduler_queue_depth", "gauge", "LLM calls waiting for admission",
+                                         [("", {}, scheduler["queue_depth"])]))
+        
+        weather = self.router.agents["weather"].tools.get_cache_stats()
+        families.append(MetricFamily("chatbot_weather_cache_lookups_total", "counter", "Weather cache lookups by cache and result", [
+            ("", {"cache": cache, "result": result}, weather[cache][result])
+            for cache in ("weather", "forecast") for result in ("hits", "stale_hits", "negative_hits", "misses")
+        ]))
+        families.append(MetricFamily("chatbot_weather_cache_hit_ratio", "gauge", "Weather cache hit ratio by cache", [
+            ("", {"cache": cache}, weather[cache]["hit_rate"]) for cache in ("weather", "forecast")
+        ]))
+        
+        routing = self.router.get_routing_stats()
+        families.append(MetricFamily("chatbot_routing_fast_path_total", "counter", "Queries routed without an LLM call, by result", [
+            ("", {"result": "hit"}, routing["fast_path_hits"]),
+            ("", {"result": "miss"}, routing["fast_path_misses"])
+        ]))
+        return families
+    
+    def start_metrics_server(self, port: int = 9100, host: str = "0.0.0.0") -> MetricsServer:
+        """Serve collect_metrics() at http://host:port/metrics"""
+        if self.metrics_server is None:
+            self.metrics_server = MetricsServer(self.collect_metrics, port, host).start()
+        return self.metrics_server
+
+def export_order_statuses(argv: list) -> int:
+    """Write status or tracking records for many orders as JSONL, without calling the LLM"""
+    import argparse
+    import sys
+    from tools.order_tools import OrderTools
+    
+    parser = argparse.ArgumentParser(prog="python main.py orders",
+                                     description="Bulk order status / tracking export for notification jobs")
+    parser.add_argument("ids", nargs="?", help="file with one order id per line, or - for stdin; omit to use the filters")
+    parser.add_argument("--status", help="only orders in this status")
+    parser.add_argument("--since", help="only orders placed on or after this date (YYYY-MM-DD)")
+    parser.add_argument("--until", help="only orders placed on or before this date (YYYY-MM-DD)")
+    parser.add_argument("--track", action="store_true", help="emit tracking records instead of status records")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--output", help="JSONL output file (default: stdout)")
+    args = parser.parse_args(argv)
+    
+    tools = OrderTools()
+    if args.ids:
+        infile = sys.stdin if args.ids == "-" else open(args.ids, "r", encoding="utf-8")
+        order_ids = (line.strip() for line in infile if line.strip())
+        if args.track:
+            chunks = tools.bulk_track_orders(order_ids, args.chunk_size)
+        else:
+            chunks = tools.bulk_order_status(order_ids, args.chunk_size)
+    else:
+        chunks = tools.bulk_orders_by_filter(args.status, args.since, args.until, args.chunk_size, tracking=args.track)
+    
+    outfile = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    written = 0
+    try:
+        for chunk in chunks:
+            outfile.write("".join(json.dumps(record) + "\n" for record in chunk))
+            written += len(chunk)
+    finally:
+        if outfile is not sys.stdout:
+            outfile.close()
+        if args.ids and args.ids != "-":
+            infile.close()
+    return written
+
 if __name__ == "__main__":
     import sys
     
     if len(sys.argv) > 1 and sys.argv[1] == "examples":
         run_examples()
+    elif len(sys.argv) > 1 and sys.argv[1] == "batch":
+        if len(sys.argv) < 4:
+            print("Usage: python main.py batch <in.jsonl> <out.jsonl> [concurrency]")
+            sys.exit(1)
+        
+        from batch_runner import BatchRunner
+        concurrency = int(sys.argv[4]) if len(sys.argv) > 4 else None
+        stats = BatchRunner(concurrency=concurrency).run(sys.argv[2], sys.argv[3])
+        print(f"Processed {stats['processed']} queries ({stats['failed']} failed) in {stats['total_seconds']}s")
+    elif len(sys.argv) > 1 and sys.argv[1] == "orders":
+        written = export_order_statuses(sys.argv[2:])
+        print(f"Exported {written} order records", file=sys.stderr)
     elif len(sys.argv) > 1 and sys.argv[1] == "enhanced":
         print("🚀 Enhanced E-commerce Customer Service with Orchestration")
         service = EnhancedEcommerceService()
+        on_token = service.print_token if stream_enabled() else None
+        if os.getenv("METRICS_PORT"):
+            print(f"📈 Metrics at {service.start_metrics_server(int(os.getenv('METRICS_PORT'))).url}")
         
         while True:
             try:
@@ -314,7 +500,9 @@ if __name__ == "__main__":
                 if user_input.lower() in ['quit', 'exit']:
                     break
                 
-                response = service.chat_with_analytics(user_input)
+                if on_token:
+                    print("\nAssistant: ", end="", flush=True)
+                response = service.chat_with_analytics(user_input, on_token=on_token)
                 service.print_response(response)
                 
             except KeyboardInterrupt:
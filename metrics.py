@@ -0,0 +1,232 @@
+import math
+import threading
+import weakref
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Tuple
+
+from latency_sketch import LatencySeries, LogHistogram
+
+# Upper bounds, in seconds, of the cumulative buckets exported for every histogram
+HISTOGRAM_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# samples: list of (name suffix, labels dict, value)
+MetricFamily = namedtuple("MetricFamily", ["name", "type", "help", "samples"])
+
+class _Shard:
+    """
+    One thread's counters and histograms; only the owning thread writes to it
+    """
+
+    __slots__ = ("counters", "histograms")
+
+    def __init__(self):
+        self.counters: Dict[Tuple[str, tuple], float] = {}
+        self.histograms: Dict[Tuple[str, tuple], LatencySeries] = {}
+
+class _ThreadToken:
+    """Held only in a thread's local storage, so it is collected when the thread exits"""
+
+    __slots__ = ("__weakref__",)
+
+class ShardedMetrics:
+    """
+    Counters and latency histograms sharded per thread and aggregated on read.
+
+    Recording touches only the calling thread's shard, so the request path never
+    waits on a lock; the registry lock is taken once per new thread and by readers.
+    A thread's shard is queued for retirement as the thread exits and folded into one
+    retired shard at the next registration or read, so the shard list tracks the live
+    threads even when nothing reads the metrics.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard()
+        # Shards of exited threads; appended by finalizers, which must not take the lock
+        self._exited: List[_Shard] = []
+        self._lock = threading.Lock()
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = _Shard()
+            token = self._local.token = _ThreadToken()
+            weakref.finalize(token, self._exited.append, shard).atexit = False
+            with self._lock:
+                self._retire_exited()
+                self._shards.append(shard)
+        return shard
+
+    def _retire_exited(self):
+        """Fold the shards of exited threads into the retired shard; call with the lock held"""
+        while self._exited:
+            shard = self._exited.pop()
+            self._fold(shard, self._retired)
+            self._shards.remove(shard)
+
+    def inc(self, name: str, value: float = 1, **labels):
+        counters = self._shard().counters
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        histograms = self._shard().histograms
+        key = (name, tuple(sorted(labels.items())))
+        series = histograms.get(key)
+        if series is None:
+            series = histograms[key] = LatencySeries()
+        series.add(value)
+
+    def _fold(self, shard: _Shard, target: _Shard):
+        for key, value in list(shard.counters.items()):
+            target.counters[key] = target.counters.get(key, 0) + value
+        for key, series in list(shard.histograms.items()):
+            if key not in target.histograms:
+                target.histograms[key] = LatencySeries()
+            target.histograms[key].merge(series)
+
+    def _aggregate(self) -> _Shard:
+        total = _Shard()
+        with self._lock:
+            self._retire_exited()
+            self._fold(self._retired, total)
+            for shard in self._shards:
+                self._fold(shard, total)
+        return total
+
+    def counters(self, name: str = None) -> Dict[Tuple[str, tuple], float]:
+        """Summed counters keyed by (name, sorted label pairs), optionally for one name"""
+        counters = self._aggregate().counters
+        return {key: value for key, value in counters.items() if name is None or key[0] == name}
+
+    def histograms(self, name: str = None) -> Dict[Tuple[str, tuple], LatencySeries]:
+        """Merged histograms keyed like counters()"""
+        histograms = self._aggregate().histograms
+        return {key: series for key, series in histograms.items() if name is None or key[0] == name}
+
+    def snapshot(self) -> dict:
+        """JSON-serialisable copy of everything recorded, for merging in another process"""
+        total = self._aggregate()
+        return {
+            "counters": [[name, dict(labels), value] for (name, labels), value in total.counters.items()],
+            "histograms": [[name, dict(labels), series.to_dict()] for (name, labels), series in total.histograms.items()]
+        }
+
+    def merge(self, snapshot: dict):
+        """Fold another registry's snapshot() into this one"""
+        incoming = _Shard()
+        for name, labels, value in snapshot["counters"]:
+            incoming.counters[(name, tuple(sorted(labels.items())))] = value
+        for name, labels, series in snapshot["histograms"]:
+            incoming.histograms[(name, tuple(sorted(labels.items())))] = LatencySeries.from_dict(series)
+        with self._lock:
+            self._fold(incoming, self._retired)
+
+    def collect(self, prefix: str = "chatbot_", help_text: Dict[str, str] = None) -> List[MetricFamily]:
+        """Everything in the registry as metric families; counter names should end in _total"""
+        help_text = help_text or {}
+        total = self._aggregate()
+        families = {}
+        for (name, labels), value in sorted(total.counters.items()):
+            family = families.setdefault(name, MetricFamily(prefix + name, "counter", help_text.get(name, ""), []))
+            family.samples.append(("", dict(labels), value))
+        for (name, labels), series in sorted(total.histograms.items(), key=lambda item: item[0]):
+            family = families.setdefault(name, MetricFamily(prefix + name, "histogram", help_text.get(name, ""), []))
+            family.samples.extend(histogram_samples(series.total, dict(labels)))
+        return list(families.values())
+
+def histogram_samples(histogram: LogHistogram, labels: dict, buckets: tuple = HISTOGRAM_BUCKETS) -> list:
+    """Cumulative _bucket samples plus _sum and _count for one histogram"""
+    samples = [("_bucket", {**labels, "le": _format_value(bound)}, histogram.count_below(bound)) for bound in buckets]
+    samples.append(("_bucket", {**labels, "le": "+Inf"}, histogram.count))
+    samples.append(("_sum", labels, histogram.sum))
+    samples.append(("_count", labels, histogram.count))
+    return samples
+
+# Prometheus text exposition format
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if math.isnan(value):
+            return "NaN"
+        return repr(value)
+    return str(value)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def render_prometheus(families: List[MetricFamily]) -> str:
+    lines = []
+    for family in families:
+        if family.help:
+            lines.append(f"# HELP {family.name} {_escape(family.help)}")
+        lines.append(f"# TYPE {family.name} {family.type}")
+        for suffix, labels, value in family.samples:
+            label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+            lines.append(f"{family.name}{suffix}{{{label_text}}} {_format_value(value)}" if label_text
+                         else f"{family.name}{suffix} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    collect: Callable[[], List[MetricFamily]] = None
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        try:
+            body = render_prometheus(type(self).collect()).encode("utf-8")
+        except Exception as e:
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class MetricsServer:
+    """
+    Serves GET /metrics in Prometheus text format from a background thread
+    """
+
+    def __init__(self, collect: Callable[[], List[MetricFamily]], port: int = 9100, host: str = "0.0.0.0"):
+        handler_class = type("MetricsHandler", (_MetricsHandler,), {"collect": staticmethod(collect)})
+        self.httpd = ThreadingHTTPServer((host, port), handler_class)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def start(self) -> "MetricsServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="metrics-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+_default_metrics = None
+_default_metrics_lock = threading.Lock()
+
+def get_default_metrics() -> ShardedMetrics:
+    """Process-wide registry for metrics recorded outside a service object, such as LLM calls"""
+    global _default_metrics
+
+    if _default_metrics is not None:
+        return _default_metrics
+    with _default_metrics_lock:
+        if _default_metrics is None:
+            _default_metrics = ShardedMetrics()
+        return _default_metrics
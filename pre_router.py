@@ -0,0 +1,84 @@
+import re
+from typing import Dict, List
+
+# Keyword lists shared with the LLM routing prompt in RouterAgent
+AGENT_KEYWORDS: Dict[str, List[str]] = {
+    "order": ["order", "track", "cancel", "shipping", "delivery"],
+    "product": ["product", "item", "buy", "price", "stock", "available"],
+    "support": ["help", "support", "problem", "issue", "refund", "return", "policy"],
+    "weather": ["weather", "temperature", "forecast", "climate"]
+}
+
+# Identifiers that pin a query to one agent on their own
+AGENT_PATTERNS: Dict[str, List[str]] = {
+    "order": [r"\bORD\d+\b"],
+    "product": [r"\bPROD\d+\b"],
+    "weather": [r"\b(?:weather|forecast)\s+(?:in|for|at)\s+[A-Za-z]"]
+}
+
+
+class KeywordPreRouter:
+    """
+    Local rule-based classifier that routes obvious queries without an LLM call
+    """
+
+    def __init__(self, keywords: Dict[str, List[str]] = None, patterns: Dict[str, List[str]] = None,
+                 keyword_weight: float = 1.0, pattern_weight: float = 3.0):
+        self.keywords = keywords or AGENT_KEYWORDS
+        self.keyword_weight = keyword_weight
+        self.pattern_weight = pattern_weight
+
+        # Keywords match as word prefixes so "orders", "tracking" and "returns" count too
+        self._keyword_regexes = {
+            agent: re.compile(r"\b(?:" + "|".join(re.escape(word) for word in words) + r")\w*", re.IGNORECASE)
+            for agent, words in self.keywords.items()
+        }
+        self._pattern_regexes = {
+            agent: [re.compile(pattern, re.IGNORECASE) for pattern in agent_patterns]
+            for agent, agent_patterns in (patterns or AGENT_PATTERNS).items()
+        }
+
+    def score(self, query: str) -> Dict[str, float]:
+        """Score every agent by keyword and pattern matches"""
+        scores = {}
+        for agent, regex in self._keyword_regexes.items():
+            scores[agent] = len(regex.findall(query)) * self.keyword_weight
+
+        for agent, regexes in self._pattern_regexes.items():
+            for regex in regexes:
+                if regex.search(query):
+                    scores[agent] = scores.get(agent, 0) + self.pattern_weight
+
+        return scores
+
+    def classify(self, query: str) -> dict:
+        """Return a routing decision in the same shape as the LLM router"""
+        scores = self.score(query)
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        best_agent, best_score = ranked[0] if ranked else ("support", 0)
+
+        if best_score <= 0:
+            return {
+                "agent": "support",
+                "confidence": 0.0,
+                "reasoning": "no routing keywords matched"
+            }
+
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0
+        if best_score == runner_up:
+            return {
+                "agent": best_agent,
+                "confidence": 0.5,
+                "reasoning": f"keyword tie between {best_agent} and {ranked[1][0]}"
+            }
+
+        # Confidence grows with the winning margin and with the total evidence
+        margin = (best_score - runner_up) / best_score
+        evidence = min(best_score, 4) / 4
+        confidence = round(min(0.99, 0.5 + 0.3 * margin + 0.2 * evidence), 2)
+
+        return {
+            "agent": best_agent,
+            "confidence": confidence,
+            "reasoning": f"matched {best_agent} keywords (score {best_score:g} vs {runner_up:g})"
+        }
@@ -3,31 +3,168 @@ from agents.order_agent import OrderAgent
 from agents.product_agent import ProductAgent
 from agents.support_agent import SupportAgent
 from agents.weather_agent import WeatherAgent
+from agents.base_agent import extract_json
+from llm_scheduler import LLMUnavailableError
+from pre_router import AGENT_KEYWORDS, KeywordPreRouter
+from tracing import get_tracer
+from typing import Callable
 import json
+import os
 
 class RouterAgent:
-    def __init__(self):
+    def __init__(self, fast_path_threshold: float = None, fused_analysis: bool = None,
+                 render_mode: str = None):
         self.llm = GroqLLM()
         self.agents = {
-            "order": OrderAgent(),
-            "product": ProductAgent(),
-            "support": SupportAgent(),
+            "order": OrderAgent(render_mode),
+            "product": ProductAgent(render_mode),
+            "support": SupportAgent(render_mode),
             "weather": WeatherAgent()
         }
         
-    def route_query(self, user_query: str, context: dict = None) -> dict:
-        """Route user query to appropriate agent"""
+        # Queries the keyword pre-router is at least this confident about skip the LLM
+        if fast_path_threshold is None:
+            fast_path_threshold = float(os.getenv("ROUTER_FAST_PATH_THRESHOLD", "0.8"))
+        self.fast_path_threshold = fast_path_threshold
+        self.pre_router = KeywordPreRouter()
+        self.routing_stats = {"fast_path_hits": 0, "fast_path_misses": 0}
         
-        routing_prompt = f"""
+        # Fused mode asks for the agent's action and entities in the routing call itself
+        if fused_analysis is None:
+            fused_analysis = os.getenv("ROUTER_FUSED_ANALYSIS", "false").lower() in ("1", "true", "yes")
+        self.fused_analysis = fused_analysis
+        
+    def route_query(self, user_query: str, context: dict = None,
+                    on_token: Callable[[str], None] = None) -> dict:
+        """Route user query to appropriate agent, streaming the reply to on_token if given"""
+        
+        with get_tracer().span("router.route_query") as span:
+            try:
+                routing_decision = self._fast_route(user_query)
+                if routing_decision is None:
+                    routing_result = self.llm._call(self._llm_route_prompt(user_query), priority="routing")
+                    routing_decision = self._parse_llm_route(routing_result)
+                
+                agent, analysis, routing = self._select_agent(routing_decision)
+                self._annotate_span(span, routing)
+                agent_response = agent.process(user_query, context, analysis=analysis, on_token=on_token)
+            except LLMUnavailableError as e:
+                span.record_error(e)
+                response = self._unavailable_response(e)
+                # Streaming callers print only what reaches on_token
+                if on_token is not None:
+                    on_token(response["response"])
+                return response
+        
+        if routing:
+            agent_response["routing"] = routing
+        return agent_response
+    
+    async def aroute_query(self, user_query: str, context: dict = None) -> dict:
+        """Async variant of route_query for the asyncio request path"""
+        
+        with get_tracer().span("router.route_query") as span:
+            try:
+                routing_decision = self._fast_route(user_query)
+                if routing_decision is None:
+                    routing_result = await self.llm._acall(self._llm_route_prompt(user_query), priority="routing")
+                    routing_decision = self._parse_llm_route(routing_result)
+                
+                agent, analysis, routing = self._select_agent(routing_decision)
+                self._annotate_span(span, routing)
+                agent_response = await agent.aprocess(user_query, context, analysis=analysis)
+            except LLMUnavailableError as e:
+                span.record_error(e)
+                return self._unavailable_response(e)
+        
+        if routing:
+            agent_response["routing"] = routing
+        return agent_response
+    
+    def _annotate_span(self, span, routing: dict):
+        if routing:
+            span.set_attribute("routing.agent", routing["selected_agent"])
+            span.set_attribute("routing.source", routing["source"])
+        else:
+            span.set_attribute("routing.agent", "support")
+            span.set_attribute("routing.source", "default")
+    
+    def _unavailable_response(self, error: LLMUnavailableError) -> dict:
+        """Reply when the language model is unavailable, instead of misrouting the query"""
+        return {
+            "agent": "Router Agent",
+            "response": "I'm sorry, our assistant is busy right now. Please try again in a moment.",
+            "data": {},
+            "error": str(error),
+            "success": False
+        }
+    
+    def _fast_route(self, user_query: str) -> dict:
+        """Keyword routing decision, None when the LLM has to decide"""
+        routing_decision = self.pre_router.classify(user_query)
+        
+        if routing_decision["confidence"] >= self.fast_path_threshold:
+            self.routing_stats["fast_path_hits"] += 1
+            routing_decision["source"] = "rules"
+            return routing_decision
+        
+        self.routing_stats["fast_path_misses"] += 1
+        return None
+    
+    def _llm_route_prompt(self, user_query: str) -> str:
+        if self.fused_analysis:
+            return self._fused_route_prompt(user_query)
+        return self._routing_prompt(user_query)
+    
+    def _parse_llm_route(self, routing_result: str) -> dict:
+        """Parse the routing completion, None if it is unparseable"""
+        try:
+            if self.fused_analysis:
+                routing_decision = json.loads(extract_json(routing_result))
+                routing_decision["source"] = "fused"
+            else:
+                routing_decision = json.loads(routing_result)
+                routing_decision["source"] = "llm"
+            return routing_decision
+        except (json.JSONDecodeError, ValueError, TypeError):
+            return None
+    
+    def _select_agent(self, routing_decision: dict) -> tuple:
+        """Resolve a routing decision to (agent, analysis, routing info)"""
+        if routing_decision is None:
+            return self.agents["support"], None, None
+        
+        selected_agent = routing_decision.get("agent", "support")
+        if selected_agent not in self.agents:
+            return self.agents["support"], None, None
+        
+        # Fused decisions already carry the agent's action and entities
+        analysis = routing_decision if routing_decision["source"] == "fused" else None
+        routing = {
+            "selected_agent": selected_agent,
+            "confidence": routing_decision.get("confidence", 0.5),
+            "reasoning": routing_decision.get("reasoning", ""),
+            "source": routing_decision["source"]
+        }
+        return self.agents[selected_agent], analysis, routing
+    
+    def _routing_prompt(self, user_query: str) -> str:
+        """Prompt that asks the LLM for a routing decision"""
+        
+        keyword_lines = {
+            agent: ", ".join(words) for agent, words in AGENT_KEYWORDS.items()
+        }
+        
+        return f"""
         Analyze this customer query and determine which agent should handle it:
         
         Query: "{user_query}"
         
         Available agents:
-        1. order - handles order status, tracking, cancellations (keywords: order, track, cancel, shipping, delivery)
-        2. product - handles product search, details, availability (keywords: product, item, buy, price, stock, available)
-        3. support - handles general support, FAQ, complaints (keywords: help, support, problem, issue, refund, return, policy)
-        4. weather - handles weather queries (keywords: weather, temperature, forecast, climate)
+        1. order - handles order status, tracking, cancellations (keywords: {keyword_lines["order"]})
+        2. product - handles product search, details, availability (keywords: {keyword_lines["product"]})
+        3. support - handles general support, FAQ, complaints (keywords: {keyword_lines["support"]})
+        4. weather - handles weather queries (keywords: {keyword_lines["weather"]})
         
         Consider the main intent and keywords.
         **Output ONLY the JSON below, without any explanation or text:**
@@ -38,30 +175,68 @@ class RouterAgent:
             "reasoning": "brief explanation"
         }}
         """
+    
+    def _fused_route_prompt(self, user_query: str) -> str:
+        """Prompt that routes and analyses the query in a single LLM call"""
         
-        routing_result = self.llm._call(routing_prompt)
+        keyword_lines = {
+            agent: ", ".join(words) for agent, words in AGENT_KEYWORDS.items()
+        }
         
-        try:
-            routing_decision = json.loads(routing_result)
-            selected_agent = routing_decision.get("agent", "support")
-            confidence = routing_decision.get("confidence", 0.5)
-            
-            # Route to selected agent
-            if selected_agent in self.agents:
-                agent_response = self.agents[selected_agent].process(user_query, context)
-                agent_response["routing"] = {
-                    "selected_agent": selected_agent,
-                    "confidence": confidence,
-                    "reasoning": routing_decision.get("reasoning", "")
-                }
-                return agent_response
-            else:
-               
-                return self.agents["support"].process(user_query, context)
-                
-        except json.JSONDecodeError:
-
-            return self.agents["support"].process(user_query, context)
+        return f"""
+        Analyze this customer query, choose the agent that should handle it and the action that agent should take:
+        
+        Query: "{user_query}"
+        
+        Available agents and their actions:
+        1. order (keywords: {keyword_lines["order"]})
+           actions: get_order_status, track_order, cancel_order, list_orders, general_info
+        2. product (keywords: {keyword_lines["product"]})
+           actions: search_products, get_product_details, check_availability, general_info
+        3. support (keywords: {keyword_lines["support"]})
+           actions: faq_answer (shipping, returns, warranty, payment), create_ticket, escalate, general_help
+        4. weather (keywords: {keyword_lines["weather"]})
+           actions: current_weather, forecast
+        
+        Extract every entity that is mentioned and use null for the rest:
+        - order_id: format ORD followed by numbers
+        - customer_id: format CUST followed by numbers
+        - product_id: format PROD followed by numbers
+        - search_terms: what the customer is searching for
+        - faq_topic: shipping, returns, warranty or payment
+        - frustrated: true if the customer seems angry, frustrated, disappointed
+        - location: city or place for weather queries
+        - forecast_days: number of forecast days, default 5
+        
+        **Output ONLY the JSON below, without any explanation or text:**
+       
+        {{
+            "agent": "agent_name",
+            "action": "action_name",
+            "order_id": null,
+            "customer_id": null,
+            "product_id": null,
+            "search_terms": null,
+            "faq_topic": null,
+            "frustrated": false,
+            "location": null,
+            "forecast_days": 5,
+            "confidence": 0.95,
+            "reasoning": "brief explanation"
+        }}
+        """
+    
+    def get_routing_stats(self) -> dict:
+        """Report how many routing LLM calls the fast path eliminated"""
+        hits = self.routing_stats["fast_path_hits"]
+        total = hits + self.routing_stats["fast_path_misses"]
+        return {
+            "fast_path_hits": hits,
+            "fast_path_misses": self.routing_stats["fast_path_misses"],
+            "fast_path_hit_rate": (hits / total) * 100 if total > 0 else 0,
+            "threshold": self.fast_path_threshold,
+            "fused_analysis": self.fused_analysis
+        }
     
     def list_capabilities(self) -> dict:
         """List all available capabilities"""
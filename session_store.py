@@ -0,0 +1,256 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime
+from typing import List, Optional
+
+# Approximate CPython footprint of one stored turn (tuple, float, str headers) and of
+# one session (object, deque block, dict entry); message text is counted on top
+TURN_OVERHEAD = 220
+SESSION_OVERHEAD = 900
+
+class _Session:
+    __slots__ = ("turns", "size", "last_access")
+
+    def __init__(self, max_turns: int):
+        self.turns = deque(maxlen=max_turns)
+        self.size = SESSION_OVERHEAD
+        self.last_access = time.time()
+
+def _turn_size(turn: tuple) -> int:
+    return TURN_OVERHEAD + len(turn[1]) + len(turn[2] or "")
+
+class _Shard:
+    """
+    One lock stripe of the store: sessions in least-recently-used order
+    """
+
+    __slots__ = ("sessions", "size", "lock", "stats")
+
+    def __init__(self):
+        self.sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self.size = 0
+        self.lock = threading.Lock()
+        self.stats = {"created": 0, "resumed": 0, "expired": 0, "evicted": 0, "spilled": 0}
+
+class SQLiteSessionTier:
+    """
+    On-disk tier holding sessions evicted from memory until their customer returns
+    """
+
+    def __init__(self, path: str, ttl: float = 7 * 86400):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, turns TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._writes = 0
+
+    def save_many(self, sessions: List[tuple]):
+        """Store (session_id, turns) pairs, replacing earlier copies"""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO sessions (session_id, turns, expires_at) VALUES (?, ?, ?)",
+                [(session_id, json.dumps(turns), expires_at) for session_id, turns in sessions]
+            )
+            self._writes += len(sessions)
+            # Purge now and then rather than on every write
+            if self._writes >= 1000:
+                self._writes = 0
+                self._conn.execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+            self._conn.commit()
+
+    def load(self, session_id: str) -> Optional[list]:
+        """A spilled session's turns, left on disk"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT turns, expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        return json.loads(row[0]) if row is not None and row[1] >= time.time() else None
+
+    def pop(self, session_id: str) -> Optional[list]:
+        """A spilled session's turns, removed from disk since it is back in memory"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT turns, expires_at FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+            return json.loads(row[0]) if row[1] >= time.time() else None
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+class SessionStore:
+    """
+    Per-session conversation history with bounded memory.
+
+    Each session keeps its last max_turns turns in a ring buffer. Sessions idle for
+    longer than ttl are dropped, and the least recently used ones are evicted
+    whenever the store exceeds max_sessions or its estimated max_bytes. With a
+    spill tier, evicted sessions are written to disk and reloaded when the
+    customer comes back. Sessions are striped over independently locked shards,
+    each enforcing its share of the limits.
+    """
+
+    def __init__(self, max_turns: int = 10, ttl: float = 1800, max_sessions: int = 100000,
+                 max_bytes: int = 64 * 1024 * 1024, spill: SQLiteSessionTier = None,
+                 shards: int = 16, max_message_chars: int = 2000):
+        self.max_turns = max_turns
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.spill = spill
+        self.max_message_chars = max_message_chars
+        self._shards = [_Shard() for _ in range(shards)]
+        self._shard_sessions = max(1, max_sessions // shards)
+        self._shard_bytes = max(1, max_bytes // shards)
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[hash(session_id) % len(self._shards)]
+
+    def append(self, session_id: str, role: str, message: str, agent: str = None):
+        """Add a turn to the session, creating or resuming it as needed"""
+        turn = (role, (message or "")[:self.max_message_chars], agent, time.time())
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = self._session(shard, session_id, create=True)
+            size = _turn_size(turn)
+            if len(session.turns) == self.max_turns:
+                # The ring buffer drops its oldest turn
+                size -= _turn_size(session.turns[0])
+            session.turns.append(turn)
+            session.size += size
+            shard.size += size
+            self._enforce(shard, turn[3])
+
+    def history(self, session_id: str, limit: int = None) -> List[dict]:
+        """The session's most recent turns, oldest first; reading a spilled session leaves it on disk"""
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = self._session(shard, session_id, create=False)
+            if session is not None:
+                turns = list(session.turns)
+            else:
+                # Only append brings a session back into memory, where _enforce keeps the shard in bounds
+                spilled = self.spill.load(session_id) if self.spill is not None else None
+                turns = [tuple(turn) for turn in spilled or []]
+        if limit is not None:
+            turns = turns[-limit:] if limit > 0 else []
+        return [self._turn_dict(turn) for turn in turns]
+
+    def end_session(self, session_id: str):
+        """Forget a session in memory and on disk"""
+        shard = self._shard(session_id)
+        with shard.lock:
+            session = shard.sessions.pop(session_id, None)
+            if session is not None:
+                shard.size -= session.size
+        if self.spill is not None:
+            self.spill.delete(session_id)
+
+    def _session(self, shard: _Shard, session_id: str, create: bool) -> Optional[_Session]:
+        """Look up a session under the shard lock; with create, a spilled session is resumed from disk"""
+        now = time.time()
+        session = shard.sessions.get(session_id)
+        if session is not None and session.last_access + self.ttl < now:
+            shard.stats["expired"] += 1
+            if self.spill is None:
+                self._drop(shard, session_id, session)
+                session = None
+            else:
+                # Same outcome as spilling it and reading it straight back
+                shard.stats["resumed"] += 1
+
+        if session is None:
+            if not create:
+                return None
+            turns = self.spill.pop(session_id) if self.spill is not None else None
+            session = _Session(self.max_turns)
+            for turn in turns or []:
+                session.turns.append(tuple(turn))
+            session.size += sum(_turn_size(turn) for turn in session.turns)
+            shard.sessions[session_id] = session
+            shard.size += session.size
+            shard.stats["resumed" if turns else "created"] += 1
+
+        session.last_access = now
+        shard.sessions.move_to_end(session_id)
+        return session
+
+    def _drop(self, shard: _Shard, session_id: str, session: _Session):
+        del shard.sessions[session_id]
+        shard.size -= session.size
+
+    def _enforce(self, shard: _Shard, now: float):
+        """Expire idle sessions, then evict the least recently used ones down to the shard's share"""
+        evicted = []
+        # The session just written is the most recent, so it always stays
+        while len(shard.sessions) > 1:
+            session_id, session = next(iter(shard.sessions.items()))
+            if session.last_access + self.ttl < now:
+                shard.stats["expired"] += 1
+            elif len(shard.sessions) > self._shard_sessions or shard.size > self._shard_bytes:
+                shard.stats["evicted"] += 1
+            else:
+                break
+            self._drop(shard, session_id, session)
+            evicted.append((session_id, [list(turn) for turn in session.turns]))
+
+        # Written under the shard lock so a returning customer cannot miss their own spill
+        if evicted and self.spill is not None:
+            self.spill.save_many(evicted)
+            shard.stats["spilled"] += len(evicted)
+
+    def _turn_dict(self, turn: tuple) -> dict:
+        role, message, agent, timestamp = turn
+        entry = {"role": role, "message": message, "timestamp": datetime.fromtimestamp(timestamp).isoformat()}
+        if agent is not None:
+            entry["agent"] = agent
+        return entry
+
+    def __len__(self) -> int:
+        return sum(len(shard.sessions) for shard in self._shards)
+
+    def get_stats(self) -> dict:
+        stats = {}
+        for shard in self._shards:
+            for key, value in shard.stats.items():
+                stats[key] = stats.get(key, 0) + value
+        stats["sessions"] = len(self)
+        stats["estimated_bytes"] = sum(shard.size for shard in self._shards)
+        if self.spill is not None:
+            stats["spilled_sessions"] = len(self.spill)
+        return stats
+
+def create_session_store() -> SessionStore:
+    """
+    Session store configured from SESSION_MAX_TURNS, SESSION_TTL, SESSION_MAX_COUNT,
+    SESSION_MAX_MB and SESSION_SPILL_PATH (an SQLite file; unset keeps sessions in memory only)
+    """
+    spill_path = os.getenv("SESSION_SPILL_PATH")
+    return SessionStore(
+        max_turns=int(os.getenv("SESSION_MAX_TURNS", "10")),
+        ttl=float(os.getenv("SESSION_TTL", "1800")),
+        max_sessions=int(os.getenv("SESSION_MAX_COUNT", "100000")),
+        max_bytes=int(float(os.getenv("SESSION_MAX_MB", "64")) * 1024 * 1024),
+        spill=SQLiteSessionTier(spill_path, float(os.getenv("SESSION_SPILL_TTL", str(7 * 86400)))) if spill_path else None
+    )
@@ -0,0 +1,18 @@
+from batch_runner import read_queries
+
+def test_read_queries_reports_bad_lines_without_stopping(tmp_path):
+    path = tmp_path / "queries.jsonl"
+    path.write_text('[1, 2]\n"hi"\n\n42\nnull\nnot json\n{"query": "Track ORD001", "session_id": "s1"}\n',
+                    encoding="utf-8")
+
+    records = list(read_queries(str(path)))
+
+    assert records == [
+        {"line": 1, "error": "Expected a JSON object or string"},
+        {"line": 2, "query": "hi"},
+        {"line": 4, "error": "Expected a JSON object or string"},
+        {"line": 5, "error": "Expected a JSON object or string"},
+        {"line": 6, "error": records[4]["error"]},
+        {"line": 7, "query": "Track ORD001", "session_id": "s1"}
+    ]
+    assert records[4]["error"].startswith("Invalid JSON")
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from latency_sketch import LatencySeries, LogHistogram, RotatingHistogram
+
+def exact_quantile(values, q):
+    ordered = sorted(values)
+    return ordered[int(q * (len(ordered) - 1))]
+
+@pytest.mark.parametrize("q", [0.5, 0.9, 0.95, 0.99])
+def test_quantiles_within_relative_accuracy(q):
+    rng = random.Random(7)
+    values = [rng.lognormvariate(-1.5, 1.0) for _ in range(20000)]
+    histogram = LogHistogram(relative_accuracy=0.01)
+    for value in values:
+        histogram.add(value)
+
+    expected = exact_quantile(values, q)
+    assert abs(histogram.quantile(q) - expected) <= 0.01 * expected
+
+def test_merge_matches_single_histogram():
+    rng = random.Random(11)
+    values = [rng.expovariate(5) for _ in range(10000)]
+    whole, parts = LogHistogram(), [LogHistogram() for _ in range(4)]
+    for i, value in enumerate(values):
+        whole.add(value)
+        parts[i % 4].add(value)
+
+    merged = LogHistogram()
+    for part in parts:
+        merged.merge(part)
+
+    assert merged.buckets == whole.buckets
+    assert (merged.count, merged.min, merged.max) == (whole.count, whole.min, whole.max)
+    assert merged.sum == pytest.approx(whole.sum)
+    for q in (0.5, 0.99):
+        assert merged.quantile(q) == whole.quantile(q)
+
+def test_merge_rejects_different_accuracy():
+    with pytest.raises(ValueError):
+        LogHistogram(0.01).merge(LogHistogram(0.02))
+
+def test_empty_and_tiny_values():
+    histogram = LogHistogram()
+    assert histogram.quantile(0.5) is None
+    assert histogram.summary()["p99"] is None
+
+    histogram.add(0.0)
+    histogram.add(1e-9)
+    histogram.add(2.0)
+    assert histogram.zero_count == 2
+    assert histogram.quantile(0.0) == 0.0
+    assert histogram.count_below(1.0) == 2
+    assert histogram.count_below(3.0) == 3
+
+def test_dict_round_trip():
+    histogram = LogHistogram()
+    for value in (0.01, 0.2, 0.2, 3.5):
+        histogram.add(value)
+    restored = LogHistogram.from_dict(histogram.to_dict())
+
+    assert restored.to_dict() == histogram.to_dict()
+    assert restored.quantile(0.5) == histogram.quantile(0.5)
+    assert LogHistogram.from_dict(LogHistogram().to_dict()).count == 0
+
+def test_rotating_window_drops_old_slots():
+    window = RotatingHistogram(window=60, slots=6)
+    window.add(1.0, now=1000)
+    window.add(2.0, now=1055)
+
+    assert window.merged(now=1055).count == 2
+    # The first slot [1000, 1010) leaves the window once the window has moved a full minute past it
+    assert window.merged(now=1065).count == 1
+    assert window.merged(now=1200).count == 0
+
+def test_series_merge_across_processes():
+    first, second = LatencySeries(), LatencySeries()
+    first.add(0.1, now=1000)
+    second.add(0.3, now=1001)
+
+    first.merge(LatencySeries.from_dict(second.to_dict()))
+
+    assert first.total.count == 2
+    assert first.window("1m", now=1005).count == 2
+    assert first.window("1m", now=1100).count == 0
@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+import groq
+import httpx
+import pytest
+
+from llm_scheduler import LLMScheduler, LLMUnavailableError, priority_scope
+
+def make_scheduler(**kwargs) -> LLMScheduler:
+    options = {"requests_per_minute": 0, "tokens_per_minute": 0, "max_retries": 3, "base_delay": 0.001}
+    options.update(kwargs)
+    return LLMScheduler(**options)
+
+def groq_error(error_class, status_code: int, headers: dict = None):
+    request = httpx.Request("POST", "https://api.groq.com/openai/v1/chat/completions")
+    response = httpx.Response(status_code, headers=headers or {}, request=request)
+    return error_class("upstream error", response=response, body=None)
+
+def failing(errors: list, result: str = "ok"):
+    """fn that raises each of errors in turn, then returns result"""
+    calls = []
+
+    def fn():
+        calls.append(time.monotonic())
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+    return fn, calls
+
+def test_rate_limit_is_retried_after_retry_after():
+    scheduler = make_scheduler()
+    fn, calls = failing([groq_error(groq.RateLimitError, 429, {"retry-after": "0.2"})])
+
+    assert scheduler.call(fn) == "ok"
+
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.19
+    stats = scheduler.get_stats()
+    assert stats["rate_limited"] == 1
+    assert stats["retries"] == 1
+
+def test_retry_after_pauses_every_queued_call():
+    scheduler = make_scheduler()
+    fn, _ = failing([groq_error(groq.RateLimitError, 429, {"retry-after": "0.2"})])
+    scheduler.call(fn)
+
+    # The pause has already elapsed for the retried call; a fresh one is admitted at once
+    start = time.monotonic()
+    scheduler.acquire()
+    assert time.monotonic() - start < 0.1
+
+def test_server_errors_are_retried_until_exhausted():
+    scheduler = make_scheduler(max_retries=2)
+    error = groq_error(groq.InternalServerError, 503)
+    fn, calls = failing([error, error, error, error])
+
+    with pytest.raises(LLMUnavailableError) as raised:
+        scheduler.call(fn)
+
+    assert len(calls) == 3
+    assert raised.value.status_code == 503
+    assert scheduler.get_stats()["failures"] == 1
+
+@pytest.mark.parametrize("error", [
+    ValueError("bad prompt"),
+    groq_error(groq.BadRequestError, 400),
+    groq_error(groq.AuthenticationError, 401)
+])
+def test_non_retryable_errors_fail_immediately(error):
+    scheduler = make_scheduler()
+    fn, calls = failing([error])
+
+    with pytest.raises(LLMUnavailableError):
+        scheduler.call(fn)
+
+    assert len(calls) == 1
+    assert scheduler.get_stats()["retries"] == 0
+
+def test_async_call_retries():
+    scheduler = make_scheduler()
+    error = groq_error(groq.InternalServerError, 502)
+    fn, calls = failing([error])
+
+    async def afn():
+        return fn()
+
+    assert asyncio.run(scheduler.acall(afn)) == "ok"
+    assert len(calls) == 2
+
+def test_request_bucket_limits_rate():
+    # 600 rpm with a burst of 600: drain the burst, then each grant waits ~0.1s
+    scheduler = make_scheduler(requests_per_minute=600)
+    scheduler.request_bucket.tokens = 0
+
+    start = time.monotonic()
+    scheduler.acquire()
+    scheduler.acquire()
+    assert 0.15 <= time.monotonic() - start < 1.0
+
+def test_async_waiters_are_granted_by_priority():
+    scheduler = make_scheduler(requests_per_minute=600)
+    scheduler.request_bucket.tokens = 0
+    order = []
+
+    async def waiter(name, priority):
+        await scheduler.aacquire(priority)
+        order.append(name)
+
+    async def main():
+        tasks = [asyncio.create_task(waiter("formatting", "formatting"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(waiter("batch", "batch")))
+        tasks.append(asyncio.create_task(waiter("routing", "routing")))
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+
+    # Routing overtakes the waiter that queued first
+    assert order == ["routing", "formatting", "batch"]
+
+def test_priority_scope_demotes_calls():
+    scheduler = make_scheduler()
+    with priority_scope("batch"):
+        scheduler._enqueue("routing")
+    assert scheduler.get_stats()["queue_depth_by_priority"]["batch"] == 1
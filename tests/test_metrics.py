@@ -0,0 +1,44 @@
+import threading
+
+from metrics import ShardedMetrics
+
+def run_threads(count, target):
+    threads = [threading.Thread(target=target) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def test_counts_survive_thread_exit():
+    metrics = ShardedMetrics()
+
+    def record():
+        for _ in range(100):
+            metrics.inc("requests_total", agent="order")
+        metrics.observe("latency_seconds", 0.05, agent="order")
+
+    run_threads(20, record)
+
+    assert metrics.counters("requests_total") == {("requests_total", (("agent", "order"),)): 2000}
+    assert metrics.histograms()[("latency_seconds", (("agent", "order"),))].total.count == 20
+
+def test_exited_threads_are_retired_without_reads():
+    metrics = ShardedMetrics()
+    for _ in range(50):
+        # Short-lived threads, as from a pool that recycles its workers; nothing reads in between
+        run_threads(4, lambda: metrics.inc("requests_total"))
+
+    assert len(metrics._shards) <= 4
+    assert metrics.counters() == {("requests_total", ()): 200}
+    assert metrics._shards == []
+
+def test_merge_snapshot():
+    source, target = ShardedMetrics(), ShardedMetrics()
+    source.inc("requests_total", 3, agent="faq")
+    source.observe("latency_seconds", 0.2)
+    target.inc("requests_total", 1, agent="faq")
+
+    target.merge(source.snapshot())
+
+    assert target.counters() == {("requests_total", (("agent", "faq"),)): 4}
+    assert target.histograms()[("latency_seconds", ())].total.count == 1
@@ -0,0 +1,26 @@
+import pytest
+
+from llm_scheduler import LLMUnavailableError
+from main import AgentOrchestrator
+from router_agent import RouterAgent
+
+@pytest.fixture
+def router(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+    return RouterAgent(render_mode="template")
+
+def test_unavailable_llm_is_answered_and_step_retried(router):
+    def unavailable(query, context=None, **kwargs):
+        raise LLMUnavailableError("rate limited", status_code=429)
+
+    router.agents["support"].process = unavailable
+    orchestrator = AgentOrchestrator(router)
+
+    response = orchestrator.start_workflow("issue_resolution", "s1", {"customer": "CUST001"})
+
+    assert response == router._unavailable_response(LLMUnavailableError("rate limited", status_code=429))
+    assert orchestrator.get_workflow_status("s1")["current_step"] == 0
+
+    router.agents["support"].process = lambda query, context=None, **kwargs: {"agent": "Support Agent", "success": True}
+    assert orchestrator.execute_next_step("s1")["status"] == "step_completed"
+    assert orchestrator.get_workflow_status("s1")["current_step"] == 1
@@ -0,0 +1,125 @@
+import sqlite3
+import threading
+
+from tools.order_store import MAX_IN_PARAMS, SQLiteOrderStore
+
+def make_order(order_id, status="shipped", order_date="2024-01-15", customer_id="CUST001"):
+    return {
+        "id": order_id,
+        "customer_id": customer_id,
+        "items": [],
+        "status": status,
+        "order_date": order_date
+    }
+
+def flatten(chunks):
+    return [[order["id"] for order in chunk] for chunk in chunks]
+
+def test_iter_filtered_pages_past_null_dates():
+    store = SQLiteOrderStore()
+    store.upsert_orders([
+        make_order("A", order_date="2024-01-01"),
+        make_order("B", order_date=None),
+        make_order("C", order_date=None)
+    ])
+
+    chunks = flatten(store.iter_filtered(status="shipped", chunk_size=1))
+
+    assert chunks == [["B"], ["C"], ["A"]]
+
+def test_iter_filtered_breaks_date_ties_on_id():
+    store = SQLiteOrderStore()
+    store.upsert_orders([make_order(f"ORD{number:03d}", order_date="2024-02-01") for number in range(7)])
+    store.upsert_orders([make_order("ORD100", status="delivered", order_date="2024-02-01")])
+
+    chunks = flatten(store.iter_filtered(status="shipped", chunk_size=3))
+
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert sum(chunks, []) == [f"ORD{number:03d}" for number in range(7)]
+
+def test_iter_filtered_date_range():
+    store = SQLiteOrderStore()
+    store.upsert_orders([
+        make_order("A", order_date="2024-01-01"),
+        make_order("B", order_date="2024-02-01"),
+        make_order("C", order_date="2024-03-01"),
+        make_order("D", order_date=None)
+    ])
+
+    chunks = flatten(store.iter_filtered(date_from="2024-01-15", date_to="2024-02-15", chunk_size=10))
+
+    assert chunks == [["B"]]
+
+def test_null_dates_from_older_databases_are_normalised(tmp_path):
+    path = str(tmp_path / "orders.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE orders (id TEXT PRIMARY KEY, customer_id TEXT, status TEXT NOT NULL, "
+                 "order_date TEXT, data TEXT NOT NULL)")
+    conn.execute("INSERT INTO orders VALUES ('A', NULL, 'shipped', NULL, '{\"id\": \"A\"}')")
+    conn.execute("INSERT INTO orders VALUES ('B', NULL, 'shipped', NULL, '{\"id\": \"B\"}')")
+    conn.commit()
+    conn.close()
+
+    store = SQLiteOrderStore(path)
+
+    assert flatten(store.iter_filtered(status="shipped", chunk_size=1)) == [["A"], ["B"]]
+
+def test_get_many_splits_large_id_lists():
+    store = SQLiteOrderStore()
+    order_ids = [f"ORD{number:05d}" for number in range(MAX_IN_PARAMS * 2 + 50)]
+    store.upsert_orders(make_order(order_id) for order_id in order_ids)
+
+    found = store.get_many(order_ids + ["MISSING"])
+
+    assert len(found) == len(order_ids)
+    assert "MISSING" not in found
+    assert found["ORD01234"]["id"] == "ORD01234"
+
+def test_transition_status_is_conditional():
+    store = SQLiteOrderStore()
+    store.upsert_orders([make_order("ORD1", status="processing")])
+
+    assert store.transition_status("ORD1", "processing", "cancelled") == (True, "cancelled")
+    assert store.get("ORD1")["status"] == "cancelled"
+
+    # A second cancellation, or one from a stale status, changes nothing
+    assert store.transition_status("ORD1", "processing", "cancelled") == (False, "cancelled")
+    assert store.transition_status("ORD1", "shipped", "delivered") == (False, "cancelled")
+    assert store.transition_status("NOPE", "processing", "cancelled") == (False, None)
+
+def test_concurrent_reads_and_cancellations():
+    store = SQLiteOrderStore()
+    store.upsert_orders(make_order(f"ORD{i:04d}", status="processing", customer_id=f"CUST{i % 5}",
+                                   order_date=f"2024-01-{i % 28 + 1:02d}") for i in range(2000))
+    stop = threading.Event()
+    errors, outcomes = [], []
+
+    def read():
+        try:
+            while not stop.is_set():
+                store.list_for_customer("CUST1")
+                for _ in store.iter_filtered(status="processing", chunk_size=100):
+                    pass
+        except Exception as e:
+            errors.append(e)
+
+    def cancel(offset):
+        try:
+            for i in range(offset, 2000, 2):
+                outcomes.append(store.transition_status(f"ORD{i:04d}", "processing", "cancelled")[0])
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    writers = [threading.Thread(target=cancel, args=(offset,)) for offset in range(2)]
+    for thread in readers + writers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    assert errors == []
+    assert outcomes.count(True) == 2000
+    assert store.list_by_status("cancelled", limit=1)[1] == 2000
@@ -0,0 +1,63 @@
+import pytest
+
+from agents.product_agent import ProductAgent
+from tools.product_tools import ProductTools
+
+class RecordingLLM:
+    def __init__(self):
+        self.prompts = []
+
+    def _call(self, prompt, priority=None):
+        self.prompts.append(prompt)
+        return "formatted"
+
+def catalog(size):
+    return {
+        f"PROD{i:05d}": {
+            "id": f"PROD{i:05d}",
+            "name": f"Wireless Headphones {i}",
+            "category": "Electronics",
+            "price": 99.99,
+            "in_stock": True,
+            "stock_quantity": 5,
+            "description": "Over-ear wireless headphones"
+        }
+        for i in range(size)
+    }
+
+@pytest.fixture
+def make_agent(monkeypatch):
+    monkeypatch.setenv("GROQ_API_KEY", "test")
+
+    def make(render_mode):
+        agent = ProductAgent(render_mode=render_mode)
+        agent.llm = RecordingLLM()
+        agent.tools = ProductTools(products=catalog(500))
+        return agent
+    return make
+
+SEARCH = {"action": "search_products", "search_terms": "wireless headphones"}
+
+def test_search_reply_is_capped_to_page_size(make_agent):
+    agent = make_agent("template")
+    response = agent.process("wireless headphones", analysis=SEARCH)
+
+    assert (response["data"]["count"], response["data"]["total"]) == (agent.search_page_size, 500)
+    assert f"({agent.search_page_size} of 500)" in response["response"]
+    assert response["response"].count("PROD") == agent.search_page_size
+
+def test_format_prompt_only_carries_one_page(make_agent):
+    agent = make_agent("llm")
+    agent.search_page_size = 3
+    agent.process("wireless headphones", analysis=SEARCH)
+
+    prompt, = agent.llm.prompts
+    assert prompt.count('"id": "PROD') == 3
+    assert '"total": 500' in prompt
+
+def test_availability_search_is_capped(make_agent):
+    agent = make_agent("template")
+    result, response_type = agent._run_action("are wireless headphones in stock", {"action": "check_availability"})
+
+    assert response_type == "search_availability"
+    assert (result["count"], result["total"]) == (agent.search_page_size, 500)
@@ -0,0 +1,99 @@
+import time
+
+from session_store import SESSION_OVERHEAD, TURN_OVERHEAD, SessionStore, SQLiteSessionTier
+
+def messages(store, session_id):
+    return [turn["message"] for turn in store.history(session_id)]
+
+def test_ring_buffer_keeps_last_turns():
+    store = SessionStore(max_turns=3, shards=1)
+    for i in range(5):
+        store.append("s1", "user", f"m{i}")
+
+    assert messages(store, "s1") == ["m2", "m3", "m4"]
+    assert [turn["message"] for turn in store.history("s1", limit=2)] == ["m3", "m4"]
+    assert store.get_stats()["estimated_bytes"] == SESSION_OVERHEAD + sum(TURN_OVERHEAD + 2 for _ in range(3))
+
+def test_least_recently_used_session_is_evicted():
+    store = SessionStore(max_sessions=2, shards=1)
+    store.append("a", "user", "hi")
+    store.append("b", "user", "hi")
+    store.history("a")
+    store.append("a", "user", "again")
+    store.append("c", "user", "hi")
+
+    assert len(store) == 2
+    assert store.history("b") == []
+    assert messages(store, "a") == ["hi", "again"]
+    assert store.get_stats()["evicted"] == 1
+
+def test_idle_sessions_expire(monkeypatch):
+    store = SessionStore(ttl=60, shards=1)
+    store.append("old", "user", "hi")
+    later = time.time() + 120
+    monkeypatch.setattr(time, "time", lambda: later)
+
+    assert store.history("old") == []
+    store.append("new", "user", "hi")
+    assert len(store) == 1
+    assert store.get_stats()["expired"] == 1
+
+def test_byte_limit_evicts_oldest_sessions():
+    session_size = SESSION_OVERHEAD + TURN_OVERHEAD + 100
+    store = SessionStore(max_bytes=3 * session_size, shards=1)
+    for i in range(10):
+        store.append(f"s{i}", "user", "x" * 100)
+
+    stats = store.get_stats()
+    assert len(store) == 3
+    assert stats["estimated_bytes"] <= 3 * session_size
+    assert stats["evicted"] == 7
+    assert [session_id for session_id in ("s7", "s8", "s9") if store.history(session_id)] == ["s7", "s8", "s9"]
+
+def test_long_messages_are_truncated():
+    store = SessionStore(max_message_chars=10, shards=1)
+    store.append("s1", "user", "x" * 100)
+    assert messages(store, "s1") == ["x" * 10]
+
+def test_evicted_session_spills_and_resumes(tmp_path):
+    spill = SQLiteSessionTier(str(tmp_path / "sessions.db"))
+    store = SessionStore(max_sessions=1, shards=1, spill=spill)
+    store.append("a", "user", "first", agent="router")
+    store.append("b", "user", "hi")
+
+    assert len(store) == 1
+    assert len(spill) == 1
+    assert store.history("a")[0]["agent"] == "router"
+
+    store.append("a", "user", "second")
+    assert messages(store, "a") == ["first", "second"]
+    # Resuming a evicts b in its place
+    assert len(store) == 1
+    assert len(spill) == 1
+    assert messages(store, "b") == ["hi"]
+    stats = store.get_stats()
+    assert (stats["resumed"], stats["spilled"]) == (1, 2)
+
+def test_history_of_spilled_session_does_not_grow_memory(tmp_path):
+    spill = SQLiteSessionTier(str(tmp_path / "sessions.db"))
+    store = SessionStore(max_sessions=2, shards=1, spill=spill)
+    for i in range(10):
+        store.append(f"s{i}", "user", f"m{i}")
+    before = store.get_stats()["estimated_bytes"]
+
+    for i in range(10):
+        assert messages(store, f"s{i}") == [f"m{i}"]
+
+    assert len(store) == 2
+    assert store.get_stats()["estimated_bytes"] == before
+    assert len(spill) == 8
+
+def test_end_session_forgets_spilled_copy(tmp_path):
+    spill = SQLiteSessionTier(str(tmp_path / "sessions.db"))
+    store = SessionStore(max_sessions=1, shards=1, spill=spill)
+    store.append("a", "user", "hi")
+    store.append("b", "user", "hi")
+    store.end_session("a")
+
+    assert store.history("a") == []
+    assert len(spill) == 0
@@ -0,0 +1,117 @@
+import asyncio
+import sqlite3
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+import pytest
+
+from tools.support_tools import SupportTools
+from tools.ticket_store import SQLiteTicketStore, get_ticket_store
+
+def create_concurrently(store, calls):
+    """Run each (args, kwargs) create from its own thread; returns results or raised errors"""
+    results = [None] * len(calls)
+    start = threading.Barrier(len(calls))
+
+    def run(index, args, kwargs):
+        start.wait()
+        try:
+            results[index] = store.create(*args, **kwargs)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=run, args=(i, args, kwargs)) for i, (args, kwargs) in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+def test_concurrent_creates_get_unique_ids(tmp_path):
+    store = SQLiteTicketStore(str(tmp_path / "tickets.db"))
+    results = create_concurrently(store, [((f"c{i}@example.com", "billing", "help"), {}) for i in range(50)])
+
+    ids = [ticket["id"] for ticket in results]
+    assert len(set(ids)) == 50
+    assert all(store.get(ticket_id) is not None for ticket_id in ids)
+
+def test_failed_write_does_not_fail_its_batch():
+    # The delay makes the writer collect every queued create into one transaction
+    store = SQLiteTicketStore(commit_delay=0.2)
+    calls = [(("ok@example.com", "billing", f"ticket {i}"), {}) for i in range(5)]
+    calls.append((("bad@example.com", "billing", "no status"), {"status": None}))
+    results = create_concurrently(store, calls)
+
+    assert store.stats["commits"] == 1
+    assert isinstance(results[-1], sqlite3.IntegrityError)
+    assert all(isinstance(ticket, dict) for ticket in results[:-1])
+    tickets, total = store.list_for_customer("ok@example.com")
+    assert total == 5
+    assert store.list_for_customer("bad@example.com")[1] == 0
+    # The failed write's event row was rolled back along with it
+    assert all(len(store.events(ticket["id"])) == 1 for ticket in tickets)
+
+def test_events_only_for_committed_writes():
+    store = SQLiteTicketStore(commit_delay=0.2)
+    seen = []
+    store.subscribe(seen.append)
+    create_concurrently(store, [
+        (("a@example.com", "billing", "fine"), {}),
+        (("b@example.com", "billing", "broken"), {"priority": None})
+    ])
+    assert [event["ticket"]["customer_email"] for event in seen] == ["a@example.com"]
+
+def test_async_create_and_update():
+    store = SQLiteTicketStore()
+
+    async def run():
+        ticket = await store.acreate("a@example.com", "billing", "help")
+        updated = await store.aupdate(ticket["id"], "escalated", status="escalated", priority="high")
+        missing = await store.aupdate("TICK9999", "escalated", status="escalated")
+        return ticket, updated, missing
+
+    ticket, updated, missing = asyncio.run(run())
+    assert updated["id"] == ticket["id"]
+    assert (updated["status"], updated["priority"]) == ("escalated", "high")
+    assert missing is None
+    assert [event["event"] for event in store.events(ticket["id"])] == ["created", "escalated"]
+
+def test_write_timeout():
+    store = SQLiteTicketStore(commit_delay=0.5, write_timeout=0.05)
+    with pytest.raises(FutureTimeoutError):
+        store.create("a@example.com", "billing", "slow")
+
+def test_close_commits_queued_writes_and_releases_everything(tmp_path):
+    store = SQLiteTicketStore(str(tmp_path / "tickets.db"), commit_delay=0.2)
+    queued = store._enqueue("create", ("a@example.com", "billing", "queued", "open", "medium"))
+    reader = threading.Thread(target=lambda: store.get("TICK0001"))
+    reader.start()
+    reader.join()
+
+    store.close()
+
+    assert queued.result(timeout=0)["id"] == "TICK0001"
+    assert not store._writer.is_alive()
+    assert store._connections == []
+    with pytest.raises(sqlite3.ProgrammingError):
+        store.create("b@example.com", "billing", "too late")
+    store.close()
+
+    reopened = SQLiteTicketStore(str(tmp_path / "tickets.db"))
+    assert reopened.get("TICK0001")["description"] == "queued"
+    reopened.close()
+
+def test_support_tools_share_one_store():
+    threads_before = threading.active_count()
+    first, second = SupportTools(), SupportTools()
+
+    assert first.tickets is second.tickets
+    assert threading.active_count() <= threads_before + 1
+    ticket_id = first.create_support_ticket("a@example.com", "billing", "help")["ticket_id"]
+    assert second.tickets.get(ticket_id) is not None
+
+def test_closed_shared_store_is_replaced():
+    store = get_ticket_store()
+    store.close()
+    assert get_ticket_store() is not store
+    assert not get_ticket_store().closed
@@ -0,0 +1,54 @@
+import json
+import subprocess
+import sys
+import threading
+from pathlib import Path
+
+from tracing import InMemoryExporter, Tracer
+
+def test_spans_still_queued_at_exit_are_exported(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    script = (
+        "from tracing import JSONFileExporter, Tracer\n"
+        f"tracer = Tracer(sample_rate=1.0, exporters=[JSONFileExporter({str(path)!r})], flush_interval=3600)\n"
+        "with tracer.span('request'):\n"
+        "    pass\n"
+    )
+    subprocess.run([sys.executable, "-c", script], check=True, cwd=Path(__file__).resolve().parents[1], timeout=30)
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == ["request"]
+
+def test_counts_are_exact_across_threads():
+    tracer = Tracer(sample_rate=1.0, exporters=[InMemoryExporter()], max_queue=100, flush_interval=3600)
+
+    def record():
+        for _ in range(1000):
+            with tracer.span("work"):
+                pass
+
+    threads = [threading.Thread(target=record) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    tracer.flush()
+
+    assert tracer.stats["started"] == 8000
+    assert tracer.stats["dropped"] + tracer.stats["exported"] == 8000
+
+def test_failing_exporter_is_logged(caplog):
+    class Broken:
+        def export(self, spans, service_name):
+            raise RuntimeError("collector down")
+
+    memory = InMemoryExporter()
+    tracer = Tracer(sample_rate=1.0, exporters=[Broken(), memory], flush_interval=3600)
+    with tracer.span("request"):
+        pass
+    tracer.flush()
+
+    assert tracer.stats["export_errors"] == 1
+    assert [span.name for span in memory.spans] == ["request"]
+    assert "Trace export failed" in caplog.text
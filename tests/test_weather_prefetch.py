@@ -0,0 +1,52 @@
+import time
+
+from tools.weather_cache import WeatherCache
+from tools.weather_prefetch import WeatherPrefetcher
+
+class FakeTools:
+    def __init__(self, results):
+        self.results = results
+        self.calls = []
+        self.weather_cache = WeatherCache(ttl=600, stale_ttl=3600)
+        self.forecast_cache = WeatherCache(ttl=1800, stale_ttl=10800)
+
+    def _fetch_weather(self, location):
+        self.calls.append(location)
+        return self.results[location]
+
+def test_failed_refresh_backs_off():
+    tools = FakeTools({"paris": {"success": False, "message": "Weather service timeout"}})
+    prefetcher = WeatherPrefetcher(tools, failure_backoff=30)
+    prefetcher.record(("weather", "paris"))
+
+    assert prefetcher._due_keys() == [("weather", "paris")]
+    prefetcher._refresh(("weather", "paris"))
+    assert prefetcher._due_keys() == []
+    assert prefetcher.get_stats()["failures"] == 1
+
+    # Once the backoff has passed the key is retried, and success clears it
+    prefetcher._backoff[("weather", "paris")] = (1, 0.0)
+    tools.results["paris"] = {"success": True, "temperature": 20}
+    prefetcher._refresh(*prefetcher._due_keys())
+    assert prefetcher.get_stats()["backing_off"] == 0
+    assert tools.weather_cache.lookup("paris", lambda: None)["temperature"] == 20
+
+def test_backoff_doubles_up_to_limit():
+    tools = FakeTools({"paris": {"success": False, "message": "Weather service error: 500"}})
+    prefetcher = WeatherPrefetcher(tools, failure_backoff=30, max_backoff=100)
+    delays = []
+    for _ in range(4):
+        prefetcher._refresh(("weather", "paris"))
+        _, retry_at = prefetcher._backoff[("weather", "paris")]
+        delays.append(round(retry_at - time.monotonic()))
+    assert delays == [30, 60, 100, 100]
+
+def test_not_found_locations_are_not_prefetched():
+    tools = FakeTools({"atlantis": {"success": False, "not_found": True, "message": "not found"}})
+    prefetcher = WeatherPrefetcher(tools)
+    prefetcher.record(("weather", "atlantis"))
+
+    prefetcher._refresh(("weather", "atlantis"))
+    assert prefetcher._due_keys() == []
+    assert tools.calls == ["atlantis"]
+    assert prefetcher.get_stats()["not_found"] == 1
@@ -0,0 +1,26 @@
+import threading
+
+from tools.weather_tools import WeatherTools
+
+def test_concurrent_first_batches_share_one_fetch_pool(monkeypatch):
+    monkeypatch.delenv("OPENWEATHERMAP_API_KEY", raising=False)
+    monkeypatch.setenv("WEATHER_POOL_SIZE", "4")
+    tools = WeatherTools()
+    pool = tools._fetch_pool
+    start = threading.Barrier(8)
+    results = []
+
+    def fetch():
+        start.wait()
+        results.append(tools.get_weather_many(["London", "Tokyo", "NYC", "new york", "Paris", "Berlin"]))
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert tools._fetch_pool is pool
+    assert len(pool._threads) <= 4
+    assert len(results) == 8
+    assert all(batch[2] == batch[3] for batch in results)
@@ -0,0 +1,160 @@
+import csv
+import json
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+from tools.search_index import tokenize
+
+class FAQIndex:
+    """
+    BM25 index over FAQ articles stored as a term-major sparse matrix.
+
+    Each term owns a slice of `doc_ids`/`weights` (CSC layout, slice bounds in `indptr`)
+    holding its precomputed BM25 contribution to every article that contains it, so a
+    query is a gather plus one bincount. Saved indexes are loaded with mmap, so worker
+    processes share the pages instead of rebuilding the matrix.
+    """
+
+    # Question and tag matches count twice, as name matches do for products
+    FIELD_WEIGHTS = {"question": 2, "topic": 2, "tags": 2, "answer": 1}
+
+    def __init__(self, articles: List[Dict[str, Any]], vocabulary: Dict[str, int],
+                 indptr: np.ndarray, doc_ids: np.ndarray, weights: np.ndarray):
+        self.articles = articles
+        self.vocabulary = vocabulary
+        self.indptr = indptr
+        self.doc_ids = doc_ids
+        self.weights = weights
+
+    @classmethod
+    def build(cls, articles: Iterable[Dict[str, Any]], k1: float = 1.2, b: float = 0.75) -> "FAQIndex":
+        articles = list(articles)
+        vocabulary: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        lengths = np.zeros(len(articles), dtype=np.float64)
+
+        for doc_id, article in enumerate(articles):
+            term_counts: Dict[str, int] = {}
+            for field, weight in cls.FIELD_WEIGHTS.items():
+                value = article.get(field) or ""
+                if isinstance(value, list):
+                    value = " ".join(value)
+                for term in tokenize(str(value)):
+                    term_counts[term] = term_counts.get(term, 0) + weight
+                    lengths[doc_id] += weight
+            for term, count in term_counts.items():
+                rows.append(vocabulary.setdefault(term, len(vocabulary)))
+                cols.append(doc_id)
+                counts.append(count)
+
+        term_ids = np.asarray(rows, dtype=np.int32)
+        doc_ids = np.asarray(cols, dtype=np.int32)
+        tf = np.asarray(counts, dtype=np.float32)
+
+        # Sort entries term-major; the stable sort keeps doc ids ascending inside each term
+        order = np.argsort(term_ids, kind="stable")
+        term_ids, doc_ids, tf = term_ids[order], doc_ids[order], tf[order]
+        document_frequency = np.bincount(term_ids, minlength=len(vocabulary))
+        indptr = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(document_frequency, out=indptr[1:])
+
+        total_docs = len(articles)
+        avg_length = lengths.mean() if total_docs else 1.0
+        idf = np.log(1 + (total_docs - document_frequency + 0.5) / (document_frequency + 0.5))
+        norms = k1 * (1 - b + b * lengths / (avg_length or 1.0))
+        weights = (idf[term_ids] * (k1 + 1) * tf / (tf + norms[doc_ids])).astype(np.float32)
+
+        return cls(articles, vocabulary, indptr, doc_ids, weights)
+
+    def __len__(self) -> int:
+        return len(self.articles)
+
+    def search(self, query: str, top_k: int = 3, min_score: float = 0.0) -> List[Tuple[Dict[str, Any], float]]:
+        """Top-k (article, score) pairs scoring at least min_score, best first"""
+        term_ids = [self.vocabulary[term] for term in dict.fromkeys(tokenize(query)) if term in self.vocabulary]
+        if not term_ids or not self.articles:
+            return []
+
+        slices = [slice(self.indptr[term_id], self.indptr[term_id + 1]) for term_id in term_ids]
+        doc_ids = np.concatenate([self.doc_ids[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+        scores = np.bincount(doc_ids, weights=weights, minlength=len(self.articles))
+
+        candidates = np.flatnonzero(scores >= max(min_score, 1e-9))
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(self.articles[doc_id], round(float(scores[doc_id]), 4)) for doc_id in candidates]
+
+    # Persistence
+
+    def save(self, directory: str):
+        """Write the matrix as .npy arrays plus a JSON file with the vocabulary and articles"""
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "indptr.npy"), self.indptr)
+        np.save(os.path.join(directory, "doc_ids.npy"), self.doc_ids)
+        np.save(os.path.join(directory, "weights.npy"), self.weights)
+
+        vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as outfile:
+            json.dump({"vocabulary": vocabulary, "articles": self.articles}, outfile)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "FAQIndex":
+        mode = "r" if mmap else None
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as infile:
+            meta = json.load(infile)
+        return cls(
+            meta["articles"],
+            {term: term_id for term_id, term in enumerate(meta["vocabulary"])},
+            np.load(os.path.join(directory, "indptr.npy"), mmap_mode=mode),
+            np.load(os.path.join(directory, "doc_ids.npy"), mmap_mode=mode),
+            np.load(os.path.join(directory, "weights.npy"), mmap_mode=mode)
+        )
+
+def load_faq_articles(path: str) -> Iterator[Dict[str, Any]]:
+    """
+    Articles from a .jsonl/.json/.csv file, or a directory of .md/.txt files.
+
+    Articles need an answer plus a question or topic; tags are optional. A text file's
+    first line is its question and the rest its answer.
+    """
+    if os.path.isdir(path):
+        for name in sorted(os.listdir(path)):
+            if not name.endswith((".md", ".txt")):
+                continue
+            with open(os.path.join(path, name), "r", encoding="utf-8") as infile:
+                title, _, body = infile.read().strip().partition("\n")
+            yield {
+                "id": os.path.splitext(name)[0],
+                "question": title.lstrip("# ").strip(),
+                "answer": body.strip()
+            }
+        return
+
+    with open(path, "r", encoding="utf-8", newline="") as infile:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(infile)
+        elif path.endswith(".json"):
+            rows = json.load(infile)
+        else:
+            rows = (json.loads(line) for line in infile if line.strip())
+
+        for number, row in enumerate(rows, 1):
+            article = dict(row)
+            article.setdefault("id", str(number))
+            if isinstance(article.get("tags"), str):
+                article["tags"] = [tag.strip() for tag in article["tags"].split(",") if tag.strip()]
+            yield article
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python -m tools.faq_index <faq.jsonl|faq.json|faq.csv|articles_dir> <index_dir>")
+        sys.exit(1)
+
+    index = FAQIndex.build(load_faq_articles(sys.argv[1]))
+    index.save(sys.argv[2])
+    print(f"Indexed {len(index)} articles ({len(index.vocabulary)} terms) into {sys.argv[2]}")
@@ -0,0 +1,187 @@
+import itertools
+import json
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+_memory_ids = itertools.count(1)
+
+# Older SQLite builds cap bound parameters per statement at 999
+MAX_IN_PARAMS = 900
+
+class SQLiteOrderStore:
+    """
+    Persistent order store with secondary indexes on customer_id, status and order_date.
+
+    Without a path the store lives in a private shared-cache in-memory database, so
+    per-thread connections still see the same orders. Shared-cache table locks fail
+    at once instead of waiting out the busy timeout, so readers there skip read locks
+    and writes from this process take turns behind a lock. A missing order_date is
+    stored as '' so (order_date, id) keyset comparisons never meet a NULL.
+    """
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS orders (
+            id TEXT PRIMARY KEY,
+            customer_id TEXT,
+            status TEXT NOT NULL,
+            order_date TEXT NOT NULL DEFAULT '',
+            data TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_orders_customer ON orders(customer_id, order_date)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status, order_date)",
+        "CREATE INDEX IF NOT EXISTS idx_orders_date ON orders(order_date)"
+    ]
+
+    def __init__(self, path: str = None):
+        self.path = path
+        self._memory_uri = None if path else f"file:orders_{next(_memory_ids)}?mode=memory&cache=shared"
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+
+        conn = self._connection()
+        # The in-memory database lives only while a connection to it is open
+        self._anchor = None if path else conn
+        if path:
+            conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        # Databases created before order_date was NOT NULL may still hold NULLs
+        conn.execute("UPDATE orders SET order_date = '' WHERE order_date IS NULL")
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._memory_uri:
+                conn = sqlite3.connect(self._memory_uri, uri=True, timeout=30)
+                # Shared-cache readers would otherwise hold table locks against writers
+                conn.execute("PRAGMA read_uncommitted=1")
+            else:
+                conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def upsert_orders(self, orders: Iterable[Dict[str, Any]], batch_size: int = 5000) -> int:
+        """Insert or replace orders in batched transactions"""
+        conn = self._connection()
+        written = 0
+        batch = []
+        for order in orders:
+            batch.append((
+                order["id"].upper(),
+                order.get("customer_id"),
+                order["status"],
+                order.get("order_date") or "",
+                json.dumps(order)
+            ))
+            if len(batch) >= batch_size:
+                written += self._write_batch(conn, batch)
+                batch = []
+        if batch:
+            written += self._write_batch(conn, batch)
+        return written
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]) -> int:
+        with self._write_lock, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO orders (id, customer_id, status, order_date, data) VALUES (?, ?, ?, ?, ?)",
+                batch
+            )
+        return len(batch)
+
+    def get(self, order_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute("SELECT data FROM orders WHERE id = ?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, order_ids: List[str]) -> Dict[str, dict]:
+        """Look up a batch of orders, MAX_IN_PARAMS ids per query; missing ids are absent from the result"""
+        conn = self._connection()
+        orders = {}
+        for start in range(0, len(order_ids), MAX_IN_PARAMS):
+            chunk = order_ids[start:start + MAX_IN_PARAMS]
+            placeholders = ",".join("?" * len(chunk))
+            rows = conn.execute(
+                f"SELECT id, data FROM orders WHERE id IN ({placeholders})", chunk
+            ).fetchall()
+            orders.update((order_id, json.loads(data)) for order_id, data in rows)
+        return orders
+
+    def iter_filtered(self, status: str = None, date_from: str = None, date_to: str = None,
+                      chunk_size: int = 1000) -> Iterator[List[dict]]:
+        """
+        Stream orders matching a status and/or order_date range in chunks.
+
+        Uses keyset pagination on (order_date, id), so each chunk is an index range scan
+        no matter how deep into the result it is.
+        """
+        conditions, params = [], []
+        if status:
+            conditions.append("status = ?")
+            params.append(status)
+        if date_from:
+            conditions.append("order_date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("order_date <= ?")
+            params.append(date_to)
+
+        conn = self._connection()
+        last_key = None
+        while True:
+            where = list(conditions)
+            page_params = list(params)
+            if last_key is not None:
+                where.append("(order_date, id) > (?, ?)")
+                page_params.extend(last_key)
+            clause = f"WHERE {' AND '.join(where)}" if where else ""
+
+            rows = conn.execute(
+                f"SELECT order_date, id, data FROM orders {clause} ORDER BY order_date, id LIMIT ?",
+                page_params + [chunk_size]
+            ).fetchall()
+            if not rows:
+                return
+
+            yield [json.loads(data) for _, _, data in rows]
+            last_key = (rows[-1][0], rows[-1][1])
+            if len(rows) < chunk_size:
+                return
+
+    def list_for_customer(self, customer_id: str, limit: int = 20, offset: int = 0) -> Tuple[List[dict], int]:
+        """A customer's orders, newest first"""
+        return self._page("customer_id = ?", (customer_id,), limit, offset)
+
+    def list_by_status(self, status: str, limit: int = 20, offset: int = 0) -> Tuple[List[dict], int]:
+        """Orders in a status, newest first"""
+        return self._page("status = ?", (status,), limit, offset)
+
+    def _page(self, where: str, params: tuple, limit: int, offset: int) -> Tuple[List[dict], int]:
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM orders WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT data FROM orders WHERE {where} ORDER BY order_date DESC, id DESC LIMIT ? OFFSET ?",
+            params + (limit, offset)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows], total
+
+    def transition_status(self, order_id: str, from_status: str, to_status: str) -> Tuple[bool, Optional[str]]:
+        """
+        Atomically move an order from one status to another.
+
+        Returns (changed, current_status); current_status is None when the order does not exist.
+        """
+        conn = self._connection()
+        with self._write_lock, conn:
+            # A single conditional UPDATE, so concurrent cancellations cannot both succeed
+            changed = conn.execute(
+                "UPDATE orders SET status = ?, data = json_set(data, '$.status', ?) "
+                "WHERE id = ? AND status = ?",
+                (to_status, to_status, order_id, from_status)
+            ).rowcount
+            if changed:
+                return True, to_status
+
+            row = conn.execute("SELECT status FROM orders WHERE id = ?", (order_id,)).fetchone()
+        return False, row[0] if row else None
@@ -1,12 +1,22 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List
 import json
+import os
 from datetime import datetime, timedelta
+from tools.order_store import SQLiteOrderStore
+from tracing import trace_methods
 
+@trace_methods("tool.order")
 class OrderTools:
-    def __init__(self):
+    def __init__(self, db_path: str = None):
+        # Orders persist in ORDER_DB_PATH when set, otherwise in a seeded in-memory store
+        db_path = db_path or os.getenv("ORDER_DB_PATH")
+        self.store = SQLiteOrderStore(db_path)
+        if db_path:
+            return
+        
         # Mock database
-        self.orders = {
-            "ORD001": {
+        self.store.upsert_orders([
+            {
                 "id": "ORD001",
                 "customer_id": "CUST001",
                 "items": [{"name": "Laptop", "quantity": 1, "price": 999.99}],
@@ -15,7 +25,7 @@ class OrderTools:
                 "order_date": "2024-01-15",
                 "estimated_delivery": "2024-01-20"
             },
-            "ORD002": {
+            {
                 "id": "ORD002",
                 "customer_id": "CUST002",
                 "items": [{"name": "Phone", "quantity": 1, "price": 699.99}],
@@ -24,11 +34,11 @@ class OrderTools:
                 "order_date": "2024-01-18",
                 "estimated_delivery": "2024-01-25"
             }
-        }
+        ])
     
     def get_order_status(self, order_id: str) -> Dict[str, Any]:
         """Get order status by order ID"""
-        order = self.orders.get(order_id.upper())
+        order = self.store.get(order_id.upper())
         if order:
             return {
                 "success": True,
@@ -41,7 +51,9 @@ class OrderTools:
     
     def track_order(self, order_id: str) -> Dict[str, Any]:
         """Track order by order ID"""
-        order = self.orders.get(order_id.upper())
+        return self._tracking_result(order_id, self.store.get(order_id.upper()))
+    
+    def _tracking_result(self, order_id: str, order: Dict[str, Any] = None) -> Dict[str, Any]:
         if order and order.get("tracking_number"):
             return {
                 "success": True,
@@ -63,20 +75,86 @@ class OrderTools:
     
     def cancel_order(self, order_id: str) -> Dict[str, Any]:
         """Cancel an order"""
-        order = self.orders.get(order_id.upper())
-        if order:
-            if order["status"] == "processing":
-                order["status"] = "cancelled"
-                return {
-                    "success": True,
-                    "message": f"Order {order_id} has been cancelled successfully"
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": f"Order {order_id} cannot be cancelled (Status: {order['status']})"
-                }
+        cancelled, status = self.store.transition_status(order_id.upper(), "processing", "cancelled")
+        if cancelled:
+            return {
+                "success": True,
+                "message": f"Order {order_id} has been cancelled successfully"
+            }
+        elif status:
+            return {
+                "success": False,
+                "message": f"Order {order_id} cannot be cancelled (Status: {status})"
+            }
         return {
             "success": False,
             "message": f"Order {order_id} not found"
-        }
\ No newline at end of file
+        }
+    
+    def list_orders_for_customer(self, customer_id: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """List a customer's orders, newest first"""
+        orders, total = self.store.list_for_customer(customer_id.upper(), limit, offset)
+        return {
+            "success": True,
+            "orders": orders,
+            "count": len(orders),
+            "total": total
+        }
+    
+    def orders_by_status(self, status: str, limit: int = 20, offset: int = 0) -> Dict[str, Any]:
+        """List orders in a given status, newest first"""
+        orders, total = self.store.list_by_status(status.lower(), limit, offset)
+        return {
+            "success": True,
+            "orders": orders,
+            "count": len(orders),
+            "total": total
+        }
+    
+    def bulk_order_status(self, order_ids: Iterable[str], chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Stream status records for many order ids, one batched lookup per chunk"""
+        for chunk_ids, orders in self._lookup_chunks(order_ids, chunk_size):
+            yield [self._status_record(order_id, orders.get(order_id.upper())) for order_id in chunk_ids]
+    
+    def bulk_track_orders(self, order_ids: Iterable[str], chunk_size: int = 1000) -> Iterator[List[Dict[str, Any]]]:
+        """Stream tracking records for many order ids, one batched lookup per chunk"""
+        for chunk_ids, orders in self._lookup_chunks(order_ids, chunk_size):
+            yield [
+                {"order_id": order_id, **self._tracking_result(order_id, orders.get(order_id.upper()))}
+                for order_id in chunk_ids
+            ]
+    
+    def bulk_orders_by_filter(self, status: str = None, date_from: str = None, date_to: str = None,
+                              chunk_size: int = 1000, tracking: bool = False) -> Iterator[List[Dict[str, Any]]]:
+        """Stream status (or tracking) records for every order matching a status/date filter"""
+        for orders in self.store.iter_filtered(status.lower() if status else None, date_from, date_to, chunk_size):
+            if tracking:
+                yield [{"order_id": order["id"], **self._tracking_result(order["id"], order)} for order in orders]
+            else:
+                yield [self._status_record(order["id"], order) for order in orders]
+    
+    def _lookup_chunks(self, order_ids: Iterable[str], chunk_size: int):
+        chunk = []
+        for order_id in order_ids:
+            chunk.append(order_id)
+            if len(chunk) >= chunk_size:
+                yield chunk, self.store.get_many([order_id.upper() for order_id in chunk])
+                chunk = []
+        if chunk:
+            yield chunk, self.store.get_many([order_id.upper() for order_id in chunk])
+    
+    def _status_record(self, order_id: str, order: Dict[str, Any] = None) -> Dict[str, Any]:
+        if order is None:
+            return {
+                "order_id": order_id,
+                "success": False,
+                "message": f"Order {order_id} not found"
+            }
+        return {
+            "order_id": order_id,
+            "success": True,
+            "customer_id": order.get("customer_id"),
+            "status": order["status"],
+            "tracking_number": order.get("tracking_number"),
+            "estimated_delivery": order.get("estimated_delivery")
+        }
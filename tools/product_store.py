@@ -0,0 +1,211 @@
+import csv
+import json
+import sqlite3
+import sys
+import threading
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from tools.search_index import STOPWORDS, TOKEN_PATTERN, InvertedIndex
+
+class InMemoryProductStore:
+    """
+    Catalog held in a dict with an in-process inverted index
+    """
+
+    def __init__(self, products: Dict[str, Dict[str, Any]]):
+        self.products = products
+        self.search_index = InvertedIndex.build(products.items())
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        return self.products.get(product_id)
+
+    def search(self, query: str, limit: int = None, offset: int = 0, match: str = "or") -> Tuple[List[dict], int]:
+        ranked, total = self.search_index.search(query, match=match, limit=limit, offset=offset)
+        return [self.products[product_id] for product_id, _ in ranked], total
+
+    def count(self) -> int:
+        return len(self.products)
+
+class SQLiteProductStore:
+    """
+    Catalog in a SQLite file with FTS5 text search; startup cost does not depend on catalog size.
+
+    Every thread gets its own connection and the database runs in WAL mode, so several
+    worker processes can read one catalog file while an import is writing to it.
+    """
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS products (
+            id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            category TEXT,
+            price REAL,
+            in_stock INTEGER NOT NULL DEFAULT 0,
+            stock_quantity INTEGER NOT NULL DEFAULT 0,
+            description TEXT,
+            data TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_products_category ON products(category)",
+        "CREATE INDEX IF NOT EXISTS idx_products_price ON products(price)",
+        "CREATE INDEX IF NOT EXISTS idx_products_in_stock ON products(in_stock)",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5(
+            name, category, description,
+            content='products', content_rowid='rowid', tokenize='porter unicode61'
+        )""",
+        # Keep the external-content FTS table in step with the products table
+        """CREATE TRIGGER IF NOT EXISTS products_ai AFTER INSERT ON products BEGIN
+            INSERT INTO products_fts(rowid, name, category, description)
+            VALUES (new.rowid, new.name, new.category, new.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS products_ad AFTER DELETE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, category, description)
+            VALUES ('delete', old.rowid, old.name, old.category, old.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS products_au AFTER UPDATE ON products BEGIN
+            INSERT INTO products_fts(products_fts, rowid, name, category, description)
+            VALUES ('delete', old.rowid, old.name, old.category, old.description);
+            INSERT INTO products_fts(rowid, name, category, description)
+            VALUES (new.rowid, new.name, new.category, new.description);
+        END"""
+    ]
+
+    # Name matches count twice, as in the in-memory index
+    RANK = "bm25(products_fts, 2.0, 1.0, 1.0)"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, product_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connection().execute(
+            "SELECT data FROM products WHERE id = ?", (product_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def search(self, query: str, limit: int = None, offset: int = 0, match: str = "or") -> Tuple[List[dict], int]:
+        expression = self._match_expression(query, match)
+        if expression is None:
+            return [], 0
+
+        conn = self._connection()
+        total = conn.execute(
+            "SELECT COUNT(*) FROM products_fts WHERE products_fts MATCH ?", (expression,)
+        ).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT p.data FROM products_fts JOIN products p ON p.rowid = products_fts.rowid "
+            f"WHERE products_fts MATCH ? ORDER BY {self.RANK} LIMIT ? OFFSET ?",
+            (expression, -1 if limit is None else limit, offset)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows], total
+
+    def _match_expression(self, query: str, match: str) -> Optional[str]:
+        """FTS5 query with every term as a quoted prefix so "lap" still finds "laptop" """
+        terms = list(dict.fromkeys(
+            term for term in TOKEN_PATTERN.findall(query.lower().replace("'", "")) if term not in STOPWORDS
+        ))
+        if not terms:
+            return None
+        operator = " AND " if match == "and" else " OR "
+        return operator.join(f'"{term}"*' for term in terms)
+
+    def count(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM products").fetchone()[0]
+
+    # Bulk import
+
+    def import_products(self, products: Iterable[Dict[str, Any]], batch_size: int = 5000) -> int:
+        """Upsert products from any iterable, committing one transaction per batch"""
+        conn = self._connection()
+        imported = 0
+        batch = []
+
+        for product in products:
+            batch.append(self._row(product))
+            if len(batch) >= batch_size:
+                imported += self._write_batch(conn, batch)
+                batch = []
+
+        if batch:
+            imported += self._write_batch(conn, batch)
+        return imported
+
+    def import_file(self, path: str, batch_size: int = 5000) -> int:
+        """Stream a .csv or .jsonl catalog file into the store"""
+        if path.endswith(".csv"):
+            return self.import_products(read_csv_products(path), batch_size)
+        return self.import_products(read_jsonl_products(path), batch_size)
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[tuple]) -> int:
+        with conn:
+            conn.executemany(
+                "INSERT INTO products (id, name, category, price, in_stock, stock_quantity, description, data) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET name = excluded.name, category = excluded.category, "
+                "price = excluded.price, in_stock = excluded.in_stock, "
+                "stock_quantity = excluded.stock_quantity, description = excluded.description, "
+                "data = excluded.data",
+                batch
+            )
+        return len(batch)
+
+    def _row(self, product: Dict[str, Any]) -> tuple:
+        product = dict(product)
+        product["id"] = str(product["id"]).upper()
+        product["stock_quantity"] = int(product.get("stock_quantity") or 0)
+        product.setdefault("in_stock", product["stock_quantity"] > 0)
+        return (
+            product["id"],
+            product.get("name", ""),
+            product.get("category"),
+            float(product["price"]) if product.get("price") not in (None, "") else None,
+            1 if product["in_stock"] else 0,
+            product["stock_quantity"],
+            product.get("description", ""),
+            json.dumps(product)
+        )
+
+def read_jsonl_products(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as infile:
+        for line in infile:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def read_csv_products(path: str) -> Iterator[Dict[str, Any]]:
+    """CSV rows with typed price/stock columns; a specifications column may hold JSON"""
+    with open(path, "r", encoding="utf-8", newline="") as infile:
+        for row in csv.DictReader(infile):
+            product = {key: value for key, value in row.items() if value not in (None, "")}
+            if "price" in product:
+                product["price"] = float(product["price"])
+            if "stock_quantity" in product:
+                product["stock_quantity"] = int(product["stock_quantity"])
+            if "in_stock" in product:
+                product["in_stock"] = product["in_stock"].strip().lower() in ("1", "true", "yes")
+            if "specifications" in product:
+                product["specifications"] = json.loads(product["specifications"])
+            yield product
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python -m tools.product_store <catalog.db> <products.jsonl|products.csv> [batch_size]")
+        sys.exit(1)
+
+    store = SQLiteProductStore(sys.argv[1])
+    batch_size = int(sys.argv[3]) if len(sys.argv) > 3 else 5000
+    imported = store.import_file(sys.argv[2], batch_size)
+    print(f"Imported {imported} products into {sys.argv[1]} ({store.count()} total)")
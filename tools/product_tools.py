@@ -1,9 +1,19 @@
 from typing import Dict, Any, List
+from tools.product_store import InMemoryProductStore, SQLiteProductStore
+import os
+from tracing import trace_methods
 
+@trace_methods("tool.product")
 class ProductTools:
-    def __init__(self):
+    def __init__(self, products: Dict[str, Dict[str, Any]] = None, db_path: str = None):
+        # A SQLite catalog (PRODUCT_DB_PATH) is shared by every worker instead of living in each heap
+        db_path = db_path or os.getenv("PRODUCT_DB_PATH")
+        if db_path:
+            self.store = SQLiteProductStore(db_path)
+            return
+        
         # Mock product database
-        self.products = {
+        products = products if products is not None else {
             "PROD001": {
                 "id": "PROD001",
                 "name": "Gaming Laptop",
@@ -37,27 +47,22 @@ class ProductTools:
                 "description": "Latest flagship smartphone"
             }
         }
+        self.store = InMemoryProductStore(products)
     
-    def search_products(self, query: str) -> Dict[str, Any]:
-        """Search products by name or category"""
-        results = []
-        query_lower = query.lower()
-        
-        for product in self.products.values():
-            if (query_lower in product["name"].lower() or 
-                query_lower in product["category"].lower() or
-                query_lower in product["description"].lower()):
-                results.append(product)
+    def search_products(self, query: str, limit: int = None, offset: int = 0, match: str = "or") -> Dict[str, Any]:
+        """Search products by name, category or description, best BM25 matches first"""
+        results, total = self.store.search(query, limit=limit, offset=offset, match=match)
         
         return {
             "success": True,
             "products": results,
-            "count": len(results)
+            "count": len(results),
+            "total": total
         }
     
     def get_product_details(self, product_id: str) -> Dict[str, Any]:
         """Get detailed product information"""
-        product = self.products.get(product_id.upper())
+        product = self.store.get(product_id.upper())
         if product:
             return {
                 "success": True,
@@ -70,7 +75,7 @@ class ProductTools:
     
     def check_availability(self, product_id: str) -> Dict[str, Any]:
         """Check product availability"""
-        product = self.products.get(product_id.upper())
+        product = self.store.get(product_id.upper())
         if product:
             return {
                 "success": True,
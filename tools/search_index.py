@@ -0,0 +1,171 @@
+import heapq
+import math
+import re
+from array import array
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset({
+    "a", "an", "and", "any", "are", "can", "do", "for", "have", "i", "im", "in", "is", "it",
+    "looking", "me", "my", "need", "of", "on", "or", "show", "some", "the", "to", "want",
+    "what", "with", "you", "your"
+})
+
+def normalize_token(token: str) -> str:
+    """Fold simple English plurals so "laptops" matches "laptop" """
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    return [
+        normalize_token(token)
+        for token in TOKEN_PATTERN.findall(text.lower().replace("'", ""))
+        if token not in STOPWORDS
+    ]
+
+class InvertedIndex:
+    """
+    Tokenized inverted index with BM25 ranking over weighted text fields
+    """
+
+    def __init__(self, field_weights: Dict[str, int] = None, k1: float = 1.2, b: float = 0.75):
+        # Integer weights repeat a field's terms, e.g. a name match counts twice
+        self.field_weights = field_weights or {"name": 2, "category": 1, "description": 1}
+        self.k1 = k1
+        self.b = b
+
+        self.doc_keys: List[str] = []
+        self.doc_lengths = array("I")
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._vocabulary: List[str] = []
+        self._avg_length = 0.0
+        self._doc_norms = array("d")
+
+    @classmethod
+    def build(cls, documents: Iterable[Tuple[str, dict]], **kwargs) -> "InvertedIndex":
+        """Index (key, fields) pairs in one pass"""
+        index = cls(**kwargs)
+        for key, fields in documents:
+            index.add(key, fields)
+        index.finalize()
+        return index
+
+    def add(self, key: str, fields: dict):
+        doc_id = len(self.doc_keys)
+        self.doc_keys.append(key)
+
+        term_counts: Dict[str, int] = {}
+        length = 0
+        for field, weight in self.field_weights.items():
+            for term in tokenize(str(fields.get(field) or "")):
+                term_counts[term] = term_counts.get(term, 0) + weight
+                length += weight
+        self.doc_lengths.append(length)
+
+        for term, count in term_counts.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = (array("I"), array("H"))
+            postings[0].append(doc_id)
+            postings[1].append(min(count, 65535))
+
+    def finalize(self):
+        """Compute corpus statistics once all documents are added"""
+        self._vocabulary = sorted(self._postings)
+        self._avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+
+        # BM25 length normalisation depends only on the document, so it is precomputed
+        avg_length = self._avg_length or 1.0
+        self._doc_norms = array("d", (
+            self.k1 * (1 - self.b + self.b * length / avg_length) for length in self.doc_lengths
+        ))
+
+    def __len__(self) -> int:
+        return len(self.doc_keys)
+
+    def _expand(self, term: str) -> List[str]:
+        """
+        Exact term when indexed; otherwise the vocabulary terms it prefixes ("lap" -> "laptop"),
+        or failing that contains ("phone" -> "smartphone"). Only the vocabulary is scanned.
+        """
+        if term in self._postings:
+            return [term]
+        if len(term) < 3:
+            return []
+
+        expanded = []
+        position = bisect_left(self._vocabulary, term)
+        while position < len(self._vocabulary) and self._vocabulary[position].startswith(term):
+            expanded.append(self._vocabulary[position])
+            position += 1
+
+        if not expanded and len(term) >= 4:
+            expanded = [word for word in self._vocabulary if term in word]
+        return expanded
+
+    def search(self, query: str, match: str = "or", limit: int = None, offset: int = 0) -> Tuple[List[Tuple[str, float]], int]:
+        """
+        Rank documents against a query.
+
+        match="and" requires every query term, "or" any of them.
+        Returns ([(key, score)] for the requested page, total number of matches).
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self.doc_keys:
+            return [], 0
+
+        groups = [self._expand(term) for term in terms]
+        if match == "and":
+            if not all(groups):
+                return [], 0
+            allowed = self._intersect(groups)
+            if not allowed:
+                return [], 0
+        else:
+            allowed = None
+
+        scores = self._score(groups, allowed)
+        total = len(scores)
+        if limit is None:
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[offset:]
+        else:
+            ranked = heapq.nsmallest(offset + limit, scores.items(), key=lambda item: (-item[1], item[0]))[offset:]
+
+        return [(self.doc_keys[doc_id], round(score, 4)) for doc_id, score in ranked], total
+
+    def _intersect(self, groups: List[List[str]]) -> set:
+        # Start from the rarest term so the candidate set stays small
+        doc_sets = sorted(
+            (set().union(*(self._postings[term][0] for term in group)) for group in groups),
+            key=len
+        )
+        allowed = doc_sets[0]
+        for doc_set in doc_sets[1:]:
+            allowed &= doc_set
+            if not allowed:
+                break
+        return allowed
+
+    def _score(self, groups: List[List[str]], allowed: set = None) -> Dict[int, float]:
+        scores: Dict[int, float] = {}
+        get_score = scores.get
+        total_docs = len(self.doc_keys)
+        norms = self._doc_norms
+
+        for group in groups:
+            for term in group:
+                doc_ids, counts = self._postings[term]
+                weight = (self.k1 + 1) * math.log(1 + (total_docs - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+                if allowed is None:
+                    for doc_id, count in zip(doc_ids, counts):
+                        scores[doc_id] = get_score(doc_id, 0.0) + weight * count / (count + norms[doc_id])
+                else:
+                    for doc_id, count in zip(doc_ids, counts):
+                        if doc_id in allowed:
+                            scores[doc_id] = get_score(doc_id, 0.0) + weight * count / (count + norms[doc_id])
+        return scores
@@ -1,64 +1,111 @@
 from typing import Dict, Any
 from datetime import datetime
+from tools.faq_index import FAQIndex, load_faq_articles
+from tools.ticket_store import get_ticket_store
+import os
+from tracing import trace_methods
 
+DEFAULT_FAQ = [
+    {
+        "id": "shipping",
+        "topic": "shipping",
+        "tags": ["delivery", "ship", "free shipping", "how long"],
+        "answer": "We offer free shipping on orders over $50. Standard shipping takes 3-5 business days."
+    },
+    {
+        "id": "returns",
+        "topic": "returns",
+        "tags": ["return", "refund", "exchange", "send back"],
+        "answer": "You can return items within 30 days of purchase for a full refund."
+    },
+    {
+        "id": "warranty",
+        "topic": "warranty",
+        "tags": ["guarantee", "repair", "broken", "defective"],
+        "answer": "All electronics come with a 1-year manufacturer warranty."
+    },
+    {
+        "id": "payment",
+        "topic": "payment",
+        "tags": ["pay", "credit card", "paypal", "apple pay", "checkout"],
+        "answer": "We accept all major credit cards, PayPal, and Apple Pay."
+    }
+]
+
+@trace_methods("tool.support")
 class SupportTools:
-    def __init__(self):
-        self.tickets = {}
-        self.ticket_counter = 1
-        self.faq = {
-            "shipping": "We offer free shipping on orders over $50. Standard shipping takes 3-5 business days.",
-            "returns": "You can return items within 30 days of purchase for a full refund.",
-            "warranty": "All electronics come with a 1-year manufacturer warranty.",
-            "payment": "We accept all major credit cards, PayPal, and Apple Pay."
-        }
+    def __init__(self, faq_path: str = None, faq_index_path: str = None):
+        # Tickets persist in TICKET_DB_PATH when set; ids stay unique across threads and processes.
+        # Every instance shares the process-wide store, so building agents repeatedly adds no writer threads
+        self.tickets = get_ticket_store(
+            os.getenv("TICKET_DB_PATH"),
+            commit_delay=float(os.getenv("TICKET_COMMIT_DELAY_MS", "0")) / 1000
+        )
+        
+        # A prebuilt index (FAQ_INDEX_PATH) is memory-mapped; a FAQ file (FAQ_PATH) is indexed at startup
+        faq_index_path = faq_index_path or os.getenv("FAQ_INDEX_PATH")
+        faq_path = faq_path or os.getenv("FAQ_PATH")
+        if faq_index_path:
+            self.faq_index = FAQIndex.load(faq_index_path)
+        elif faq_path:
+            self.faq_index = FAQIndex.build(load_faq_articles(faq_path))
+        else:
+            self.faq_index = FAQIndex.build(DEFAULT_FAQ)
+        self.faq_min_score = float(os.getenv("FAQ_MIN_SCORE", "1.0"))
     
     def create_support_ticket(self, customer_email: str, issue_type: str, description: str) -> Dict[str, Any]:
         """Create a new support ticket"""
-        ticket_id = f"TICK{self.ticket_counter:04d}"
-        self.ticket_counter += 1
-        
-        ticket = {
-            "id": ticket_id,
-            "customer_email": customer_email,
-            "issue_type": issue_type,
-            "description": description,
-            "status": "open",
-            "created_at": datetime.now().isoformat(),
-            "priority": "medium"
-        }
-        
-        self.tickets[ticket_id] = ticket
-        
+        return self._ticket_created(self.tickets.create(customer_email, issue_type, description))
+    
+    async def acreate_support_ticket(self, customer_email: str, issue_type: str, description: str) -> Dict[str, Any]:
+        """Async variant of create_support_ticket; the event loop keeps running while the ticket commits"""
+        return self._ticket_created(await self.tickets.acreate(customer_email, issue_type, description))
+    
+    def _ticket_created(self, ticket: Dict[str, Any]) -> Dict[str, Any]:
+        ticket_id = ticket["id"]
         return {
             "success": True,
             "ticket_id": ticket_id,
             "message": f"Support ticket {ticket_id} created successfully"
         }
     
-    def get_faq_answer(self, topic: str) -> Dict[str, Any]:
-        """Get FAQ answer for a topic"""
-        topic_lower = topic.lower()
-        for key, answer in self.faq.items():
-            if key in topic_lower or topic_lower in key:
-                return {
-                    "success": True,
-                    "topic": key,
-                    "answer": answer
-                }
+    def get_faq_answer(self, topic: str, top_k: int = 3, min_score: float = None) -> Dict[str, Any]:
+        """Best FAQ article for a topic or question, with the runners-up as related articles"""
+        min_score = self.faq_min_score if min_score is None else min_score
+        matches = self.faq_index.search(topic, top_k=top_k, min_score=min_score)
+        
+        if not matches:
+            return {
+                "success": False,
+                "message": "FAQ topic not found"
+            }
         
+        best, score = matches[0]
         return {
-            "success": False,
-            "message": "FAQ topic not found. Available topics: shipping, returns, warranty, payment"
+            "success": True,
+            "topic": best.get("topic") or best.get("question"),
+            "answer": best["answer"],
+            "score": score,
+            "related": [
+                {"id": article.get("id"), "topic": article.get("topic") or article.get("question"), "score": related_score}
+                for article, related_score in matches[1:]
+            ]
         }
     
     def escalate_to_human(self, ticket_id: str) -> Dict[str, Any]:
         """Escalate ticket to human agent"""
-        if ticket_id in self.tickets:
-            self.tickets[ticket_id]["status"] = "escalated"
-            self.tickets[ticket_id]["priority"] = "high"
+        return self._ticket_escalated(ticket_id, self.tickets.update(ticket_id, "escalated", status="escalated", priority="high"))
+    
+    async def aescalate_to_human(self, ticket_id: str) -> Dict[str, Any]:
+        ticket = await self.tickets.aupdate(ticket_id, "escalated", status="escalated", priority="high")
+        return self._ticket_escalated(ticket_id, ticket)
+    
+    def _ticket_escalated(self, ticket_id: str, ticket: Dict[str, Any]) -> Dict[str, Any]:
+        if ticket:
             return {
                 "success": True,
-                "message": f"Ticket {ticket_id} has been escalated to a human agent"
+                "ticket_id": ticket["id"],
+                "message": f"Ticket {ticket['id']} has been escalated to a human agent"
             }
         return {
             "success": False,
@@ -0,0 +1,342 @@
+import asyncio
+import itertools
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_memory_ids = itertools.count(1)
+
+TICKET_PREFIX = "TICK"
+
+def format_ticket_id(seq: int) -> str:
+    return f"{TICKET_PREFIX}{seq:04d}"
+
+def parse_ticket_id(ticket_id: str) -> Optional[int]:
+    ticket_id = ticket_id.strip().upper()
+    if not ticket_id.startswith(TICKET_PREFIX) or not ticket_id[len(TICKET_PREFIX):].isdigit():
+        return None
+    return int(ticket_id[len(TICKET_PREFIX):])
+
+class SQLiteTicketStore:
+    """
+    Durable ticket store with indexes on customer_email, status and priority.
+
+    Every write goes through one writer thread that commits whatever is queued in a
+    single transaction (group commit), so a burst of tickets costs one fsync per batch
+    rather than one per ticket. Each write runs under its own savepoint, so one that
+    fails is rolled back alone and the rest of the batch still commits. Ticket ids come
+    from an AUTOINCREMENT key, which SQLite allocates under its write lock, so they are
+    unique across threads and processes. close() stops the writer thread and releases
+    the connections; get_ticket_store() hands out one shared store per database.
+    """
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS tickets (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_email TEXT,
+            issue_type TEXT,
+            description TEXT,
+            status TEXT NOT NULL,
+            priority TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_customer ON tickets(customer_email, seq)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_status ON tickets(status, seq)",
+        "CREATE INDEX IF NOT EXISTS idx_tickets_priority ON tickets(priority, seq)",
+        """CREATE TABLE IF NOT EXISTS ticket_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_seq INTEGER NOT NULL,
+            event TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_ticket_events_ticket ON ticket_events(ticket_seq)"
+    ]
+
+    COLUMNS = "seq, customer_email, issue_type, description, status, priority, created_at, updated_at"
+
+    def __init__(self, path: str = None, max_batch: int = 512, commit_delay: float = 0.0,
+                 write_timeout: float = 30.0):
+        self.path = path
+        self.max_batch = max_batch
+        # Optional pause to let more writes join a batch; queued writes join it regardless
+        self.commit_delay = commit_delay
+        self.write_timeout = write_timeout
+        self._memory_uri = None if path else f"file:tickets_{next(_memory_ids)}?mode=memory&cache=shared"
+        self._local = threading.local()
+        # Every thread's connection, so close() can release them all
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._queue = queue.Queue()
+        self.stats = {"commits": 0, "writes": 0, "max_batch": 0}
+
+        conn = self._connection()
+        # The in-memory database lives only while a connection to it is open
+        self._anchor = None if path else conn
+        if path:
+            conn.execute("PRAGMA journal_mode=WAL")
+        for statement in self.SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+
+        self._writer = threading.Thread(target=self._write_loop, name="ticket-writer", daemon=True)
+        self._writer.start()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            if self._memory_uri:
+                conn = sqlite3.connect(self._memory_uri, uri=True, timeout=30, check_same_thread=False)
+                # Shared-cache readers would otherwise hold table locks against the writer thread
+                conn.execute("PRAGMA read_uncommitted=1")
+            else:
+                conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+                # Commits are batched, so each one can afford a real fsync
+                conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """Commit the writes already queued, then stop the writer thread and close every connection"""
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._writer.join()
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._anchor = None
+
+    # Events
+
+    def subscribe(self, listener: Callable[[Dict[str, Any]], None]):
+        """Call listener with every ticket event ({"event", "ticket"}) once it is committed"""
+        self._listeners.append(listener)
+
+    def _emit(self, events: List[Dict[str, Any]]):
+        for event in events:
+            for listener in self._listeners:
+                try:
+                    listener(event)
+                except Exception:
+                    logger.exception("Ticket event listener failed")
+
+    # Writes
+
+    def create(self, customer_email: str, issue_type: str, description: str,
+               status: str = "open", priority: str = "medium") -> Dict[str, Any]:
+        """Insert a ticket and wait until it is committed; returns it with its new id"""
+        return self._submit("create", (customer_email, issue_type, description, status, priority))
+
+    async def acreate(self, customer_email: str, issue_type: str, description: str,
+                      status: str = "open", priority: str = "medium") -> Dict[str, Any]:
+        """Async variant of create that leaves the event loop free while the batch commits"""
+        return await self._asubmit("create", (customer_email, issue_type, description, status, priority))
+
+    def update(self, ticket_id: str, event: str, **fields) -> Optional[Dict[str, Any]]:
+        """Update status/priority in place and record `event`; None when the ticket does not exist"""
+        seq = parse_ticket_id(ticket_id)
+        if seq is None:
+            return None
+        return self._submit("update", (seq, event, fields))
+
+    async def aupdate(self, ticket_id: str, event: str, **fields) -> Optional[Dict[str, Any]]:
+        seq = parse_ticket_id(ticket_id)
+        if seq is None:
+            return None
+        return await self._asubmit("update", (seq, event, fields))
+
+    def _enqueue(self, operation: str, args: tuple) -> Future:
+        future = Future()
+        # Under the lock, so no write can land behind the writer's stop marker
+        with self._close_lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("Cannot write to a closed ticket store")
+            self._queue.put((operation, args, future))
+        return future
+
+    def _submit(self, operation: str, args: tuple) -> Any:
+        """
+        Queue a write and wait for its commit.
+
+        Raises TimeoutError after write_timeout; the write is dropped if it had not started.
+        """
+        future = self._enqueue(operation, args)
+        try:
+            return future.result(timeout=self.write_timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    async def _asubmit(self, operation: str, args: tuple) -> Any:
+        # Cancelling the wrapper on timeout cancels the write too if it had not started
+        return await asyncio.wait_for(asyncio.wrap_future(self._enqueue(operation, args)), self.write_timeout)
+
+    def _write_loop(self):
+        conn = self._connection()
+        stopping = False
+        while not stopping:
+            write = self._queue.get()
+            # None is close()'s stop marker, always the last item queued
+            if write is None:
+                return
+            batch = [write]
+            if self.commit_delay:
+                time.sleep(self.commit_delay)
+            while len(batch) < self.max_batch:
+                try:
+                    write = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if write is None:
+                    stopping = True
+                    break
+                batch.append(write)
+
+            # Writes whose caller gave up before they started are dropped
+            batch = [write for write in batch if write[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            outcomes, events = [], []
+            try:
+                conn.execute("BEGIN")
+                for operation, args, _ in batch:
+                    conn.execute("SAVEPOINT ticket_write")
+                    try:
+                        result = self._apply(conn, operation, args)
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO ticket_write")
+                        conn.execute("RELEASE ticket_write")
+                        outcomes.append((False, e))
+                        continue
+                    conn.execute("RELEASE ticket_write")
+                    outcomes.append((True, result))
+                    if result is not None:
+                        events.append({"event": "created" if operation == "create" else args[1], "ticket": result})
+                conn.commit()
+            except Exception as e:
+                # The commit itself failed, so nothing in the batch was written
+                conn.rollback()
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            self.stats["commits"] += 1
+            self.stats["writes"] += len(batch)
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            for (_, _, future), (succeeded, outcome) in zip(batch, outcomes):
+                if succeeded:
+                    future.set_result(outcome)
+                else:
+                    future.set_exception(outcome)
+            self._emit(events)
+
+    def _apply(self, conn: sqlite3.Connection, operation: str, args: tuple) -> Optional[Dict[str, Any]]:
+        now = datetime.now().isoformat()
+        if operation == "create":
+            customer_email, issue_type, description, status, priority = args
+            seq = conn.execute(
+                "INSERT INTO tickets (customer_email, issue_type, description, status, priority, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (customer_email, issue_type, description, status, priority, now, now)
+            ).lastrowid
+            event = "created"
+        else:
+            seq, event, fields = args
+            fields = {name: value for name, value in fields.items() if name in ("status", "priority")}
+            assignments = "".join(f"{name} = ?, " for name in fields)
+            changed = conn.execute(
+                f"UPDATE tickets SET {assignments}updated_at = ? WHERE seq = ?",
+                tuple(fields.values()) + (now, seq)
+            ).rowcount
+            if not changed:
+                return None
+
+        conn.execute(
+            "INSERT INTO ticket_events (ticket_seq, event, created_at) VALUES (?, ?, ?)", (seq, event, now)
+        )
+        row = conn.execute(f"SELECT {self.COLUMNS} FROM tickets WHERE seq = ?", (seq,)).fetchone()
+        return self._ticket(row)
+
+    # Reads
+
+    def get(self, ticket_id: str) -> Optional[Dict[str, Any]]:
+        seq = parse_ticket_id(ticket_id)
+        if seq is None:
+            return None
+        row = self._connection().execute(f"SELECT {self.COLUMNS} FROM tickets WHERE seq = ?", (seq,)).fetchone()
+        return self._ticket(row) if row else None
+
+    def list_for_customer(self, customer_email: str, limit: int = 20, offset: int = 0) -> Tuple[List[dict], int]:
+        """A customer's tickets, newest first"""
+        return self._page("customer_email = ?", (customer_email,), limit, offset)
+
+    def list_by_status(self, status: str, limit: int = 20, offset: int = 0) -> Tuple[List[dict], int]:
+        return self._page("status = ?", (status,), limit, offset)
+
+    def list_by_priority(self, priority: str, limit: int = 20, offset: int = 0) -> Tuple[List[dict], int]:
+        return self._page("priority = ?", (priority,), limit, offset)
+
+    def events(self, ticket_id: str) -> List[Dict[str, Any]]:
+        """A ticket's event history, oldest first"""
+        seq = parse_ticket_id(ticket_id)
+        rows = self._connection().execute(
+            "SELECT event, created_at FROM ticket_events WHERE ticket_seq = ? ORDER BY id", (seq,)
+        ).fetchall() if seq is not None else []
+        return [{"event": event, "created_at": created_at} for event, created_at in rows]
+
+    def _page(self, where: str, params: tuple, limit: int, offset: int) -> Tuple[List[dict], int]:
+        conn = self._connection()
+        total = conn.execute(f"SELECT COUNT(*) FROM tickets WHERE {where}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {self.COLUMNS} FROM tickets WHERE {where} ORDER BY seq DESC LIMIT ? OFFSET ?",
+            params + (limit, offset)
+        ).fetchall()
+        return [self._ticket(row) for row in rows], total
+
+    def _ticket(self, row: tuple) -> Dict[str, Any]:
+        seq, customer_email, issue_type, description, status, priority, created_at, updated_at = row
+        return {
+            "id": format_ticket_id(seq),
+            "customer_email": customer_email,
+            "issue_type": issue_type,
+            "description": description,
+            "status": status,
+            "created_at": created_at,
+            "updated_at": updated_at,
+            "priority": priority
+        }
+
+_shared_stores: Dict[Optional[str], SQLiteTicketStore] = {}
+_shared_stores_lock = threading.Lock()
+
+def get_ticket_store(path: str = None, **options) -> SQLiteTicketStore:
+    """
+    The process-wide store for path (None: one in-memory store), so every SupportTools
+    shares one writer thread; options apply when the store is first created
+    """
+    with _shared_stores_lock:
+        store = _shared_stores.get(path)
+        if store is None or store.closed:
+            store = _shared_stores[path] = SQLiteTicketStore(path, **options)
+        return store
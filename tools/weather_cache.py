@@ -0,0 +1,132 @@
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Common short forms mapped to the name OpenWeatherMap resolves
+LOCATION_ALIASES = {
+    "nyc": "new york",
+    "ny": "new york",
+    "new york city": "new york",
+    "la": "los angeles",
+    "sf": "san francisco",
+    "san fran": "san francisco",
+    "dc": "washington",
+    "washington dc": "washington",
+    "philly": "philadelphia",
+    "vegas": "las vegas",
+    "chi-town": "chicago",
+    "hk": "hong kong",
+    "bombay": "mumbai",
+    "peking": "beijing"
+}
+
+def normalize_location(location: str) -> str:
+    """Lowercase, trim, collapse whitespace and resolve aliases, so "  NYC " and "new york" share a key"""
+    key = re.sub(r"\s+", " ", location.strip().lower()).strip(" .,!?")
+    key = re.sub(r"\s*,\s*", ",", key)
+    return LOCATION_ALIASES.get(key, key)
+
+class WeatherCache:
+    """
+    TTL cache that serves stale entries while a background refresh runs.
+
+    An entry is fresh for `ttl` seconds and may then be served stale for another
+    `stale_ttl` seconds while it is refetched. Negative results (unknown locations)
+    are kept for `negative_ttl` so repeated typos do not reach the API.
+    """
+
+    def __init__(self, ttl: float, stale_ttl: float, negative_ttl: float = 300,
+                 max_entries: int = 10000, refresher: ThreadPoolExecutor = None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._refresher = refresher or ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather-refresh")
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "stale_hits": 0,
+            "negative_hits": 0,
+            "misses": 0,
+            "refreshes": 0
+        }
+
+    def lookup(self, key: Hashable, refresh: Callable[[], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Cached result for key, scheduling `refresh` in the background if it is stale; None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.stats["misses"] += 1
+                return None
+
+            value, expires_at, _ = entry
+            self._entries.move_to_end(key)
+            if not value.get("success"):
+                self.stats["negative_hits"] += 1
+            elif expires_at >= now:
+                self.stats["hits"] += 1
+            else:
+                self.stats["stale_hits"] += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._refresher.submit(self._refresh, key, refresh)
+        return dict(value)
+
+    def store(self, key: Hashable, result: Dict[str, Any]):
+        """Cache a successful or not-found result; transient errors are never cached"""
+        now = time.time()
+        if result.get("success"):
+            entry = (result, now + self.ttl, now + self.ttl + self.stale_ttl)
+        elif result.get("not_found"):
+            entry = (result, now + self.negative_ttl, now + self.negative_ttl)
+        else:
+            return
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _refresh(self, key: Hashable, refresh: Callable[[], Dict[str, Any]]):
+        try:
+            # A failed refresh leaves the stale entry in place until it ages out
+            self.store(key, refresh())
+            with self._lock:
+                self.stats["refreshes"] += 1
+        except Exception:
+            logger.exception("Weather refresh failed for %s", key)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def expires_at(self, key: Hashable) -> Optional[float]:
+        """When the entry for key stops being fresh, or None if it is not cached"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry[1] if entry else None
+
+    def is_negative(self, key: Hashable) -> bool:
+        """Whether key holds an unexpired not-found result"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry is not None and not entry[0].get("success") and entry[2] >= time.time()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = round((lookups - stats["misses"]) / lookups, 3) if lookups else 0.0
+        return stats
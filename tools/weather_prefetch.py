@@ -0,0 +1,188 @@
+import hashlib
+import logging
+import threading
+import time
+from array import array
+from typing import Hashable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+class CountMinSketch:
+    """
+    Fixed-size frequency estimates; counts are never underestimated
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._rows = [array("L", [0]) * width for _ in range(depth)]
+
+    def _positions(self, key: Hashable) -> List[int]:
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=8 * self.depth).digest()
+        return [int.from_bytes(digest[8 * row:8 * row + 8], "little") % self.width for row in range(self.depth)]
+
+    def add(self, key: Hashable, count: int = 1) -> int:
+        """Count key and return its new estimate"""
+        estimate = None
+        for row, position in zip(self._rows, self._positions(key)):
+            row[position] += count
+            estimate = row[position] if estimate is None else min(estimate, row[position])
+        return estimate
+
+    def estimate(self, key: Hashable) -> int:
+        return min(row[position] for row, position in zip(self._rows, self._positions(key)))
+
+    def decay(self):
+        """Halve every counter so popularity follows recent traffic"""
+        for row in self._rows:
+            for position in range(self.width):
+                row[position] >>= 1
+
+class WeatherPrefetcher:
+    """
+    Keeps the most requested locations warm in the WeatherTools caches.
+
+    Lookups are counted in a count-min sketch and a small candidate set tracks the
+    current top-N. A background thread refreshes a hot entry `lead_time` seconds before
+    it stops being fresh, issuing at most `requests_per_minute` API calls spaced evenly
+    so the prefetch traffic never bursts against the OpenWeatherMap limit. A key whose
+    refresh fails is retried with exponential backoff, and unknown locations are left
+    to their negative cache entry rather than refetched.
+    """
+
+    def __init__(self, tools, top_n: int = 25, lead_time: float = 60, requests_per_minute: float = 30,
+                 decay_interval: float = 600, poll_interval: float = 1.0,
+                 failure_backoff: float = 30, max_backoff: float = 900):
+        self.tools = tools
+        self.top_n = top_n
+        self.lead_time = lead_time
+        self.spacing = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self.decay_interval = decay_interval
+        self.poll_interval = poll_interval
+        self.failure_backoff = failure_backoff
+        self.max_backoff = max_backoff
+
+        self.sketch = CountMinSketch()
+        # Candidate keys with their last estimate; bounded to a few times top_n
+        self._candidates = {}
+        # key -> (consecutive failures, monotonic time before which it is not retried)
+        self._backoff = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._next_decay = time.monotonic() + decay_interval
+        self.stats = {"recorded": 0, "prefetched": 0, "failures": 0, "not_found": 0}
+
+    # Popularity
+
+    def record(self, key: Hashable):
+        """Count one user lookup: ("weather", location) or ("forecast", location, days)"""
+        with self._lock:
+            estimate = self.sketch.add(key)
+            self.stats["recorded"] += 1
+            self._candidates[key] = estimate
+            if len(self._candidates) > 4 * self.top_n:
+                # Drop the coldest half rather than evicting on every insert
+                keep = sorted(self._candidates.items(), key=lambda item: -item[1])[:2 * self.top_n]
+                self._candidates = dict(keep)
+
+    def hot_keys(self) -> List[Tuple[Hashable, int]]:
+        """The current top-N keys with their estimated counts"""
+        with self._lock:
+            return sorted(self._candidates.items(), key=lambda item: -item[1])[:self.top_n]
+
+    def _maybe_decay(self):
+        if time.monotonic() < self._next_decay:
+            return
+        with self._lock:
+            self.sketch.decay()
+            self._candidates = {key: count >> 1 for key, count in self._candidates.items() if count > 1}
+            self._backoff = {key: backoff for key, backoff in self._backoff.items() if key in self._candidates}
+        self._next_decay = time.monotonic() + self.decay_interval
+
+    # Refresh loop
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="weather-prefetch", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._maybe_decay()
+            due = self._due_keys()
+            if not due:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            for key in due:
+                if self._stop.is_set():
+                    return
+                self._refresh(key)
+                # Even spacing keeps the prefetch traffic well inside the rate limit
+                self._stop.wait(self.spacing)
+
+    def _due_keys(self) -> List[Hashable]:
+        """Hot keys that are missing or within lead_time of expiry, soonest first"""
+        now = time.time()
+        monotonic_now = time.monotonic()
+        due = []
+        for key, _ in self.hot_keys():
+            backoff = self._backoff.get(key)
+            if backoff is not None and backoff[1] > monotonic_now:
+                continue
+            cache, cache_key = self._cache_for(key), self._cache_key(key)
+            if cache.is_negative(cache_key):
+                continue
+            expires_at = cache.expires_at(cache_key)
+            if expires_at is None or expires_at - now <= self.lead_time:
+                due.append((expires_at or 0.0, key))
+        return [key for _, key in sorted(due, key=lambda item: item[0])]
+
+    def _refresh(self, key: Hashable):
+        try:
+            if key[0] == "forecast":
+                result = self.tools._fetch_forecast(key[1], key[2])
+            else:
+                result = self.tools._fetch_weather(key[1])
+        except Exception:
+            logger.exception("Weather prefetch failed for %s", key)
+            self._failed(key)
+            return
+
+        self._cache_for(key).store(self._cache_key(key), result)
+        if result.get("success"):
+            self._backoff.pop(key, None)
+            self.stats["prefetched"] += 1
+        elif result.get("not_found"):
+            # Cached as a negative entry, which _due_keys skips until it expires
+            self._backoff.pop(key, None)
+            self.stats["not_found"] += 1
+        else:
+            # Transient errors are not cached, so without a backoff the key stays due and is refetched at once
+            logger.warning("Weather prefetch failed for %s: %s", key, result.get("message"))
+            self._failed(key)
+
+    def _failed(self, key: Hashable):
+        failures = self._backoff.get(key, (0, 0.0))[0] + 1
+        delay = min(self.failure_backoff * 2 ** (failures - 1), self.max_backoff)
+        self._backoff[key] = (failures, time.monotonic() + delay)
+        self.stats["failures"] += 1
+
+    def _cache_for(self, key: Hashable):
+        return self.tools.forecast_cache if key[0] == "forecast" else self.tools.weather_cache
+
+    def _cache_key(self, key: Hashable) -> Hashable:
+        return (key[1], key[2]) if key[0] == "forecast" else key[1]
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["backing_off"] = len(self._backoff)
+        stats["hot"] = [{"key": list(key), "estimate": count} for key, count in self.hot_keys()]
+        return stats
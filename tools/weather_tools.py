@@ -1,14 +1,44 @@
+import asyncio
+import contextvars
+import httpx
 import requests
 import os
-from typing import Dict, Any
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List
 from dotenv import load_dotenv
+from tools.weather_cache import WeatherCache, normalize_location
+from tools.weather_prefetch import WeatherPrefetcher
+from tracing import trace_methods
 
 load_dotenv()
 
+# Caches and prefetcher shared by every WeatherTools talking to the same API with the same key
+_shared_state = {}
+_shared_state_lock = threading.Lock()
+
+@trace_methods("tool.weather")
 class WeatherTools:
-    def __init__(self):
+    def __init__(self, base_url: str = None):
         self.api_key = os.getenv("OPENWEATHERMAP_API_KEY")
-        self.base_url = "http://api.openweathermap.org/data/2.5/weather"
+        # OPENWEATHERMAP_BASE_URL can point at another endpoint, e.g. the offline stub server
+        api_root = (base_url or os.getenv("OPENWEATHERMAP_BASE_URL") or "http://api.openweathermap.org/data/2.5").rstrip("/")
+        self.base_url = f"{api_root}/weather"
+        self.forecast_url = f"{api_root}/forecast"
+        
+        # One keep-alive connection pool per instance instead of a new TCP connection per call
+        self.pool_size = int(os.getenv("WEATHER_POOL_SIZE", "10"))
+        self.connect_timeout = float(os.getenv("WEATHER_CONNECT_TIMEOUT", "3.05"))
+        self.read_timeout = float(os.getenv("WEATHER_READ_TIMEOUT", "10"))
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._async_clients = weakref.WeakKeyDictionary()
+        # Sized to the connection pool; the executor starts its threads only on first use
+        self._fetch_pool = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="weather-fetch")
         
         # Fallback mock data if API key is not provided
         self.mock_weather_data = {
@@ -16,60 +46,210 @@ class WeatherTools:
             "london": {"temperature": 15, "condition": "cloudy", "humidity": 70},
             "tokyo": {"temperature": 28, "condition": "rainy", "humidity": 80},
         }
+        
+        self.weather_cache, self.forecast_cache, self.prefetcher = self._shared_state(api_root)
+    
+    def _shared_state(self, api_root: str) -> tuple:
+        """
+        The process-wide caches and prefetcher for this API, created by the first instance.
+
+        Every agent sees the same warm entries, and one prefetch thread spends the rate budget.
+        """
+        key = (api_root, self.api_key)
+        with _shared_state_lock:
+            state = _shared_state.get(key)
+            if state is not None:
+                return state
+            
+            # Weather barely changes within minutes, so answers are cached per normalized location
+            refresher = ThreadPoolExecutor(max_workers=4, thread_name_prefix="weather-refresh")
+            negative_ttl = float(os.getenv("WEATHER_NEGATIVE_TTL", "300"))
+            weather_cache = WeatherCache(
+                ttl=float(os.getenv("WEATHER_TTL", "600")),
+                stale_ttl=float(os.getenv("WEATHER_STALE_TTL", "3600")),
+                negative_ttl=negative_ttl,
+                refresher=refresher
+            )
+            forecast_cache = WeatherCache(
+                ttl=float(os.getenv("FORECAST_TTL", "1800")),
+                stale_ttl=float(os.getenv("FORECAST_STALE_TTL", "10800")),
+                negative_ttl=negative_ttl,
+                refresher=refresher
+            )
+            
+            # Popular locations are refreshed ahead of expiry so they never miss on the user path;
+            # the prefetcher fetches through this instance and reads the shared caches from it
+            prefetcher = None
+            if self.api_key and os.getenv("WEATHER_PREFETCH", "true").lower() in ("1", "true", "yes"):
+                self.weather_cache, self.forecast_cache = weather_cache, forecast_cache
+                prefetcher = WeatherPrefetcher(
+                    self,
+                    top_n=int(os.getenv("WEATHER_PREFETCH_TOP_N", "25")),
+                    lead_time=float(os.getenv("WEATHER_PREFETCH_LEAD_SECONDS", "60")),
+                    requests_per_minute=float(os.getenv("WEATHER_PREFETCH_RPM", "30"))
+                )
+                prefetcher.start()
+            
+            state = _shared_state[key] = (weather_cache, forecast_cache, prefetcher)
+            return state
     
     def get_weather(self, location: str) -> Dict[str, Any]:
         """Get weather information for a location using OpenWeatherMap API"""
+        key = normalize_location(location)
+        if self.prefetcher:
+            self.prefetcher.record(("weather", key))
+        cached = self.weather_cache.lookup(key, lambda: self._fetch_weather(key))
+        if cached is not None:
+            return cached
+        
+        result = self._fetch_weather(key)
+        self.weather_cache.store(key, result)
+        return result
+    
+    async def aget_weather(self, location: str) -> Dict[str, Any]:
+        """Async variant of get_weather over httpx"""
+        key = normalize_location(location)
+        if self.prefetcher:
+            self.prefetcher.record(("weather", key))
+        cached = self.weather_cache.lookup(key, lambda: self._fetch_weather(key))
+        if cached is not None:
+            return cached
+        
+        result = await self._afetch_weather(key)
+        self.weather_cache.store(key, result)
+        return result
+    
+    def get_weather_many(self, locations: List[str]) -> List[Dict[str, Any]]:
+        """Current weather for many locations, fetched concurrently over the pool, in input order"""
+        keys = [normalize_location(location) for location in locations]
+        unique_keys = list(dict.fromkeys(keys))
+        
+        # Each task runs in a copy of the caller's context so its spans nest under the caller's
+        futures = [self._fetch_pool.submit(contextvars.copy_context().run, self.get_weather, key) for key in unique_keys]
+        results = {key: future.result() for key, future in zip(unique_keys, futures)}
+        return [dict(results[key]) for key in keys]
+    
+    async def aget_weather_many(self, locations: List[str]) -> List[Dict[str, Any]]:
+        """Async variant of get_weather_many; at most pool-size requests are in flight"""
+        keys = [normalize_location(location) for location in locations]
+        unique_keys = list(dict.fromkeys(keys))
+        semaphore = asyncio.Semaphore(self.pool_size)
+        
+        async def fetch(key: str) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.aget_weather(key)
+        
+        results = dict(zip(unique_keys, await asyncio.gather(*(fetch(key) for key in unique_keys))))
+        return [dict(results[key]) for key in keys]
+    
+    def _async_client(self) -> httpx.AsyncClient:
+        """Pooled httpx client for the running event loop; async pools cannot cross loops"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+            )
+            self._async_clients[loop] = client
+        return client
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        stats = {
+            "weather": self.weather_cache.get_stats(),
+            "forecast": self.forecast_cache.get_stats()
+        }
+        if self.prefetcher:
+            stats["prefetch"] = self.prefetcher.get_stats()
+        return stats
+    
+    def _fetch_weather(self, location: str) -> Dict[str, Any]:
+        """Current weather straight from the API, bypassing the cache"""
         
         # If no API key, use mock data
         if not self.api_key:
             return self._get_mock_weather(location)
         
         try:
-            # Prepare API request parameters
-            params = {
-                'q': location,
-                'appid': self.api_key,
-                'units': 'metric'  # Use Celsius
-            }
-            
             # Make API request
-            response = requests.get(self.base_url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return self._format_weather_response(data)
-            elif response.status_code == 404:
-                return {
-                    "success": False,
-                    "message": f"Location '{location}' not found. Please check the spelling and try again."
-                }
-            elif response.status_code == 401:
-                return {
-                    "success": False,
-                    "message": "Invalid API key. Please check your OpenWeatherMap API configuration."
-                }
-            else:
-                return {
-                    "success": False,
-                    "message": f"Weather service error: {response.status_code}"
-                }
+            response = self.session.get(self.base_url, params=self._weather_params(location),
+                                        timeout=(self.connect_timeout, self.read_timeout))
+            return self._handle_weather_response(response, location)
                 
         except requests.exceptions.Timeout:
-            return {
-                "success": False,
-                "message": "Weather service timeout. Please try again later."
-            }
+            return self._timeout_error()
         except requests.exceptions.ConnectionError:
+            return self._connection_error()
+        except Exception as e:
             return {
                 "success": False,
-                "message": "Unable to connect to weather service. Please check your internet connection."
+                "message": f"Weather service error: {str(e)}"
             }
+    
+    async def _afetch_weather(self, location: str) -> Dict[str, Any]:
+        
+        if not self.api_key:
+            return self._get_mock_weather(location)
+        
+        try:
+            response = await self._async_client().get(self.base_url, params=self._weather_params(location))
+            return self._handle_weather_response(response, location)
+                
+        except httpx.TimeoutException:
+            return self._timeout_error()
+        except httpx.ConnectError:
+            return self._connection_error()
         except Exception as e:
             return {
                 "success": False,
                 "message": f"Weather service error: {str(e)}"
             }
     
+    def _weather_params(self, location: str) -> Dict[str, Any]:
+        """Query parameters for the current weather endpoint"""
+        return {
+            'q': location,
+            'appid': self.api_key,
+            'units': 'metric'  # Use Celsius
+        }
+    
+    def _handle_weather_response(self, response, location: str) -> Dict[str, Any]:
+        """Turn a requests/httpx response from the weather endpoint into a result"""
+        if response.status_code == 200:
+            data = response.json()
+            return self._format_weather_response(data)
+        elif response.status_code == 404:
+            return self._not_found_error(location)
+        elif response.status_code == 401:
+            return {
+                "success": False,
+                "message": "Invalid API key. Please check your OpenWeatherMap API configuration."
+            }
+        else:
+            return {
+                "success": False,
+                "message": f"Weather service error: {response.status_code}"
+            }
+    
+    def _not_found_error(self, location: str) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "not_found": True,
+            "message": f"Location '{location}' not found. Please check the spelling and try again."
+        }
+    
+    def _timeout_error(self) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "message": "Weather service timeout. Please try again later."
+        }
+    
+    def _connection_error(self) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "message": "Unable to connect to weather service. Please check your internet connection."
+        }
+    
     def _format_weather_response(self, data: Dict) -> Dict[str, Any]:
         """Format OpenWeatherMap API response"""
         try:
@@ -110,37 +290,61 @@ class WeatherTools:
         
         return {
             "success": False,
+            "not_found": True,
             "message": f"Weather data not available for {location}. Please add OPENWEATHERMAP_API_KEY to .env for real weather data."
         }
     
     def get_weather_forecast(self, location: str, days: int = 5) -> Dict[str, Any]:
         """Get weather forecast for multiple days (requires API key)"""
+        key = (normalize_location(location), days)
+        if self.prefetcher:
+            self.prefetcher.record(("forecast",) + key)
+        cached = self.forecast_cache.lookup(key, lambda: self._fetch_forecast(key[0], days))
+        if cached is not None:
+            return cached
+        
+        result = self._fetch_forecast(key[0], days)
+        self.forecast_cache.store(key, result)
+        return result
+    
+    async def aget_weather_forecast(self, location: str, days: int = 5) -> Dict[str, Any]:
+        """Async variant of get_weather_forecast over httpx"""
+        key = (normalize_location(location), days)
+        if self.prefetcher:
+            self.prefetcher.record(("forecast",) + key)
+        cached = self.forecast_cache.lookup(key, lambda: self._fetch_forecast(key[0], days))
+        if cached is not None:
+            return cached
+        
+        result = await self._afetch_forecast(key[0], days)
+        self.forecast_cache.store(key, result)
+        return result
+    
+    def _fetch_forecast(self, location: str, days: int) -> Dict[str, Any]:
+        """Forecast straight from the API, bypassing the cache"""
         
         if not self.api_key:
+            return self._forecast_key_error()
+        
+        try:
+            response = self.session.get(self.forecast_url, params=self._forecast_params(location, days),
+                                        timeout=(self.connect_timeout, self.read_timeout))
+            return self._handle_forecast_response(response, location, days)
+                
+        except Exception as e:
             return {
                 "success": False,
-                "message": "Weather forecast requires OpenWeatherMap API key. Please add OPENWEATHERMAP_API_KEY to .env"
+                "message": f"Forecast service error: {str(e)}"
             }
+    
+    async def _afetch_forecast(self, location: str, days: int) -> Dict[str, Any]:
+        
+        if not self.api_key:
+            return self._forecast_key_error()
         
         try:
-            forecast_url = "http://api.openweathermap.org/data/2.5/forecast"
-            params = {
-                'q': location,
-                'appid': self.api_key,
-                'units': 'metric',
-                'cnt': min(days * 8, 40) 
-            }
-            
-            response = requests.get(forecast_url, params=params, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                return self._format_forecast_response(data, days)
-            else:
-                return {
-                    "success": False,
-                    "message": f"Forecast service error: {response.status_code}"
-                }
+            response = await self._async_client().get(self.forecast_url, params=self._forecast_params(location, days))
+            return self._handle_forecast_response(response, location, days)
                 
         except Exception as e:
             return {
@@ -148,6 +352,34 @@ class WeatherTools:
                 "message": f"Forecast service error: {str(e)}"
             }
     
+    def _forecast_params(self, location: str, days: int) -> Dict[str, Any]:
+        """Query parameters for the forecast endpoint"""
+        return {
+            'q': location,
+            'appid': self.api_key,
+            'units': 'metric',
+            'cnt': min(days * 8, 40) 
+        }
+    
+    def _handle_forecast_response(self, response, location: str, days: int) -> Dict[str, Any]:
+        """Turn a requests/httpx response from the forecast endpoint into a result"""
+        if response.status_code == 200:
+            data = response.json()
+            return self._format_forecast_response(data, days)
+        elif response.status_code == 404:
+            return self._not_found_error(location)
+        else:
+            return {
+                "success": False,
+                "message": f"Forecast service error: {response.status_code}"
+            }
+    
+    def _forecast_key_error(self) -> Dict[str, Any]:
+        return {
+            "success": False,
+            "message": "Weather forecast requires OpenWeatherMap API key. Please add OPENWEATHERMAP_API_KEY to .env"
+        }
+    
     def _format_forecast_response(self, data: Dict, days: int) -> Dict[str, Any]:
         """Format forecast API response"""
         try:
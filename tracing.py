@@ -0,0 +1,347 @@
+import atexit
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+class Span:
+    """
+    One timed operation; ids and timestamps follow the OpenTelemetry data model
+    """
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "kind", "start_ns", "end_ns",
+                 "attributes", "status", "status_message", "_tracer", "_token")
+
+    def __init__(self, tracer: "Tracer", name: str, trace_id: str, parent_id: Optional[str],
+                 kind: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = STATUS_OK
+        self.status_message = ""
+        self._tracer = tracer
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any):
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_error(self, error: BaseException):
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(error).__name__}: {error}"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self._tracer._finish(self)
+
+    # Used as a context manager the span becomes the parent of everything started inside it
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.record_error(exc)
+        self.end()
+        return False
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+class _NoopSpan:
+    """
+    Stand-in when tracing is off or the trace was not sampled; costs one attribute lookup
+    """
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def record_error(self, error: BaseException):
+        pass
+
+    def end(self):
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+class _UnsampledRoot(_NoopSpan):
+    """
+    Marks a request whose trace was not sampled, so its children are skipped too
+    """
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self._token)
+        return False
+
+NOOP_SPAN = _NoopSpan()
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar("current_span", default=None)
+
+def current_span():
+    return _current_span.get()
+
+# Export
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp(spans: List[Span], service_name: str) -> dict:
+    """An OTLP/JSON ExportTraceServiceRequest for the spans"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "ecommerce-chatbot.tracing"},
+                "spans": [
+                    {
+                        "traceId": span.trace_id,
+                        "spanId": span.span_id,
+                        **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                        "name": span.name,
+                        "kind": span.kind,
+                        "startTimeUnixNano": str(span.start_ns),
+                        "endTimeUnixNano": str(span.end_ns),
+                        "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                        "status": {"code": span.status, **({"message": span.status_message} if span.status_message else {})}
+                    }
+                    for span in spans
+                ]
+            }]
+        }]
+    }
+
+class JSONFileExporter:
+    """
+    Appends one OTLP/JSON request per line, the layout of the collector's file exporter
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span], service_name: str):
+        with open(self.path, "a", encoding="utf-8") as outfile:
+            outfile.write(json.dumps(to_otlp(spans, service_name)) + "\n")
+
+class OTLPHTTPExporter:
+    """
+    Posts OTLP/JSON to a collector's /v1/traces endpoint
+    """
+
+    def __init__(self, endpoint: str, timeout: float = 5.0):
+        self.url = endpoint.rstrip("/") + ("" if endpoint.rstrip("/").endswith("/v1/traces") else "/v1/traces")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def export(self, spans: List[Span], service_name: str):
+        self.session.post(self.url, json=to_otlp(spans, service_name), timeout=self.timeout)
+
+class InMemoryExporter:
+    """
+    Keeps finished spans in a list, for benchmarks and debugging
+    """
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span], service_name: str):
+        self.spans.extend(spans)
+
+# Tracer
+
+class Tracer:
+    """
+    Creates spans and hands finished ones to a background exporter in batches.
+
+    Sampling is decided once per trace at its root span; children of an unsampled
+    root are no-ops, so an unsampled request costs a context-variable lookup per span.
+    """
+
+    def __init__(self, sample_rate: float = 0.0, exporters: list = None, service_name: str = "ecommerce-chatbot",
+                 batch_size: int = 512, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.sample_rate = sample_rate
+        self.exporters = exporters or []
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._wake = threading.Event()
+        # started/dropped are counted on request threads; exported/export_errors only under _export_lock
+        self._stats_lock = threading.Lock()
+        self.stats = {"started": 0, "exported": 0, "dropped": 0, "export_errors": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0 and bool(self.exporters)
+
+    def start_span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+        """Start a span under the current one without making it current; call .end() when done"""
+        parent = _current_span.get()
+        if parent is None:
+            if not self.enabled:
+                return NOOP_SPAN
+            if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return _UnsampledRoot()
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+        elif isinstance(parent, _NoopSpan):
+            return NOOP_SPAN
+        else:
+            trace_id, parent_id = parent.trace_id, parent.span_id
+
+        with self._stats_lock:
+            self.stats["started"] += 1
+        return Span(self, name, trace_id, parent_id, kind, attributes)
+
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes):
+        """Context manager: the span is current inside the block and ends with it"""
+        return self.start_span(name, kind, **attributes)
+
+    def _finish(self, span: Span):
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            with self._stats_lock:
+                self.stats["dropped"] += 1
+            return
+        if self._queue.qsize() >= self.batch_size:
+            self._wake.set()
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True)
+                    self._thread.start()
+                    # The exporter is a daemon thread, so spans still queued at exit would be lost
+                    atexit.register(self.flush)
+
+    def _export_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def _drain(self):
+        with self._export_lock:
+            while True:
+                batch = []
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                if not batch:
+                    return
+                self._export(batch)
+
+    def _export(self, batch: List[Span]):
+        for exporter in self.exporters:
+            try:
+                exporter.export(batch, self.service_name)
+            except Exception:
+                self.stats["export_errors"] += 1
+                logger.exception("Trace export failed")
+        self.stats["exported"] += len(batch)
+
+    def flush(self):
+        """Export everything finished so far, waiting for a batch already in flight"""
+        self._drain()
+
+_default_tracer = None
+_default_tracer_lock = threading.Lock()
+
+def get_tracer() -> Tracer:
+    """
+    Process-wide tracer configured from TRACE_SAMPLE_RATE (default 0, off),
+    TRACE_EXPORT_FILE and/or TRACE_EXPORT_ENDPOINT (an OTLP/HTTP collector)
+    """
+    global _default_tracer
+
+    if _default_tracer is not None:
+        return _default_tracer
+    with _default_tracer_lock:
+        if _default_tracer is None:
+            exporters = []
+            if os.getenv("TRACE_EXPORT_FILE"):
+                exporters.append(JSONFileExporter(os.getenv("TRACE_EXPORT_FILE")))
+            if os.getenv("TRACE_EXPORT_ENDPOINT"):
+                exporters.append(OTLPHTTPExporter(os.getenv("TRACE_EXPORT_ENDPOINT")))
+            _default_tracer = Tracer(
+                sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0")),
+                exporters=exporters,
+                service_name=os.getenv("TRACE_SERVICE_NAME", "ecommerce-chatbot")
+            )
+        return _default_tracer
+
+def set_tracer(tracer: Tracer):
+    """Replace the process-wide tracer, e.g. with one using an InMemoryExporter"""
+    global _default_tracer
+    _default_tracer = tracer
+
+def trace_methods(prefix: str):
+    """
+    Class decorator giving every public method a span named "<prefix>.<method>".
+
+    Generator methods are left alone: their work happens after the call returns.
+    """
+    def wrap(function: Callable) -> Callable:
+        name = f"{prefix}.{function.__name__}"
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_traced(*args, **kwargs):
+                with get_tracer().span(name):
+                    return await function(*args, **kwargs)
+            return async_traced
+
+        @functools.wraps(function)
+        def traced(*args, **kwargs):
+            with get_tracer().span(name):
+                return function(*args, **kwargs)
+        return traced
+
+    def decorate(cls):
+        for attribute, value in list(vars(cls).items()):
+            if attribute.startswith("_") or not inspect.isfunction(value) or inspect.isgeneratorfunction(value):
+                continue
+            setattr(cls, attribute, wrap(value))
+        return cls
+    return decorate